@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of jacoren collectors and REST API."""
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark every public collector and every REST API route.
+
+Collectors are called directly, routes are requested through werkzeug
+test ``Client``, so benchmark runs offline. For every case, latency
+percentiles (in microseconds) and calls per second are reported.
+
+Results can be saved as a baseline and compared with later runs; run
+fails (exit status 1) if median latency of any case grows by more than
+``--margin`` (20% by default)::
+
+    $ python -m benchmarks.bench --save baseline.json
+    $ python -m benchmarks.bench --baseline baseline.json --margin 0.3
+
+Baselines are specific to a machine (and its load), so they should be
+recorded and compared on the same one.
+
+Single core cases read first and last core of synthetic /proc/stat and
+cpufreq trees of machines with 4, 64 and 192 CPUs, so it shows whether
+their latency stays flat as number of CPUs grows.
+
+Import cases measure a fresh interpreter importing the package (startup
+of interpreter included), with their own, smaller number of iterations
+(``--import-iterations``).
+"""
+
+from __future__ import print_function
+import os
+import re
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from collections import OrderedDict
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+import psutil
+
+from jacoren import machine, cpu, memory, disks, batch, _procfs
+from jacoren._backends import BACKENDS
+from jacoren._server import JacorenServer
+
+
+#: High-resolution clock (if available)
+_clock = getattr(time, 'perf_counter', time.time)
+
+#: Root directory of project, imported package is looked up in it
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: Statements of import cases, run in a fresh interpreter
+_IMPORTS = (
+    'import jacoren',
+    'import jacoren; jacoren.machine.machine_uptime()',
+    'import jacoren; jacoren.cpu.cpu_load()',
+    'import jacoren; jacoren.wsgi',
+)
+
+#: Numbers of CPUs of synthetic procfs and sysfs trees
+SYNTHETIC_CPUS = (4, 64, 192)
+
+#: Reported latency percentiles
+PERCENTILES = (50, 90, 99)
+
+#: Query strings of benchmarked route variants
+_QUERIES = {
+    '/cpu': ('?cpu_time=1', '?fields=load.used'),
+    '/cpu/<int:core>': ('?cpu_time=1',),
+    '/cpu/load': ('?cpu_time=1', '?group=node'),
+    '/cpu/load/<int:core>': ('?cpu_time=1',),
+    '/memory': ('?percent=1', '?fields=ram.available'),
+    '/memory/ram': ('?percent=1',),
+    '/memory/swap': ('?percent=1',),
+    '/disks': ('?percent=1',),
+    '/batch': ('?r=cpu/load&r=cpu/freq&r=memory/ram&r=memory/swap'
+               '&r=disks&r=machine/uptime',),
+}
+
+
+def percentile(values, p):
+    """
+    Return **p**-th percentile of sorted values (nearest-rank method).
+
+    :param values: Sorted values
+    :param p: Percentile (0-100)
+    :type values: list
+    :type p: float
+    :rtype: float
+    """
+    if not values:
+        raise ValueError("no values")
+    rank = int(math.ceil(p / 100. * len(values)))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def measure(func, iterations, warmup=10):
+    """
+    Call function repeatedly and return its statistics.
+
+    :param func: Function without arguments
+    :param iterations: Number of measured calls
+    :param warmup: Number of calls made before measuring
+    :type func: callable
+    :type iterations: int
+    :type warmup: int
+    :returns: Latency percentiles (``p50``, ...) and ``max`` in
+              microseconds, and calls per second (``ops``)
+    :rtype: OrderedDict
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    started = _clock()
+    for _ in range(iterations):
+        t = _clock()
+        func()
+        latencies.append(_clock() - t)
+    total = _clock() - started
+
+    latencies.sort()
+    stats = OrderedDict(
+        ('p%d' % p, round(percentile(latencies, p) * 1e6, 2))
+        for p in PERCENTILES
+    )
+    stats['max'] = round(latencies[-1] * 1e6, 2)
+    stats['ops'] = round(iterations / total, 1) if total > 0 else None
+    return stats
+
+
+def function_cases():
+    """Return (name, function) pairs of public collectors."""
+    return [
+        ('machine.machine_uptime()', machine.machine_uptime),
+        ('machine.machine_users()', machine.machine_users),
+        ('machine.machine()', machine.machine),
+        ('cpu.cpu_info()', cpu.cpu_info),
+        ('cpu.cpu_load()', cpu.cpu_load),
+        ('cpu.cpu_load(cpu_time=True)', lambda: cpu.cpu_load(cpu_time=True)),
+        ('cpu.cpu_load(core=0)', lambda: cpu.cpu_load(core=0)),
+        ('cpu.cpu_load_summary()', cpu.cpu_load_summary),
+        ('cpu.cpu_load_groups("node")', lambda: cpu.cpu_load_groups('node')),
+        ('cpu.cpu_topology()', cpu.cpu_topology),
+        ('cpu.cpu_load_history()', cpu.cpu_load_history),
+        ('cpu.cpu_freq()', cpu.cpu_freq),
+        ('cpu.cpu_freq(core=0)', lambda: cpu.cpu_freq(core=0)),
+        ('cpu.cpu()', cpu.cpu),
+        ('memory.memory_ram()', memory.memory_ram),
+        ('memory.memory_ram(percent=True)',
+         lambda: memory.memory_ram(percent=True)),
+        ('memory.memory_swap()', memory.memory_swap),
+        ('memory.memory_ram_history()', memory.memory_ram_history),
+        ('memory.memory()', memory.memory),
+        ('disks.disks()', disks.disks),
+        ('disks.disks(percent=True)', lambda: disks.disks(percent=True)),
+        ('batch.batch(...)', lambda: batch.batch([
+            'cpu/load', 'cpu/freq', 'memory/ram', 'memory/swap', 'disks',
+            'machine/uptime',
+        ])),
+    ]
+
+
+def core_cases():
+    """
+    Return (name, function) pairs of backends reading a single core.
+
+    First and last core are read, as backends look lines of later cores
+    up further in /proc/stat.
+    """
+    cases = []
+    last = cpu.CORES - 1
+    for name, backend in BACKENDS.items():
+        if name == 'procfs' and not psutil.LINUX:
+            continue
+        backend = backend()
+        for core in sorted(set((0, last))):
+            cases.append(('%s.cpu_times_core(%d)' % (name, core),
+                          lambda backend=backend, core=core:
+                          backend.cpu_times_core(core)))
+    return cases
+
+
+def synthetic_tree(root, cpus):
+    """
+    Write /proc/stat and cpufreq files of machine with **cpus** CPUs.
+
+    :returns: Path of /proc/stat and sysfs directory of CPUs
+    :rtype: tuple
+    """
+    root = os.path.join(root, '%d' % (cpus,))
+    sysfs = os.path.join(root, 'cpu') + os.sep
+
+    lines = ['cpu  %s' % (' '.join(['%d' % (cpus * 1000,)] * 10),)]
+    for cpu in range(cpus):
+        lines.append('cpu%d %s' % (cpu, ' '.join(['1000'] * 10)))
+        path = os.path.join(sysfs, 'cpu%d' % (cpu,), 'cpufreq')
+        os.makedirs(path)
+        for name, value in (('scaling_cur_freq', 2100000),
+                            ('scaling_min_freq', 800000),
+                            ('scaling_max_freq', 3400000)):
+            with open(os.path.join(path, name), 'w') as f:
+                f.write('%d\n' % (value,))
+    # Lines following CPUs (interrupts dominate size of real file)
+    lines.append('intr %s' % (' '.join(['0'] * 256),))
+    lines.extend(('ctxt 1', 'btime 1', 'processes 1', 'procs_running 1'))
+
+    stat = os.path.join(root, 'stat')
+    with open(stat, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return stat, sysfs
+
+
+def synthetic_cases(root, sizes=SYNTHETIC_CPUS):
+    """
+    Return (name, function) pairs reading single core of synthetic trees.
+
+    First and last core of machines of every size are read from files
+    written by :func:`synthetic_tree` in **root**, so growth of latency
+    with number of CPUs shows regardless of host.
+    """
+    count = len(BACKENDS['procfs'].cpu_fields)
+    cases = []
+    for cpus in sizes:
+        stat, sysfs = synthetic_tree(root, cpus)
+        reader = _procfs.CpufreqReader(sysfs)
+        for core in (0, cpus - 1):
+            cases.append(('procfs.cpu_times(%d) [%d cpus]' % (core, cpus),
+                          lambda core=core, stat=stat:
+                          _procfs.cpu_times(core, count, stat)))
+            cases.append(('cpufreq.read(%d) [%d cpus]' % (core, cpus),
+                          lambda core=core, reader=reader:
+                          reader.read(core)))
+    return cases
+
+
+def import_cases(executable=sys.executable):
+    """
+    Return (name, function) pairs of imports in a fresh interpreter.
+
+    Every function runs **executable** with one of statements of
+    ``_IMPORTS`` and waits for it to exit.
+    """
+    def case(statement):
+        def run_statement():
+            subprocess.check_call([executable, '-c', statement], cwd=_ROOT)
+        return run_statement
+
+    return [('python -c "%s"' % (statement,), case(statement))
+            for statement in _IMPORTS]
+
+
+def route_cases(server):
+    """
+    Return (name, function) pairs of server routes.
+
+    Every route (and its variants with query parameters) is requested
+    through werkzeug test Client; ``<core>`` is replaced with ``0``.
+    """
+    client = Client(server, BaseResponse)
+    cases = []
+
+    for rule in sorted(server.paths.iter_rules(), key=lambda r: r.rule):
+        path = re.sub(r'<[^>]+>', '0', rule.rule)
+        for query in ('',) + _QUERIES.get(rule.rule, ()):
+            url = path + query
+            cases.append(('GET ' + url,
+                          lambda url=url: client.get(url).data))
+    return cases
+
+
+def run(cases, iterations, pattern=None, out=sys.stdout, warmup=10,
+        header=True):
+    """
+    Benchmark cases and print their statistics.
+
+    :param cases: (name, function) pairs
+    :param iterations: Number of measured calls of every case
+    :param pattern: If given, only cases with names matching this regular
+                    expression are benchmarked
+    :param warmup: Number of calls of every case made before measuring
+    :param header: If true, header of columns is printed first
+    :returns: Mapping of case names to their statistics; cases raising
+              an exception are left out
+    :rtype: OrderedDict
+    """
+    columns = ['p%d' % p for p in PERCENTILES] + ['max', 'ops']
+    if header:
+        print('%-40s' % 'case' + ''.join('%12s' % c for c in columns),
+              file=out)
+
+    results = OrderedDict()
+    for name, func in cases:
+        if pattern is not None and not re.search(pattern, name):
+            continue
+        try:
+            stats = results[name] = measure(func, iterations, warmup)
+        except Exception as e:
+            # E.g. swap percentages on a machine without swap
+            print('%-40s error: %r' % (name, e), file=out)
+            continue
+        print('%-40s' % name +
+              ''.join('%12s' % stats[c] for c in columns), file=out)
+    return results
+
+
+def compare(results, baseline, margin, key='p50'):
+    """
+    Return cases regressed since baseline.
+
+    :param results: Current statistics (see :func:`run`)
+    :param baseline: Baseline statistics
+    :param margin: Allowed relative growth of latency, e.g. ``0.2``
+    :param key: Compared statistic
+    :returns: (name, baseline value, current value) triples; cases
+              missing in baseline are ignored
+    :rtype: list
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None or not base.get(key):
+            continue
+        if stats[key] > base[key] * (1. + margin):
+            regressions.append((name, base[key], stats[key]))
+    return regressions
+
+
+def main(argv=None):
+    """Run benchmarks."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench')
+    parser.add_argument('-n', '--iterations',
+                        type=int, default=500,
+                        help='measured calls of every case (default: 500)')
+    parser.add_argument('--import-iterations',
+                        type=int, default=20,
+                        help='measured runs of every import case '
+                             '(default: 20)')
+    parser.add_argument('-k', '--filter',
+                        type=str, default=None,
+                        help='benchmark only cases matching regular '
+                             'expression FILTER')
+    parser.add_argument('--save',
+                        type=str, default=None,
+                        help='save results as baseline in file SAVE')
+    parser.add_argument('--baseline',
+                        type=str, default=None,
+                        help='compare results with baseline from file '
+                             'BASELINE')
+    parser.add_argument('--margin',
+                        type=float, default=0.2,
+                        help='allowed relative growth of median latency '
+                             '(default: 0.2)')
+    args = parser.parse_args(argv)
+
+    # History makes /history routes return data instead of 404
+    server = JacorenServer(history=60)
+    root = tempfile.mkdtemp(prefix='jacoren-bench-')
+    try:
+        cases = (function_cases() + core_cases() + synthetic_cases(root) +
+                 route_cases(server))
+        results = run(cases, args.iterations, args.filter)
+    finally:
+        shutil.rmtree(root)
+    results.update(run(import_cases(), args.import_iterations, args.filter,
+                       warmup=1, header=False))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.margin)
+        for name, before, after in regressions:
+            print('REGRESSION %s: p50 %.2f us -> %.2f us (+%.0f%%)'
+                  % (name, before, after, 100. * (after / before - 1.)),
+                  file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,12 +9,14 @@ constants and dictionaries.
 
 Package can also be run as a script. This allows user to create
 a simple RESTful API for receiving data through HTTP requests.
+
+Submodules (and the server) are imported on first access, so ``import
+jacoren`` itself neither imports psutil and werkzeug nor probes the
+machine.
 """
 
-import jacoren.machine
-import jacoren.cpu
-import jacoren.memory
-import jacoren.disks
+import sys
+import importlib
 
 from .__version__ import (
     __version__,
@@ -26,4 +28,45 @@ from .__version__ import (
     __all__,
 )
 
-from ._server import wsgi
+
+#: Submodules imported on first access
+_submodules = frozenset(('machine', 'cpu', 'memory', 'disks', 'batch'))
+
+#: Attributes imported on first access and their modules
+_attributes = {
+    'get_backend': '_backends',
+    'set_backend': '_backends',
+    'wsgi': '_server',
+}
+
+
+def __getattr__(name):
+    """Import submodule or attribute on first access (PEP 562)."""
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+
+    module = _attributes.get(name)
+    if module is None:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+
+    value = globals()[name] = getattr(
+        importlib.import_module('.' + module, __name__), name)
+    return value
+
+
+def __dir__():
+    """Return names of package, including not yet imported ones."""
+    return sorted(set(globals()) | _submodules | set(_attributes))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ is not supported, import everything eagerly
+    import jacoren.machine
+    import jacoren.cpu
+    import jacoren.memory
+    import jacoren.disks
+    import jacoren.batch
+
+    from ._backends import get_backend, set_backend
+    from ._server import wsgi
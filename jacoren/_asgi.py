@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for running REST API as an ASGI application.
+
+ASGI application serves the same resources as :class:`JacorenServer`
+(it uses its route table and handlers), e.g.::
+
+    $ uvicorn jacoren._asgi:asgi
+
+Requests for resources that are cheap to build (static resources,
+history, snapshot and sampled CPU load) are answered directly on the
+event loop. Requests that may block (reading procfs, psutil calls,
+``statvfs`` of mountpoints) are handled by a bounded pool of threads,
+so they never stall the loop, no matter how many connections are open.
+
+Event streams (``/stream``) are sent as samples are collected, without
+holding a thread per subscriber.
+
+Requires Python 3.7+.
+"""
+
+import io
+import sys
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.wrappers import Request
+from werkzeug.exceptions import HTTPException
+
+from jacoren import cpu
+from jacoren._server import get_server
+from jacoren._stream import Subscription
+
+
+#: Default number of threads handling blocking requests
+WORKERS = 4
+
+#: Endpoints answered on event loop
+LOOP_ENDPOINTS = frozenset((
+    'api_help',
+    'cpu_info',
+    'machine_uptime',
+    'cpu_load_history',
+    'memory_ram_history',
+    'memory_swap_history',
+))
+
+
+def _environ(scope):
+    """Return WSGI environ of ASGI HTTP request scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    root_path = scope.get('root_path', '').encode('utf-8')
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % (scope.get('http_version', '1.1'),),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+
+    return environ
+
+
+def _run(app, environ):
+    """Run WSGI application and return its status, headers and body."""
+    result = []
+
+    def start_response(status, headers, exc_info=None):
+        result[:] = [int(status.split(None, 1)[0]), headers]
+
+    body = b''.join(app(environ, start_response))
+    status, headers = result
+    return status, headers, body
+
+
+class JacorenASGI(object):
+    """ASGI application serving :class:`JacorenServer` resources."""
+
+    def __init__(self, server=None, workers=WORKERS):
+        """
+        Init application.
+
+        :param server: Server whose resources are served. If ``None``,
+                       process-wide server is used
+                       (see :func:`jacoren._server.get_server`).
+        :param workers: Max number of threads handling blocking requests
+        :type server: jacoren._server.JacorenServer, None
+        :type workers: int
+        """
+        self._server = server
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def server(self):
+        """Return served JacorenServer instance."""
+        if self._server is None:
+            self._server = get_server()
+        return self._server
+
+    @property
+    def executor(self):
+        """Return pool of threads handling blocking requests."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def blocking(self, request, endpoint):
+        """Return True if answering request may block."""
+        if endpoint in LOOP_ENDPOINTS:
+            return False
+        if (endpoint in ('cpu_load', 'cpu_load_summary') and
+                cpu.sampler_running()):
+            return bool(request.args.get('cpu_time', 0, type=int))
+        return True
+
+    def _respond(self, request, endpoint, values):
+        """Return status, headers and body of matched request."""
+        server = self.server
+        response = server.dispatch(request, endpoint, values)
+        if isinstance(response.response, Subscription):
+            return (response.status_code, response.headers.to_wsgi_list(),
+                    response.response)
+        return _run(server.finish(request.environ, response),
+                    request.environ)
+
+    async def handle(self, environ):
+        """Return status, headers and body of request."""
+        server = self.server
+
+        static = server.static_responses.get(environ['PATH_INFO'] or '/')
+        if static is not None:
+            return _run(static, environ)
+
+        if server.cache is not None:
+            cached = server.cache.get(environ)
+            if cached is not None:
+                return _run(cached, environ)
+
+        request = Request(environ)
+        response = server.snapshot_response(request, spawn=False)
+        if response is not None:
+            return _run(server.finish(environ, response), environ)
+        if server.snapshot is not None and server.snapshot.stale:
+            # Starting collector blocks, so it is left to a thread
+            self.executor.submit(server.snapshot.ensure_collector)
+
+        try:
+            endpoint, values = server.match(request)
+        except HTTPException as http_error:
+            return _run(server.error_response(request, http_error), environ)
+
+        if not self.blocking(request, endpoint):
+            return self._respond(request, endpoint, values)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self._respond, request, endpoint, values
+        )
+
+    async def stream(self, subscription, receive, send):
+        """Send events of subscription until client disconnects."""
+        loop = asyncio.get_running_loop()
+        collected = asyncio.Event()
+        subscription.callback = lambda: loop.call_soon_threadsafe(
+            collected.set
+        )
+
+        async def _disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        disconnected = asyncio.ensure_future(_disconnect())
+        try:
+            while not subscription.channel.closed:
+                event = subscription.poll()
+                if event is not None:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': event,
+                        'more_body': True,
+                    })
+                    continue
+
+                waiting = asyncio.ensure_future(collected.wait())
+                await asyncio.wait((waiting, disconnected),
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    waiting.cancel()
+                    return
+                collected.clear()
+
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            # Closing the last subscription waits for sampler to stop
+            await loop.run_in_executor(self.executor, subscription.close)
+
+    async def lifespan(self, receive, send):
+        """Handle lifespan events."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Start samplers and collectors before first request
+                self.server
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        """Act as ASGI application."""
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError("unsupported scope type: %r" % (scope['type'],))
+
+        status, headers, body = await self.handle(_environ(scope))
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(name.lower().encode('latin-1'),
+                         value.encode('latin-1'))
+                        for name, value in headers],
+        })
+        if isinstance(body, Subscription):
+            if scope['method'] != 'HEAD':
+                return await self.stream(body, receive, send)
+            body.close()
+            body = b''
+        await send({
+            'type': 'http.response.body',
+            'body': body,
+        })
+
+
+#: ASGI interface, e.g. ``uvicorn jacoren._asgi:asgi``
+asgi = JacorenASGI()
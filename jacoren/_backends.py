@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+"""
+Backends retrieving raw metrics.
+
+Collectors in :mod:`jacoren.cpu` and :mod:`jacoren.memory` get raw
+metrics from the current backend:
+
+* ``psutil`` - available on every platform,
+* ``procfs`` - Linux only; parses ``/proc/stat``, ``/proc/meminfo``,
+  ``/proc/vmstat`` and ``/proc/uptime`` directly, skipping psutil
+  namedtuples and their conversions to dictionaries. The files are kept
+  open and re-read with a single system call per call (see
+  :class:`jacoren._procfs.ProcReader`).
+
+Both backends return the same fields in the same order. Default backend
+is ``procfs`` on Linux and ``psutil`` elsewhere. It can be changed with
+:func:`jacoren.set_backend` or ``JACOREN_BACKEND`` environment variable.
+"""
+
+import os
+import time
+import psutil
+from collections import OrderedDict
+
+from jacoren import _procfs
+
+
+def times_percent(t1, t2):
+    """
+    Return CPU time percentages between two CPU times samples.
+
+    Mirrors ``psutil.cpu_times_percent()``: every field is a share of
+    the total time elapsed between samples, rounded to one decimal.
+    """
+    total_delta = sum(t2) - sum(t1)
+    if psutil.LINUX:
+        # guest and guest_nice are already included in user and nice
+        total_delta -= sum(t2[8:]) - sum(t1[8:])
+
+    def _percent(v1, v2):
+        try:
+            value = round(100. * (v2 - v1) / total_delta, 1)
+        except ZeroDivisionError:
+            return 0.0
+        return min(max(value, 0.0), 100.0)
+
+    return tuple(_percent(v1, v2) for v1, v2 in zip(t1, t2))
+
+
+def _usage_percent(used, total):
+    """Return usage percentage, rounded to one decimal."""
+    try:
+        return round(100. * used / total, 1)
+    except ZeroDivisionError:
+        return 0.0
+
+
+class Backend(object):
+    """
+    Base backend.
+
+    CPU times are given as tuples of values (in seconds, rounded to two
+    decimals) of fields named in ``cpu_fields``. Memory metrics are given
+    as OrderedDict instances with the same fields as their psutil
+    counterparts.
+
+    Logical core ``N`` is the N-th online logical core (as listed by
+    ``psutil`` and in /proc/stat), i.e. index to ``cpu_times()``, not CPU
+    number. They differ only if some CPUs are offline.
+    """
+
+    #: Backend name
+    name = None
+
+    #: Names of CPU times fields
+    cpu_fields = psutil.cpu_times()._fields
+
+    def __init__(self):
+        """Init CPU times baselines."""
+        self._last_times = None
+        self._last_core_times = {}
+
+    def cpu_times(self):
+        """Return CPU times of every logical core."""
+        raise NotImplementedError
+
+    def cpu_times_core(self, core):
+        """Return CPU times of a single logical core, or None."""
+        try:
+            return self.cpu_times()[core]
+        except IndexError:
+            return None
+
+    def cpu_times_percent(self):
+        """
+        Return CPU time percentages of every logical core.
+
+        Percentages are measured since the previous call (or since boot
+        for the first one).
+        """
+        times = self.cpu_times()
+        last = self._last_times
+        if last is None:
+            last = [(0.,) * len(t) for t in times]
+        self._last_times = times
+
+        return [times_percent(t1, t2) for t1, t2 in zip(last, times)]
+
+    def cpu_times_percent_core(self, core):
+        """
+        Return CPU time percentages of a single logical core, or None.
+
+        Percentages are measured since the previous call for the same
+        core (or since boot for the first one).
+        """
+        times = self.cpu_times_core(core)
+        if times is None:
+            return None
+
+        last = self._last_core_times.get(core, (0.,) * len(times))
+        self._last_core_times[core] = times
+        return times_percent(last, times)
+
+    def virtual_memory(self):
+        """Return RAM metrics (as ``psutil.virtual_memory()``)."""
+        raise NotImplementedError
+
+    def swap_memory(self, counters=True):
+        """
+        Return swap metrics (as ``psutil.swap_memory()``).
+
+        If **counters** is false, ``sin`` and ``sout`` may be omitted.
+        """
+        raise NotImplementedError
+
+    def uptime(self):
+        """Return seconds since boot."""
+        raise NotImplementedError
+
+
+class PsutilBackend(Backend):
+    """Backend retrieving metrics with psutil."""
+
+    name = 'psutil'
+
+    #: Boot time (``None`` until first use)
+    _boot_time = None
+
+    def cpu_times(self):
+        """Return CPU times of every logical core."""
+        return [tuple(float(round(v, 2)) for v in cpu)
+                for cpu in psutil.cpu_times(percpu=True)]
+
+    def cpu_times_percent(self):
+        """Return CPU time percentages since the previous call."""
+        return psutil.cpu_times_percent(percpu=True)
+
+    def cpu_times_percent_core(self, core):
+        """Return CPU time percentages of a single core, or None."""
+        try:
+            return self.cpu_times_percent()[core]
+        except IndexError:
+            return None
+
+    def virtual_memory(self):
+        """Return RAM metrics."""
+        return OrderedDict(psutil.virtual_memory()._asdict())
+
+    def swap_memory(self, counters=True):
+        """Return swap metrics."""
+        return OrderedDict(psutil.swap_memory()._asdict())
+
+    def uptime(self):
+        """Return seconds since boot."""
+        if self._boot_time is None:
+            self._boot_time = psutil.boot_time()
+        return time.time() - self._boot_time
+
+
+class ProcfsBackend(Backend):
+    """Backend parsing Linux procfs directly."""
+
+    name = 'procfs'
+
+    def cpu_times(self):
+        """Return CPU times of every logical core."""
+        count = len(self.cpu_fields)
+        return [_procfs.parse_cpu_times(line, count)
+                for line in _procfs.read(_procfs.STAT_PATH).splitlines()
+                if line.startswith(b'cpu') and line[3:4] != b' ']
+
+    def cpu_times_core(self, core):
+        """Return CPU times of a single logical core, or None."""
+        if core < 0:
+            return super(ProcfsBackend, self).cpu_times_core(core)
+        return _procfs.cpu_times(core, len(self.cpu_fields))
+
+    def virtual_memory(self):
+        """Return RAM metrics."""
+        mems = _procfs.meminfo()
+
+        total = mems[b'MemTotal:']
+        free = mems[b'MemFree:']
+        buffers = mems.get(b'Buffers:', 0)
+        cached = mems.get(b'Cached:', 0) + mems.get(b'SReclaimable:', 0)
+        available = mems.get(b'MemAvailable:', 0)
+        if available == 0:
+            # Kernels before 3.14 (and some broken ones)
+            available = free + buffers + cached
+        elif available > total:
+            # Inside some containers
+            available = free
+
+        return OrderedDict((
+            ('total', total),
+            ('available', available),
+            ('percent', _usage_percent(total - available, total)),
+            ('used', total - available),
+            ('free', free),
+            ('active', mems.get(b'Active:', 0)),
+            ('inactive', mems.get(b'Inactive:', 0)),
+            ('buffers', buffers),
+            ('cached', cached),
+            ('shared', mems.get(b'Shmem:', mems.get(b'MemShared:', 0))),
+            ('slab', mems.get(b'Slab:', 0)),
+        ))
+
+    def swap_memory(self, counters=True):
+        """Return swap metrics (``sin`` and ``sout`` only if counters)."""
+        mems = _procfs.meminfo()
+
+        total = mems.get(b'SwapTotal:', 0)
+        free = mems.get(b'SwapFree:', 0)
+
+        metrics = OrderedDict((
+            ('total', total),
+            ('used', total - free),
+            ('free', free),
+            ('percent', _usage_percent(total - free, total)),
+        ))
+
+        if counters:
+            vmstat = _procfs.vmstat((b'pswpin', b'pswpout'))
+            # Values are given in 4 KiB pages
+            metrics['sin'] = vmstat.get(b'pswpin', 0) * 4096
+            metrics['sout'] = vmstat.get(b'pswpout', 0) * 4096
+        return metrics
+
+    def uptime(self):
+        """Return seconds since boot."""
+        return _procfs.uptime()
+
+
+#: Available backends
+BACKENDS = OrderedDict((
+    ('psutil', PsutilBackend),
+    ('procfs', ProcfsBackend),
+))
+
+#: Current backend
+_backend = None
+
+
+def get_backend():
+    """
+    Return current backend.
+
+    :rtype: jacoren._backends.Backend
+    """
+    if _backend is None:
+        set_backend(os.environ.get('JACOREN_BACKEND'))
+    return _backend
+
+
+def set_backend(name=None):
+    """
+    Set backend used by collectors.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.set_backend('psutil')
+    >>> jacoren.get_backend().name
+    'psutil'
+
+    :param name: Backend name (``psutil`` or ``procfs``). If ``None``,
+                 default backend for current platform is set.
+    :type name: str, None
+    :raises ValueError: If backend is unknown or not available on current
+                        platform
+    """
+    global _backend
+
+    if name is None:
+        name = 'procfs' if psutil.LINUX else 'psutil'
+
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError("unknown backend: %r" % (name,))
+
+    if cls is ProcfsBackend and not psutil.LINUX:
+        raise ValueError("backend %r is available only on Linux" % (name,))
+
+    _backend = cls()
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+Binary encodings of responses, negotiated with ``Accept`` header.
+
+JSON stays the default; binary encodings are only used if client asks
+for them explicitly:
+
+* ``application/msgpack`` - MessagePack encoding of the same data as JSON
+  (requires ``msgpack`` package), available for every JSON resource,
+* ``application/vnd.jacoren.packed`` - fixed-layout packed doubles of
+  per-core arrays, available for ``/cpu/load`` and ``/cpu/load/<core>``.
+
+Packed format (all numbers little-endian)::
+
+    offset  size  content
+    0       4     magic b'JCPK'
+    4       1     format version (1)
+    5       1     number of fields F
+    6       2     number of rows R (uint16)
+    8       ...   F field names, each as length (uint8) and ASCII bytes
+    ...     ...   zero padding to a multiple of 8 bytes
+    ...     8*R*F values (float64), row-major: F values of every core
+
+For ``/cpu/load``, rows are logical cores and fields are CPU time fields
+(plus ``used`` for percentages), in the same order as in JSON.
+"""
+
+import sys
+import struct
+from array import array
+
+
+#: MIME type of JSON
+JSON = 'application/json'
+
+#: MIME type of MessagePack
+MSGPACK = 'application/msgpack'
+
+#: MIME type of packed doubles
+PACKED = 'application/vnd.jacoren.packed'
+
+#: Magic bytes of packed format
+MAGIC = b'JCPK'
+
+#: Version of packed format
+VERSION = 1
+
+#: Header of packed format
+_header = struct.Struct('<4sBBH')
+
+
+def _msgpack():
+    """Return MessagePack encoder, or ``None`` if it is not installed."""
+    try:
+        import msgpack
+    except ImportError:
+        return None
+
+    packer = msgpack.Packer(use_bin_type=True)
+    return packer.pack
+
+
+#: MessagePack encoder (``False`` until first use)
+_msgpack_dumps = False
+
+
+def msgpack_dumps():
+    """Return MessagePack encoder, or ``None`` if it is not installed."""
+    global _msgpack_dumps
+
+    if _msgpack_dumps is False:
+        _msgpack_dumps = _msgpack()
+    return _msgpack_dumps
+
+
+def _packed(fields, rows, values):
+    """Return header and values in packed format."""
+    names = b''.join(struct.pack('<B', len(name)) + name.encode('ascii')
+                     for name in fields)
+    head = _header.pack(MAGIC, VERSION, len(fields), rows) + names
+    head += b'\0' * (-len(head) % 8)
+
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return head + values.tobytes()
+
+
+def pack(fields, rows):
+    """
+    Return rows of floats in packed format.
+
+    :param fields: Names of fields
+    :param rows: Sequences of values of every field
+    :type fields: tuple
+    :type rows: list
+    :rtype: bytes
+    """
+    values = array('d')
+    for row in rows:
+        values.extend(row)
+    return _packed(fields, len(rows), values)
+
+
+def pack_load(fields, rows, cpu_time, names=None):
+    """
+    Return CPU load (as tuples of CPU times fields) in packed format.
+
+    Unless CPU load is given as CPU times, ``used`` field is appended.
+
+    :param fields: Names of CPU times fields
+    :param rows: CPU times (or their percentages) of every core
+    :param cpu_time: If true, rows are CPU times
+    :param names: If isn't ``None``, only these fields are packed
+    :type fields: tuple
+    :type rows: list
+    :type cpu_time: bool
+    :type names: tuple, None
+    :rtype: bytes
+    """
+    if names is None:
+        if cpu_time:
+            return pack(fields, rows)
+        names = tuple(fields) + ('used',)
+
+    # Index of every packed field, None for used
+    indices = [None if name == 'used' else list(fields).index(name)
+               for name in names]
+    idle = list(fields).index('idle')
+
+    values = array('d')
+    if indices == list(range(len(fields))):
+        for row in rows:
+            values.extend(row)
+    elif indices == list(range(len(fields))) + [None]:
+        for row in rows:
+            values.extend(row)
+            values.append(round(100. - row[idle], 2))
+    else:
+        for row in rows:
+            values.extend(round(100. - row[idle], 2) if i is None else row[i]
+                          for i in indices)
+    return _packed(tuple(names), len(rows), values)
+
+
+def unpack(data):
+    """
+    Return field names and rows of packed data.
+
+    :type data: bytes
+    :rtype: tuple
+    :raises ValueError: If data is not in packed format
+    """
+    try:
+        magic, version, count, rows = _header.unpack_from(data)
+    except struct.error:
+        raise ValueError("data too short")
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not packed data (version %d)" % (VERSION,))
+
+    offset = _header.size
+    fields = []
+    for _ in range(count):
+        length = struct.unpack_from('<B', data, offset)[0]
+        fields.append(data[offset + 1:offset + 1 + length].decode('ascii'))
+        offset += 1 + length
+    offset += -offset % 8
+
+    values = array('d')
+    values.frombytes(data[offset:offset + 8 * rows * count])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return tuple(fields), [tuple(values[i:i + count])
+                           for i in range(0, len(values), count)]
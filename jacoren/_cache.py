@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for caching responses.
+
+Cached responses carry an ``ETag`` (so clients sending a matching
+``If-None-Match`` get ``304 Not Modified`` without body) and
+``Cache-Control: max-age`` set to the remaining lifetime of the cached
+response, so reverse proxies can cache them as well.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from jacoren._history import parse_duration
+from jacoren._sampler import _clock
+
+
+#: ``max-age`` (in seconds) of resources that never change
+STATIC_MAX_AGE = 86400
+
+#: Max number of cached responses
+MAX_ENTRIES = 1024
+
+#: Max number of paths whose matched TTLs are kept
+MAX_PATHS = 1024
+
+#: TTL key matching every route
+ANY_ROUTE = '*'
+
+
+def parse_ttls(value):
+    """
+    Return TTLs of routes.
+
+    TTLs are given as comma-separated ``ROUTE=TTL`` pairs, e.g.
+    ``/disks=5s,/machine=1,*=0.5``. Routes are given as in API help
+    (e.g. ``/cpu/load/<core>``); ``*`` matches every route without its
+    own TTL. TTL is a duration (see :func:`jacoren._history.parse_duration`).
+
+    :type value: str
+    :rtype: dict
+    :raises ValueError: If value is not valid
+    """
+    ttls = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+
+        route, sep, ttl = item.rpartition('=')
+        if not sep or not route.strip():
+            raise ValueError("invalid route TTL: %r" % (item,))
+        ttls[route.strip()] = parse_duration(ttl)
+    return ttls
+
+
+def _etag_matches(etag, header):
+    """Return True if ``If-None-Match`` request header matches ETag."""
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag == etag or tag == 'W/' + etag:
+            return True
+    return False
+
+
+class CachedResponse(object):
+    """
+    Pre-encoded response with ETag.
+
+    Body and headers are built once, so serving it costs only a call
+    to ``start_response``. So are compressed variants of body: each is
+    built on first request accepting its coding and then kept.
+    """
+
+    def __init__(self, body, headers, ttl=None, compressor=None):
+        """
+        Prepare headers.
+
+        :param body: Encoded body
+        :param headers: Headers (without ``Content-Length``)
+        :param ttl: Seconds response is valid for. If ``None``, it never
+                    expires.
+        :param compressor: If given, body is compressed with coding
+                           negotiated with it
+        :type body: bytes
+        :type headers: list
+        :type ttl: float, None
+        :type compressor: jacoren._compress.Compressor, None
+        """
+        self.body = body
+        self.etag = '"%s"' % (hashlib.sha1(body).hexdigest()[:20],)
+        self.expires = None if ttl is None else _clock() + ttl
+        self.compressor = compressor
+
+        self.headers = list(headers)
+        if compressor is not None and len(body) >= compressor.min_size:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+        else:
+            self.compressor = None
+        if ttl is None:
+            self.headers.append(('Cache-Control',
+                                 'max-age=%d' % (STATIC_MAX_AGE,)))
+
+        #: Body, ETag and headers of identity and compressed variants
+        self._variants = {None: self._variant(body, self.etag)}
+
+    def _variant(self, body, etag, coding=None):
+        """Return body, ETag and headers of variant."""
+        headers = self.headers + [
+            ('Content-Length', str(len(body))),
+            ('ETag', etag),
+        ]
+        if coding is not None:
+            headers.append(('Content-Encoding', coding))
+        return body, etag, headers
+
+    def variant(self, coding):
+        """Return body, ETag and headers of variant of given coding."""
+        try:
+            return self._variants[coding]
+        except KeyError:
+            # Compressed variants are distinct representations
+            variant = self._variants[coding] = self._variant(
+                self.compressor.compress(self.body, coding),
+                '%s-%s"' % (self.etag[:-1], coding),
+                coding,
+            )
+            return variant
+
+    @property
+    def fresh(self):
+        """Return True if response has not expired."""
+        return self.expires is None or _clock() < self.expires
+
+    def __call__(self, environ, start_response):
+        """Act as WSGI application."""
+        coding = None
+        if self.compressor is not None:
+            coding = self.compressor.choose(
+                environ.get('HTTP_ACCEPT_ENCODING')
+            )
+        body, etag, headers = self.variant(coding)
+
+        if self.expires is not None:
+            max_age = max(int(self.expires - _clock()), 0)
+            headers = headers + [('Cache-Control', 'max-age=%d' % (max_age,))]
+
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and _etag_matches(etag, if_none_match):
+            start_response('304 Not Modified', [
+                header for header in headers if header[0] != 'Content-Length'
+            ])
+            return []
+
+        start_response('200 OK', headers)
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return []
+        return [body]
+
+
+class ResponseCache(object):
+    """Cache of responses with per-route TTLs."""
+
+    def __init__(self, ttls, paths, compressor=None):
+        """
+        Init empty cache.
+
+        :param ttls: Mapping of routes to TTLs (see :func:`parse_ttls`)
+        :param paths: Routes of server
+        :param compressor: If given, cached responses are compressed
+                           with coding negotiated with it
+        :type ttls: dict
+        :type paths: werkzeug.routing.Map
+        :type compressor: jacoren._compress.Compressor, None
+        """
+        self.ttls = ttls
+        self.paths = paths
+        self.compressor = compressor
+
+        #: TTLs of recently matched paths, least recently used first
+        self._path_ttls = OrderedDict()
+        self._path_ttls_lock = threading.Lock()
+        #: Cached responses by path and query
+        self._entries = {}
+
+    @staticmethod
+    def _key(environ):
+        """Return cache key of request (responses vary by ``Accept``)."""
+        return '%s?%s %s' % ((environ.get('PATH_INFO') or '/').rstrip('/'),
+                             environ.get('QUERY_STRING', ''),
+                             environ.get('HTTP_ACCEPT', ''))
+
+    def ttl(self, environ):
+        """Return TTL of requested route (0 if it is not cached)."""
+        path = environ.get('PATH_INFO') or '/'
+        path_ttls = self._path_ttls
+        with self._path_ttls_lock:
+            ttl = path_ttls.pop(path, None)
+            if ttl is not None:
+                path_ttls[path] = ttl
+                return ttl
+
+        try:
+            rule, _ = self.paths.bind_to_environ(environ).match(
+                return_rule=True
+            )
+        except Exception:
+            return 0
+
+        ttl = self.ttls.get(rule.doc_rule,
+                            self.ttls.get(rule.rule,
+                                          self.ttls.get(ANY_ROUTE, 0)))
+        # Paths are unbounded (e.g. /cpu/load/<core>), so are not kept forever
+        with self._path_ttls_lock:
+            while len(path_ttls) >= MAX_PATHS:
+                path_ttls.popitem(last=False)
+            path_ttls[path] = ttl
+        return ttl
+
+    def get(self, environ):
+        """Return fresh cached response to request, if any."""
+        if environ.get('REQUEST_METHOD', 'GET') not in ('GET', 'HEAD'):
+            return None
+
+        entry = self._entries.get(self._key(environ))
+        if entry is not None and entry.fresh:
+            return entry
+        return None
+
+    def store(self, environ, response):
+        """
+        Cache response if its route has a TTL.
+
+        :param response: Response to request
+        :type response: werkzeug.wrappers.Response
+        :returns: Cached response or, if response is not cached, given one
+        """
+        if (isinstance(response, CachedResponse) or
+                response.status_code != 200 or response.is_streamed or
+                environ.get('REQUEST_METHOD', 'GET') not in ('GET', 'HEAD')):
+            return response
+
+        ttl = self.ttl(environ)
+        if not ttl:
+            return response
+
+        entries = self._entries
+        if len(entries) >= MAX_ENTRIES:
+            for key, entry in list(entries.items()):
+                if not entry.fresh:
+                    entries.pop(key, None)
+            if len(entries) >= MAX_ENTRIES:
+                entries.clear()
+
+        entry = entries[self._key(environ)] = CachedResponse(
+            response.get_data(),
+            [header for header in response.headers
+             if header[0] != 'Content-Length'],
+            ttl,
+            self.compressor,
+        )
+        return entry
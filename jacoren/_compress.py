@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for compressing responses.
+
+Content coding is negotiated with ``Accept-Encoding`` request header out
+of:
+
+* ``zstd`` - if ``zstandard`` package is installed,
+* ``gzip``,
+* ``deflate``.
+
+If client accepts several of them equally, they are preferred in above
+order. Responses smaller than a threshold are never compressed, as
+compression would not pay off.
+"""
+
+import zlib
+from collections import OrderedDict
+
+
+#: Size (in bytes) of smallest compressed body
+MIN_SIZE = 1024
+
+#: Compression level of gzip and deflate (zlib levels 1 to 9)
+LEVEL = 6
+
+#: Compression level of zstd
+ZSTD_LEVEL = 3
+
+#: Max number of memoized Accept-Encoding headers
+_MAX_HEADERS = 256
+
+
+def _gzip(level):
+    """Return gzip compressor."""
+    def compress(data):
+        compressor = zlib.compressobj(level, zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return compress
+
+
+def _deflate(level):
+    """Return deflate (zlib format) compressor."""
+    def compress(data):
+        return zlib.compress(data, level)
+    return compress
+
+
+def _zstd(level):
+    """Return zstd compressor (of ``ZSTD_LEVEL``, zlib level is ignored)."""
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+
+
+#: Available codings, preferred first
+CODINGS = OrderedDict((
+    ('zstd', _zstd),
+    ('gzip', _gzip),
+    ('deflate', _deflate),
+))
+
+
+def parse_accept_encoding(value):
+    """
+    Return qualities of codings accepted by client.
+
+    :param value: ``Accept-Encoding`` header
+    :type value: str
+    :returns: Mapping of codings (lowercase, ``*`` included) to qualities
+    :rtype: dict
+    """
+    qualities = {}
+    for item in value.split(','):
+        params = item.split(';')
+        coding = params[0].strip().lower()
+        if not coding:
+            continue
+
+        quality = 1.
+        for param in params[1:]:
+            name, _, number = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0.
+        qualities[coding] = quality
+    return qualities
+
+
+class Compressor(object):
+    """Compressor of response bodies with negotiated coding."""
+
+    def __init__(self, min_size=MIN_SIZE, level=LEVEL):
+        """
+        Init compressor with installed codings.
+
+        :param min_size: Size (in bytes) of smallest compressed body
+        :param level: Compression level of gzip and deflate
+        :type min_size: int
+        :type level: int
+        """
+        self.min_size = min_size
+
+        self.codings = OrderedDict()
+        for name, factory in CODINGS.items():
+            try:
+                self.codings[name] = factory(level)
+            except ImportError:
+                continue
+
+        #: Negotiated codings of Accept-Encoding headers
+        self._chosen = {}
+
+    def choose(self, accept_encoding):
+        """
+        Return coding of response to request, or ``None``.
+
+        :param accept_encoding: ``Accept-Encoding`` header
+        :type accept_encoding: str, None
+        :rtype: str, None
+        """
+        if not accept_encoding:
+            return None
+
+        try:
+            return self._chosen[accept_encoding]
+        except KeyError:
+            pass
+
+        qualities = parse_accept_encoding(accept_encoding)
+        default = qualities.get('*', 0.)
+
+        chosen, best = None, 0.
+        for name in self.codings:
+            quality = qualities.get(name, default)
+            if quality > best:
+                chosen, best = name, quality
+
+        if len(self._chosen) >= _MAX_HEADERS:
+            self._chosen.clear()
+        self._chosen[accept_encoding] = chosen
+        return chosen
+
+    def compress(self, data, coding):
+        """Return data compressed with given coding."""
+        return self.codings[coding](data)
+
+    def apply(self, environ, response):
+        """
+        Compress body of response in place, if it pays off.
+
+        :param response: Response to request
+        :type response: werkzeug.wrappers.Response
+        :returns: Given response
+        """
+        if (response.is_streamed or response.status_code != 200 or
+                'Content-Encoding' in response.headers):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.headers.add('Vary', 'Accept-Encoding')
+        coding = self.choose(environ.get('HTTP_ACCEPT_ENCODING'))
+        if coding is not None:
+            response.set_data(self.compress(data, coding))
+            response.headers['Content-Encoding'] = coding
+        return response
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for incremental (delta-encoded) responses.
+
+Resource is flattened into leaf values addressed by JSON Pointers
+(RFC 6901), e.g. ``/0/mountpoint`` or ``/ram/available``. Client sending
+a token of a previously received snapshot (``since``) gets only leaves
+that changed since then::
+
+    {
+        'token': <token of current snapshot>,
+        'since': <token sent by client>,
+        'changed': {<pointer>: <new value>, ...},
+        'removed': [<pointer>, ...]
+    }
+
+``removed`` lists the topmost pointers that no longer exist (e.g. whole
+``/3`` of a list that shrank). Clients remove them (in reverse order),
+then set ``changed`` values (see :func:`apply`). A container that is new
+or changed its type (e.g. a leaf or an object that became a list) is
+sent whole, as a single changed value at its pointer.
+
+If the token is unknown (e.g. expired or issued by another worker), the
+whole resource is sent instead::
+
+    {
+        'token': <token of current snapshot>,
+        'since': None,
+        'data': <resource>
+    }
+
+Only a few recent snapshots of every resource are kept. Consecutive
+snapshots with the same structure share their pointers, so keeping them
+costs little more than their values.
+"""
+
+import os
+import binascii
+import threading
+from collections import OrderedDict
+
+
+#: Snapshots kept per resource
+SNAPSHOTS = 4
+
+#: Max number of resources with kept snapshots
+MAX_RESOURCES = 128
+
+
+def _escape(key):
+    """Return key escaped as JSON Pointer reference token."""
+    return key.replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token):
+    """Return key of JSON Pointer reference token."""
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def _is_container(value):
+    """Return True if flattened value marks a container."""
+    return value is dict or value is list
+
+
+def flatten(data, prefix='', paths=None, values=None):
+    """
+    Return pointers and values of data, in pre-order.
+
+    Containers are given as their types (``dict`` or ``list``), followed
+    by their items, so a change of container type is detected as any
+    other change.
+
+    :rtype: tuple
+    """
+    if paths is None:
+        paths, values = [], []
+
+    if isinstance(data, dict):
+        paths.append(prefix)
+        values.append(dict)
+        for key, value in data.items():
+            flatten(value, prefix + '/' + _escape(key), paths, values)
+    elif isinstance(data, list):
+        paths.append(prefix)
+        values.append(list)
+        for i, value in enumerate(data):
+            flatten(value, prefix + '/%d' % (i,), paths, values)
+    else:
+        paths.append(prefix)
+        values.append(data)
+    return paths, values
+
+
+def _subtree(paths, values, start):
+    """
+    Return data of flattened subtree and index of the first entry after it.
+
+    :param start: Index of root of subtree
+    """
+    root = values[start]
+    if not _is_container(root):
+        return root, start + 1
+
+    root = root()
+    containers = {paths[start]: root}
+    prefix = paths[start] + '/'
+
+    i = start + 1
+    while i < len(paths) and paths[i].startswith(prefix):
+        parent, _, token = paths[i].rpartition('/')
+        value = values[i]
+        if _is_container(value):
+            value = containers[paths[i]] = value()
+
+        container = containers[parent]
+        if isinstance(container, list):
+            container.append(value)
+        else:
+            container[_unescape(token)] = value
+        i += 1
+    return root, i
+
+
+def _differ(a, b):
+    """Return True if JSON values differ (``1``, ``1.0`` and ``True`` do)."""
+    return type(a) is not type(b) or a != b
+
+
+def _parent(path):
+    """Return pointer of parent container."""
+    return path[:path.rindex('/')]
+
+
+def _within(path, pointers):
+    """Return True if path is a descendant of any of pointers."""
+    while path:
+        path = _parent(path)
+        if path in pointers:
+            return True
+    return False
+
+
+def diff(old, new):
+    """
+    Return values changed and pointers removed between snapshots.
+
+    :param old: Pointers and values of old snapshot
+    :param new: Pointers and values of new snapshot
+    :type old: tuple
+    :type new: tuple
+    :returns: List of changed (pointer, value) pairs and list of removed
+              pointers
+    :rtype: tuple
+    """
+    old_paths, old_values = old
+    new_paths, new_values = new
+
+    if old_paths is new_paths:
+        # Same structure, compare values in place
+        old_leaves = None
+        candidates = [i for i, (a, b) in enumerate(zip(old_values,
+                                                       new_values))
+                      if _differ(a, b)]
+    else:
+        old_leaves = dict(zip(old_paths, old_values))
+        missing = object()
+        candidates = [i for i, (path, b) in enumerate(zip(new_paths,
+                                                          new_values))
+                      if _differ(old_leaves.get(path, missing), b)]
+
+    changed = []
+    # Changed pointers of containers, their old items are not removed
+    replaced = set()
+    end = 0
+    for i in candidates:
+        if i < end:
+            # Already sent within a whole container
+            continue
+
+        path, value = new_paths[i], new_values[i]
+        if old_leaves is None:
+            before = old_values[i]
+        else:
+            before = old_leaves.get(path)
+
+        if _is_container(value):
+            # New container or container of other type, send it whole
+            value, end = _subtree(new_paths, new_values, i)
+            replaced.add(path)
+        elif _is_container(before):
+            replaced.add(path)
+        changed.append((path, value))
+
+    if old_leaves is None:
+        return changed, []
+
+    new_leaves = set(new_paths)
+    removed = []
+    seen = set()
+    for path in old_paths:
+        if path in new_leaves:
+            continue
+        # Report topmost pointers that no longer exist
+        while _parent(path) not in new_leaves:
+            path = _parent(path)
+        if path not in seen and not _within(path, replaced):
+            seen.add(path)
+            removed.append(path)
+    return changed, removed
+
+
+def _index(container, token):
+    """Return key of reference token in container."""
+    return int(token) if isinstance(container, list) else _unescape(token)
+
+
+def apply(data, delta):
+    """
+    Return data updated with delta (as returned by :class:`DeltaStore`).
+
+    Data is updated in place where possible.
+
+    :param data: Resource of snapshot delta was computed against
+    :param delta: Delta response
+    :type delta: dict
+    """
+    if 'data' in delta:
+        return delta['data']
+
+    for path in reversed(delta['removed']):
+        tokens = path.split('/')[1:]
+        container = data
+        for token in tokens[:-1]:
+            container = container[_index(container, token)]
+        del container[_index(container, tokens[-1])]
+
+    for path, value in delta['changed'].items():
+        if not path:
+            data = value
+            continue
+
+        tokens = path.split('/')[1:]
+        container = data
+        for token in tokens[:-1]:
+            container = container[_index(container, token)]
+
+        key = _index(container, tokens[-1])
+        if isinstance(container, list) and key == len(container):
+            container.append(value)
+        else:
+            container[key] = value
+    return data
+
+
+class DeltaStore(object):
+    """Recent snapshots of resources, identified by tokens."""
+
+    def __init__(self, snapshots=SNAPSHOTS, resources=MAX_RESOURCES):
+        """
+        Init empty store.
+
+        :param snapshots: Number of snapshots kept per resource
+        :param resources: Max number of resources with kept snapshots
+        :type snapshots: int
+        :type resources: int
+        """
+        self.snapshots = snapshots
+        self.resources = resources
+
+        #: Tokens are unique to this store (and process)
+        self._prefix = binascii.hexlify(os.urandom(4)).decode('ascii')
+        self._counter = 0
+
+        #: Snapshots by resource key, least recently used first
+        self._resources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, key, snapshot):
+        """Keep snapshot of resource and return its token."""
+        history = self._resources.pop(key, None)
+        if history is None:
+            history = OrderedDict()
+            while len(self._resources) >= self.resources:
+                self._resources.popitem(last=False)
+        self._resources[key] = history
+
+        if history:
+            latest_token = next(reversed(history))
+            latest = history[latest_token]
+            if latest[0] == snapshot[0]:
+                if latest[1] == snapshot[1]:
+                    # Nothing changed, reuse token
+                    return latest_token
+                # Share pointers of identical structure
+                snapshot = (latest[0], snapshot[1])
+
+        self._counter += 1
+        token = '%s-%d' % (self._prefix, self._counter)
+        history[token] = snapshot
+        while len(history) > self.snapshots:
+            history.popitem(last=False)
+        return token
+
+    def update(self, key, data, since, mapping=OrderedDict):
+        """
+        Return delta of resource since snapshot of given token.
+
+        :param key: Resource key (e.g. path and query of request)
+        :param data: Current resource
+        :param since: Token of snapshot known to client (may be empty)
+        :param mapping: Mapping type of response
+        :type key: str
+        :type since: str
+        :returns: Delta response (see :mod:`jacoren._delta`)
+        """
+        paths, values = flatten(data)
+        snapshot = (tuple(paths), tuple(values))
+
+        with self._lock:
+            old = self._resources.get(key, {}).get(since)
+            token = self._store(key, snapshot)
+            if old is not None:
+                # Snapshot may have been replaced by one sharing pointers
+                snapshot = self._resources[key].get(token, snapshot)
+
+        if old is None:
+            return mapping((
+                ('token', token),
+                ('since', None),
+                ('data', data),
+            ))
+
+        changed, removed = diff(old, snapshot)
+        return mapping((
+            ('token', token),
+            ('since', since),
+            ('changed', mapping(changed)),
+            ('removed', removed),
+        ))
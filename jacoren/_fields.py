@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for field projection.
+
+Fields are given as dotted paths, e.g. ``load.used`` or ``ram.available``.
+They are parsed into a tree passed down to collectors, so metrics that
+are not requested are never read nor converted.
+"""
+
+
+def parse_fields(fields):
+    """
+    Return tree of requested fields.
+
+    Tree is a dict mapping names to subtrees; ``None`` stands for
+    the whole value. E.g. ``'load.used,freq'`` gives::
+
+        {'load': {'used': None}, 'freq': None}
+
+    :param fields: Comma-separated dotted paths or an iterable of them.
+                   If ``None``, every field is requested.
+    :type fields: str, list, None
+    :returns: Tree of fields or ``None`` if every field is requested
+    :rtype: dict, None
+    :raises ValueError: If a path is empty
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, dict):
+        return fields
+    if isinstance(fields, str):
+        fields = fields.split(',')
+
+    tree = {}
+    for path in fields:
+        names = path.strip().split('.')
+        if not all(names):
+            raise ValueError("invalid field: %r" % (path,))
+
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                # Whole value is already requested
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+def subtree(tree, name):
+    """Return subtree of field, ``None`` if the whole value is requested."""
+    return None if tree is None else tree[name]
+
+
+def check(tree, names, prefix=''):
+    """
+    Check that tree requests only given fields.
+
+    :raises ValueError: If unknown field is requested
+    """
+    if tree is None:
+        return
+
+    for name in tree:
+        if name not in names:
+            raise ValueError("unknown field: %r" % (prefix + name,))
+
+
+def leaves(tree, names, prefix=''):
+    """
+    Return requested fields out of given ones (keeping their order).
+
+    :param tree: Tree of fields with no nested subtrees
+    :param names: Available fields
+    :param prefix: Prefix of fields in error messages, e.g. ``'load.'``
+    :type tree: dict, None
+    :type names: tuple
+    :type prefix: str
+    :returns: Requested fields or ``None`` if every field is requested
+    :rtype: tuple, None
+    :raises ValueError: If unknown or nested field is requested
+    """
+    if tree is None:
+        return None
+
+    check(tree, names, prefix)
+    for name, node in tree.items():
+        if node is not None:
+            raise ValueError("unknown field: %r"
+                             % (prefix + name + '.' + next(iter(node)),))
+    return tuple(name for name in names if name in tree)
+
+
+def project(metrics, tree, mapping, prefix=''):
+    """Return only requested fields of flat mapping."""
+    names = leaves(tree, tuple(metrics), prefix)
+    if names is None:
+        return metrics
+    return mapping((name, metrics[name]) for name in names)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for keeping metrics history."""
+
+import re
+import threading
+from array import array
+
+
+class RingBuffer(object):
+    """
+    Fixed-size history of samples.
+
+    Every sample is a timestamp and a fixed number (**width**) of values.
+    All values are kept as packed doubles in a single preallocated array,
+    so memory used by buffer is ``8 * (width + 1) * capacity`` bytes,
+    regardless of how many samples were appended.
+    """
+
+    def __init__(self, width, capacity):
+        """Allocate buffer."""
+        if width <= 0 or capacity <= 0:
+            raise ValueError("width and capacity must be positive")
+
+        self.width = width
+        self.capacity = capacity
+
+        self._values = array('d', [0.]) * (width * capacity)
+        self._times = array('d', [0.]) * capacity
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Return number of samples in buffer."""
+        return self._count
+
+    def append(self, timestamp, values):
+        """Append sample, overwriting the oldest one if buffer is full."""
+        width = self.width
+        if len(values) != width:
+            raise ValueError("expected %d values, got %d" % (width,
+                                                             len(values)))
+
+        with self._lock:
+            i = self._next
+            self._times[i] = timestamp
+            self._values[i * width:(i + 1) * width] = array('d', values)
+
+            self._next = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def since(self, timestamp=None):
+        """
+        Return samples taken at or after timestamp, oldest first.
+
+        Returns tuple ``(timestamps, values)`` of two arrays, where
+        **values** holds ``width`` values of every sample one after
+        another.
+        """
+        with self._lock:
+            count, end, width = self._count, self._next, self.width
+            start = (end - count) % self.capacity
+
+            if start + count <= self.capacity:
+                times = self._times[start:start + count]
+                values = self._values[start * width:(start + count) * width]
+            else:
+                times = self._times[start:] + self._times[:end]
+                values = (self._values[start * width:] +
+                          self._values[:end * width])
+
+        if timestamp is not None:
+            skip = 0
+            while skip < count and times[skip] < timestamp:
+                skip += 1
+            times = times[skip:]
+            values = values[skip * width:]
+
+        return times, values
+
+
+#: Duration units (in seconds)
+_units = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+#: Duration format, e.g. ``60``, ``60s``, ``5m``, ``1.5h``
+_duration_re = re.compile(r'^\s*(\d+(?:\.\d*)?)\s*([smhd]?)\s*$')
+
+
+def parse_duration(value):
+    """
+    Return duration in seconds.
+
+    Duration is a number with an optional unit: ``s`` (default), ``m``,
+    ``h`` or ``d``.
+
+    :raises ValueError: If value is not a valid duration
+    """
+    match = _duration_re.match(value)
+    if match is None:
+        raise ValueError("invalid duration: %r" % (value,))
+
+    number, unit = match.groups()
+    return float(number) * _units[unit]
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+"""
+Encoders of JSON responses.
+
+Fastest installed encoder is used:
+
+* ``orjson``,
+* ``ujson``,
+* ``json`` - standard library, always available.
+
+All of them produce compact JSON (without whitespace) as UTF-8 encoded
+bytes, with non-ASCII characters escaped. Encoder can be changed with
+:func:`set_encoder` or ``JACOREN_JSON`` environment variable.
+
+Output of every encoder decodes to the same data, but it is not always
+byte-for-byte identical:
+
+* floats may be spelled differently, e.g. ``1e-05`` by ``json`` is
+  ``0.00001`` by ``orjson`` and ``1e+20`` is ``1e20``,
+* ``NaN`` and infinities are encoded as ``null`` by ``orjson``, as
+  (invalid JSON) ``NaN``/``Infinity`` by ``json`` and ``ujson`` raises
+  ``OverflowError``.
+
+``orjson`` does not escape non-ASCII characters and does not support
+integers over 64 bits, so such data is encoded by ``json`` instead.
+"""
+
+import os
+import sys
+import json
+from collections import OrderedDict
+
+
+#: Mapping type preserving insertion order, which is fastest to build.
+#: Every encoder keeps order of plain dicts, so on Python 3.7+ internal
+#: collectors may return them instead of OrderedDict instances.
+MAPPING = dict if sys.version_info >= (3, 7) else OrderedDict
+
+
+def _json():
+    """Return standard library encoder."""
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    def dumps(data):
+        return encode(data).encode('utf-8')
+    return dumps
+
+
+def _orjson():
+    """Return orjson encoder (falling back to standard library one)."""
+    import orjson
+
+    encode = orjson.dumps
+    fallback = _json()
+
+    def dumps(data):
+        try:
+            encoded = encode(data)
+        except TypeError:
+            # Integer over 64 bits (other unsupported types fail in both)
+            return fallback(data)
+        if not encoded.isascii():
+            return fallback(data)
+        return encoded
+    return dumps
+
+
+def _ujson():
+    """Return ujson encoder."""
+    import ujson
+
+    def dumps(data):
+        return ujson.dumps(data, ensure_ascii=True,
+                           escape_forward_slashes=False).encode('utf-8')
+    return dumps
+
+
+#: Available encoders, fastest first
+ENCODERS = OrderedDict((
+    ('orjson', _orjson),
+    ('ujson', _ujson),
+    ('json', _json),
+))
+
+#: Current encoder name and function
+_name = None
+_dumps = None
+
+
+def dumps(data):
+    """
+    Return data encoded as compact JSON.
+
+    :rtype: bytes
+    """
+    if _dumps is None:
+        set_encoder(os.environ.get('JACOREN_JSON'))
+    return _dumps(data)
+
+
+def get_encoder():
+    """
+    Return name of current encoder.
+
+    :rtype: str
+    """
+    if _name is None:
+        set_encoder(os.environ.get('JACOREN_JSON'))
+    return _name
+
+
+def set_encoder(name=None):
+    """
+    Set encoder of JSON responses.
+
+    :param name: Encoder name (``orjson``, ``ujson`` or ``json``). If
+                 ``None``, the fastest installed one is set.
+    :type name: str, None
+    :raises ValueError: If encoder is unknown or not installed
+    """
+    global _name, _dumps
+
+    if name is None:
+        for name, factory in ENCODERS.items():
+            try:
+                _dumps = factory()
+            except ImportError:
+                continue
+            _name = name
+            return
+
+    try:
+        factory = ENCODERS[name]
+    except KeyError:
+        raise ValueError("unknown JSON encoder: %r" % (name,))
+
+    try:
+        _dumps = factory()
+    except ImportError:
+        raise ValueError("JSON encoder %r is not installed" % (name,))
+    _name = name
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for exposing metrics in Prometheus text format.
+
+Every scrape formats only the numbers. Metric names, help texts and
+label sets (e.g. ``{core="3",mode="user"}`` or
+``{device="/dev/sda1",mountpoint="/",fstype="ext4"}``) are formatted
+and escaped once, then reused by every following scrape.
+
+See: https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+from jacoren import machine, cpu, memory, disks
+
+
+#: Content type of exposed metrics
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+#: Max number of cached disk label sets
+_MAX_DISK_LABELS = 1024
+
+
+def _escape(value):
+    """Escape label value."""
+    return (value.replace('\\', '\\\\')
+                 .replace('"', '\\"')
+                 .replace('\n', '\\n'))
+
+
+def _format(value):
+    """Format sample value."""
+    if value is None:
+        return 'NaN'
+    if isinstance(value, float):
+        return repr(value)
+    return '%d' % value
+
+
+def _header(name, kind, description):
+    """Return HELP and TYPE lines of metric family."""
+    return '# HELP %s %s\n# TYPE %s %s\n' % (name, description, name, kind)
+
+
+#: Headers of fixed metric families
+_uptime = _header('jacoren_machine_uptime_seconds', 'gauge',
+                  'Machine uptime in seconds.')
+_users = _header('jacoren_machine_users', 'gauge',
+                 'Number of logged users.')
+_cpu_seconds = _header('jacoren_cpu_seconds_total', 'counter',
+                       'Time spent by logical core in each mode.')
+_cpu_used = _header('jacoren_cpu_used_percent', 'gauge',
+                    'Load of logical core in percents.')
+_cpu_freq = tuple(
+    (field, name, _header(name, 'gauge', description))
+    for field, name, description in (
+        ('current', 'jacoren_cpu_frequency_mhz',
+         'Current frequency of logical core in MHz.'),
+        ('min', 'jacoren_cpu_frequency_min_mhz',
+         'Min frequency of logical core in MHz.'),
+        ('max', 'jacoren_cpu_frequency_max_mhz',
+         'Max frequency of logical core in MHz.'),
+    )
+)
+_disk_up = _header('jacoren_disk_up', 'gauge',
+                   'Whether disk usage was retrieved in time.')
+_disk_usage = tuple(
+    (field, name, _header(name, 'gauge', description))
+    for field, name, description in (
+        ('total', 'jacoren_disk_total_bytes', 'Total disk space in bytes.'),
+        ('used', 'jacoren_disk_used_bytes', 'Used disk space in bytes.'),
+        ('free', 'jacoren_disk_free_bytes', 'Free disk space in bytes.'),
+    )
+)
+
+#: Swap fields exposed as counters
+_swap_counters = {
+    'sin': ('jacoren_memory_swap_in_bytes_total',
+            'Bytes swapped in from disk.'),
+    'sout': ('jacoren_memory_swap_out_bytes_total',
+             'Bytes swapped out to disk.'),
+}
+
+
+class MetricsRenderer(object):
+    """
+    Renderer of all metrics collected by jacoren.
+
+    Label sets and metric families are built lazily (when a core, mount
+    or memory field is seen for the first time) and cached.
+    """
+
+    def __init__(self):
+        """Init empty caches."""
+        #: Per core ``{core="N"}`` labels
+        self._cores = []
+        #: Per core and mode ``{core="N",mode="M"}`` labels
+        self._core_modes = {}
+        #: Per disk ``{device=...,mountpoint=...,fstype=...}`` labels
+        self._disks = {}
+        #: Per memory field family header and sample name
+        self._memory = {}
+
+    def _core(self, core):
+        """Return label set of a single logical core."""
+        cores = self._cores
+        while len(cores) <= core:
+            cores.append('{core="%d"} ' % len(cores))
+        return cores[core]
+
+    def _core_mode(self, core, mode):
+        """Return label set of a single logical core and CPU mode."""
+        key = (core, mode)
+        labels = self._core_modes.get(key)
+        if labels is None:
+            labels = self._core_modes[key] = (
+                '{core="%d",mode="%s"} ' % (core, _escape(mode))
+            )
+        return labels
+
+    def _disk(self, disk):
+        """Return label set of a single disk."""
+        key = (disk['device'], disk['mountpoint'], disk['fstype'])
+        labels = self._disks.get(key)
+        if labels is None:
+            if len(self._disks) >= _MAX_DISK_LABELS:
+                # Mount table keeps changing, e.g. because of containers
+                self._disks.clear()
+            labels = self._disks[key] = (
+                '{device="%s",mountpoint="%s",fstype="%s"} '
+                % tuple(_escape(value) for value in key)
+            )
+        return labels
+
+    def _memory_family(self, resource, field):
+        """Return header and sample name of memory field."""
+        key = (resource, field)
+        family = self._memory.get(key)
+        if family is None:
+            if resource == 'swap' and field in _swap_counters:
+                name, description = _swap_counters[field]
+                kind = 'counter'
+            else:
+                name = 'jacoren_memory_%s_%s_bytes' % (resource, field)
+                description = '%s %s memory in bytes.' % (
+                    resource.upper() if resource == 'ram' else 'Swap', field,
+                )
+                kind = 'gauge'
+            family = self._memory[key] = (
+                _header(name, kind, description) + name + ' '
+            )
+        return family
+
+    def _render_machine(self, out):
+        """Append machine metrics."""
+        out.append(_uptime)
+        out.append('jacoren_machine_uptime_seconds %s\n'
+                   % _format(machine.machine_uptime()))
+        out.append(_users)
+        out.append('jacoren_machine_users %d\n'
+                   % len(machine.machine_users()))
+
+    def _render_cpu(self, out):
+        """Append CPU metrics."""
+        out.append(_cpu_seconds)
+        for core, times in enumerate(cpu.cpu_load(cpu_time=True)):
+            for mode, value in times.items():
+                out.append('jacoren_cpu_seconds_total')
+                out.append(self._core_mode(core, mode))
+                out.append(_format(value))
+                out.append('\n')
+
+        out.append(_cpu_used)
+        for core, load in enumerate(cpu.cpu_load()):
+            out.append('jacoren_cpu_used_percent')
+            out.append(self._core(core))
+            out.append(_format(load['used']))
+            out.append('\n')
+
+        freqs = cpu.cpu_freq()
+        if not freqs:
+            return
+        for field, name, header in _cpu_freq:
+            out.append(header)
+            for core, freq in enumerate(freqs):
+                out.append(name)
+                out.append(self._core(core))
+                out.append(_format(freq[field]))
+                out.append('\n')
+
+    def _render_memory(self, out):
+        """Append memory metrics."""
+        for resource, metrics in (('ram', memory.memory_ram()),
+                                  ('swap', memory.memory_swap())):
+            for field, value in metrics.items():
+                out.append(self._memory_family(resource, field))
+                out.append(_format(value))
+                out.append('\n')
+
+    def _render_disks(self, out):
+        """Append disks metrics."""
+        metrics = disks.disks()
+        labels = [self._disk(disk) for disk in metrics]
+
+        out.append(_disk_up)
+        for disk, label in zip(metrics, labels):
+            out.append('jacoren_disk_up')
+            out.append(label)
+            out.append('0\n' if 'status' in disk else '1\n')
+
+        for field, name, header in _disk_usage:
+            out.append(header)
+            for disk, label in zip(metrics, labels):
+                if 'status' in disk:
+                    continue
+                out.append(name)
+                out.append(label)
+                out.append(_format(disk[field]))
+                out.append('\n')
+
+    def render(self):
+        """
+        Return all metrics in Prometheus text format.
+
+        :rtype: bytes
+        """
+        out = []
+        self._render_machine(out)
+        self._render_cpu(out)
+        self._render_memory(out)
+        self._render_disks(out)
+        return ''.join(out).encode('utf-8')
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for running REST API in multiple processes.
+
+Master process forks a number of workers. Every worker runs a threaded
+HTTP/1.1 server with its own listening socket bound to the same address
+(``SO_REUSEPORT``), so the kernel balances connections between workers.
+On platforms without ``SO_REUSEPORT``, workers share a single socket
+opened by master.
+
+Master restarts workers that die, and on ``SIGTERM`` or ``SIGINT`` stops
+them gracefully: workers stop accepting connections and finish requests
+in progress. Number of requests handled by every worker is reported on
+shutdown and on ``SIGUSR1``.
+"""
+
+from __future__ import print_function
+import os
+import sys
+import mmap
+import time
+import errno
+import signal
+import socket
+import struct
+import threading
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import ClosingIterator
+
+from jacoren._server import get_server
+
+
+#: Seconds workers are given to finish requests in progress on shutdown
+GRACE = 10.0
+
+#: Seconds idle keep-alive connection is kept open
+KEEPALIVE = 15.0
+
+#: Listen backlog
+BACKLOG = 128
+
+#: True if every worker can bind its own socket
+_REUSEPORT = hasattr(socket, 'SO_REUSEPORT')
+
+#: Request counter format
+_counter = struct.Struct('<Q')
+
+
+class _Stop(Exception):
+    """Raised in master process by SIGTERM and SIGINT."""
+
+
+class _Counters(object):
+    """Request counters of workers, shared between processes."""
+
+    def __init__(self, slots):
+        """Allocate shared anonymous memory."""
+        self.slots = slots
+        self._mm = mmap.mmap(-1, _counter.size * slots)
+
+    def __getitem__(self, slot):
+        """Return counter of worker."""
+        return _counter.unpack_from(self._mm, _counter.size * slot)[0]
+
+    def __setitem__(self, slot, value):
+        """Set counter of worker."""
+        _counter.pack_into(self._mm, _counter.size * slot, value)
+
+
+class _RequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 request handler closing idle keep-alive connections."""
+
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE
+
+
+class _ReusePortServer(ThreadedWSGIServer):
+    """Threaded WSGI server binding its socket with SO_REUSEPORT."""
+
+    request_queue_size = BACKLOG
+
+    def server_bind(self):
+        """Bind socket shared with other workers."""
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        ThreadedWSGIServer.server_bind(self)
+
+
+class _CountingApp(object):
+    """WSGI application counting handled and active requests."""
+
+    def __init__(self, app, counters, slot):
+        """Wrap application."""
+        self.app = app
+        self.counters = counters
+        self.slot = slot
+        self.requests = 0
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def _done(self):
+        """Count finished request."""
+        with self.lock:
+            self.active -= 1
+            self.requests += 1
+            self.counters[self.slot] = self.requests
+
+    def __call__(self, environ, start_response):
+        """Act as WSGI application."""
+        with self.lock:
+            self.active += 1
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        # Request is active until its body (e.g. stream) is consumed
+        return ClosingIterator(response, self._done)
+
+
+def _reserve(host, port):
+    """
+    Return socket reserving address for workers.
+
+    With ``SO_REUSEPORT``, socket is only bound (so connections are never
+    routed to master); otherwise it is the listening socket shared by
+    workers.
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if _REUSEPORT:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    if not _REUSEPORT:
+        sock.listen(BACKLOG)
+    return sock
+
+
+def _worker(slot, host, port, listener, counters, options, grace):
+    """Serve requests until SIGTERM is received."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+    app = _CountingApp(get_server(**options), counters, slot)
+    if _REUSEPORT:
+        listener.close()
+        httpd = _ReusePortServer(host, port, app, _RequestHandler)
+    else:
+        httpd = ThreadedWSGIServer(host, port, app, _RequestHandler,
+                                   fd=listener.fileno())
+
+    def _stop(signum, frame):
+        # shutdown() waits for serve_forever() running in this thread
+        threading.Thread(target=httpd.shutdown).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    httpd.serve_forever()
+
+    deadline = time.time() + grace
+    while app.active and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def _report(counters, pids, out=sys.stderr):
+    """Print number of requests handled by every worker."""
+    total = 0
+    for slot in range(counters.slots):
+        requests = counters[slot]
+        total += requests
+        print('jacoren: worker %d (pid %s): %d requests'
+              % (slot, pids.get(slot, '-'), requests), file=out)
+    print('jacoren: total: %d requests' % (total,), file=out)
+
+
+def serve(host, port, workers, options=None, grace=GRACE):
+    """
+    Run REST API in **workers** pre-forked processes.
+
+    Function returns when master process receives ``SIGTERM`` or
+    ``SIGINT`` and all workers are stopped.
+
+    :param host: Host IP address/name
+    :param port: Port
+    :param workers: Number of worker processes
+    :param options: :class:`jacoren._server.JacorenServer` options,
+                    see :func:`jacoren._server.get_server`
+    :param grace: Seconds workers are given to finish requests in
+                  progress on shutdown
+    :type host: str
+    :type port: int
+    :type workers: int
+    :type options: dict, None
+    :type grace: float
+    """
+    if workers < 1:
+        raise ValueError("number of workers must be positive")
+
+    options = options or {}
+    listener = _reserve(host, port)
+    port = listener.getsockname()[1]
+    counters = _Counters(workers)
+    pids = {}
+    started = {}
+
+    def _spawn(slot):
+        # Do not respawn crashing worker in a tight loop
+        if time.time() - started.get(slot, 0.) < 1.:
+            time.sleep(1.)
+        started[slot] = time.time()
+        counters[slot] = 0
+
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _worker(slot, host, port, listener, counters, options, grace)
+                code = 0
+            except BaseException as e:
+                print('jacoren: worker %d failed: %r' % (slot, e),
+                      file=sys.stderr)
+            finally:
+                sys.stderr.flush()
+                os._exit(code)
+        pids[slot] = pid
+
+    def _raise_stop(signum, frame):
+        raise _Stop
+
+    handlers = dict(
+        (signum, signal.signal(signum, _raise_stop))
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    )
+    handlers[signal.SIGUSR1] = signal.signal(
+        signal.SIGUSR1, lambda signum, frame: _report(counters, pids))
+
+    print('jacoren: serving on http://%s:%d/ with %d workers'
+          % (host, port, workers), file=sys.stderr)
+
+    try:
+        for slot in range(workers):
+            _spawn(slot)
+
+        while True:
+            try:
+                pid, _ = os.wait()
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+
+            for slot, worker_pid in list(pids.items()):
+                if worker_pid == pid:
+                    print('jacoren: worker %d (pid %d) died, restarting'
+                          % (slot, pid), file=sys.stderr)
+                    _spawn(slot)
+    except _Stop:
+        pass
+    finally:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_IGN)
+        _shutdown(pids, grace + 1.)
+        _report(counters, pids)
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        listener.close()
+
+
+def _shutdown(pids, timeout):
+    """Stop workers gracefully, killing ones that do not stop in time."""
+    alive = set(pids.values())
+    for pid in alive:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+    deadline = time.time() + timeout
+    while alive:
+        for pid in list(alive):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except OSError:
+                done = pid
+            if done:
+                alive.discard(pid)
+
+        if time.time() >= deadline:
+            for pid in alive:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            return
+        time.sleep(0.05)
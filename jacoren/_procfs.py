@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for reading Linux procfs and sysfs.
+
+procfs (and sysfs) files read on every collection (``PERSISTENT``) are
+kept open for the lifetime of the process and re-read from offset zero
+into preallocated buffers (see :class:`ProcReader`), so reading them
+costs a single system call and no buffer allocations.
+"""
+
+import os
+import threading
+
+
+#: Clock ticks per second
+try:
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+except (AttributeError, ValueError):
+    CLOCK_TICKS = 100
+
+
+#: sysfs directory of CPUs
+CPU_PATH = '/sys/devices/system/cpu/'
+
+#: procfs file of CPU times
+STAT_PATH = '/proc/stat'
+
+#: procfs (and sysfs) files kept open by read()
+PERSISTENT = frozenset((
+    STAT_PATH,
+    '/proc/meminfo',
+    '/proc/vmstat',
+    '/proc/uptime',
+    CPU_PATH + 'online',
+))
+
+#: Initial size (in bytes) of buffers of persistent files
+BUFFER_SIZE = 8192
+
+#: Reads into buffers at offset of descriptor (Linux, Python 3.7+)
+_preadv = getattr(os, 'preadv', None)
+
+#: Reads given number of bytes at offset of descriptor (Python 3.3+)
+_pread = getattr(os, 'pread', None)
+
+
+class _ProcFile(object):
+    """Open procfs file with its buffer."""
+
+    __slots__ = ('fd', 'size', 'buffer', 'lock')
+
+    def __init__(self, path, size):
+        """Open file and allocate its buffer."""
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = size
+        # Without preadv(), pread() allocates buffers itself
+        self.buffer = bytearray(size) if _preadv is not None else None
+        self.lock = threading.Lock()
+
+    def read(self):
+        """Return contents of file, growing buffer if it is too small."""
+        with self.lock:
+            if self.buffer is None:
+                data = _pread(self.fd, self.size, 0)
+                while len(data) >= self.size:
+                    self.size *= 2
+                    data = _pread(self.fd, self.size, 0)
+                return data
+
+            count = _preadv(self.fd, [self.buffer], 0)
+            while count >= self.size:
+                self.size *= 2
+                self.buffer = bytearray(self.size)
+                count = _preadv(self.fd, [self.buffer], 0)
+            return bytes(memoryview(self.buffer)[:count])
+
+
+class ProcReader(object):
+    """
+    Reader of procfs files keeping them open.
+
+    procfs regenerates contents of a file whenever it is read from offset
+    zero, so open descriptors can be re-read with ``pread()`` forever.
+    Descriptors inherited by a forked process are not shared with its
+    parent: they are reopened on first read in the child.
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        """
+        Init reader without opening any file.
+
+        :param size: Initial size (in bytes) of buffers
+        :type size: int
+        """
+        self.size = size
+        self.pid = os.getpid()
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _file(self, path):
+        """Return open file of path, opening it once per process."""
+        if self.pid != os.getpid():
+            # Locks of parent's files may be held by its other threads
+            files, self._files = self._files, {}
+            self._lock = threading.Lock()
+            self.pid = os.getpid()
+            for f in files.values():
+                os.close(f.fd)
+
+        f = self._files.get(path)
+        if f is None:
+            with self._lock:
+                f = self._files.get(path)
+                if f is None:
+                    f = self._files[path] = _ProcFile(path, self.size)
+        return f
+
+    def read(self, path):
+        """
+        Return contents of file.
+
+        :raises OSError: If file can't be opened or read
+        :rtype: bytes
+        """
+        return self._file(path).read()
+
+    def close(self):
+        """Close all files."""
+        with self._lock:
+            files, self._files = self._files, {}
+        for f in files.values():
+            os.close(f.fd)
+
+
+#: Reader of persistent files
+_reader = ProcReader()
+
+
+def read(path, persistent=None):
+    """
+    Return contents of file.
+
+    :param persistent: If true, file is kept open. If ``None``, only
+                       files in ``PERSISTENT`` are.
+    :type persistent: bool, None
+    """
+    if persistent is None:
+        persistent = path in PERSISTENT
+    if persistent and _pread is not None:
+        return _reader.read(path)
+
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def parse_cpu_times(line, count):
+    """
+    Return first **count** CPU times from /proc/stat line.
+
+    Times are given in seconds, rounded to two decimals.
+    """
+    values = line.split(None, count + 1)[1:count + 1]
+    if CLOCK_TICKS == 100:
+        # Already rounded
+        return tuple(int(v) / 100. for v in values)
+    return tuple(round(int(v) / float(CLOCK_TICKS), 2) for v in values)
+
+
+def cpu_times(core, count, path=STAT_PATH):
+    """
+    Return CPU times (in seconds) of a single logical core.
+
+    Only line of given core in /proc/stat is parsed.
+
+    :param core: Logical core, i.e. position among online logical cores
+                 (counting from zero), as in :func:`psutil.cpu_times`
+                 with ``percpu=True``. It differs from CPU number only
+                 if some CPUs are offline.
+    :param count: Number of leading fields to return
+    :param path: File in /proc/stat format (kept open)
+    :returns: CPU times or ``None`` if core does not exist
+    :rtype: tuple, None
+    """
+    data = read(path, True)
+    # First line is total of all cores
+    start = data.find(b'\ncpu')
+    for _ in range(core):
+        if start < 0:
+            return None
+        start = data.find(b'\ncpu', start + 1)
+    if start < 0:
+        return None
+
+    end = data.find(b'\n', start + 1)
+    return parse_cpu_times(data[start + 1:end], count)
+
+
+def cpufreq_path(cpu, root=CPU_PATH):
+    """Return path of cpufreq directory of CPU (by its number)."""
+    return '%scpu%d/cpufreq/' % (root, cpu)
+
+
+#: cpufreq files of frequencies
+_cpufreq_files = {
+    'current': 'scaling_cur_freq',
+    'min': 'scaling_min_freq',
+    'max': 'scaling_max_freq',
+}
+
+
+def cpu_freq(cpu, names=('current', 'min', 'max'), root=CPU_PATH):
+    """
+    Return frequencies (in MHz) of a single logical CPU.
+
+    Only cpufreq files of requested frequencies of given CPU are read.
+
+    :param cpu: CPU number (as in sysfs, not index among online CPUs)
+    :param names: Frequencies to read (``current``, ``min`` or ``max``)
+    :param root: sysfs directory of CPUs
+    :returns: Frequencies or ``None`` if they are not available
+    :rtype: tuple, None
+    """
+    path = cpufreq_path(cpu, root)
+    try:
+        return tuple(int(read(path + _cpufreq_files[name])) / 1000.
+                     for name in names)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+class CpufreqReader(object):
+    """
+    Reader of cpufreq frequencies with persistent per-CPU descriptors.
+
+    Limits (``min`` and ``max``) only change with frequency policy, so
+    they are read once per CPU and kept until :meth:`refresh`, or until
+    current frequency falls outside of them. Descriptors of
+    ``scaling_cur_freq`` are kept open and re-read with ``pread()``, so
+    reading current frequency costs a single system call. ``pread()``
+    does not move file offset, so descriptors inherited by a forked
+    process keep working.
+    """
+
+    def __init__(self, root=CPU_PATH):
+        """
+        Init reader without opening any file.
+
+        :param root: sysfs directory of CPUs
+        :type root: str
+        """
+        self.root = root
+        self._fds = {}
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def _fd(self, cpu):
+        """Return descriptor of current frequency file, opening it once."""
+        fd = self._fds.get(cpu)
+        if fd is None:
+            with self._lock:
+                fd = self._fds.get(cpu)
+                if fd is None:
+                    path = cpufreq_path(cpu, self.root) + 'scaling_cur_freq'
+                    fd = self._fds[cpu] = os.open(path, os.O_RDONLY)
+        return fd
+
+    def _drop(self, cpu):
+        """Close descriptor of CPU (e.g. after it went offline)."""
+        with self._lock:
+            fd = self._fds.pop(cpu, None)
+        if fd is not None:
+            os.close(fd)
+
+    def current(self, cpu):
+        """
+        Return current frequency (in MHz) of a single logical CPU.
+
+        :raises OSError: If frequency is not available
+        :rtype: float
+        """
+        if _pread is None:
+            path = cpufreq_path(cpu, self.root) + 'scaling_cur_freq'
+            return int(read(path)) / 1000.
+
+        try:
+            return int(_pread(self._fd(cpu), 32, 0)) / 1000.
+        except (IOError, OSError, ValueError):
+            self._drop(cpu)
+            raise
+
+    def limits(self, cpu):
+        """
+        Return minimal and maximal frequency (in MHz) of a single CPU.
+
+        :returns: Limits or ``None`` if they are not available
+        :rtype: tuple, None
+        """
+        limits = self._limits.get(cpu)
+        if limits is None:
+            limits = cpu_freq(cpu, ('min', 'max'), self.root)
+            if limits is not None:
+                self._limits[cpu] = limits
+        return limits
+
+    def read(self, cpu, names=('current', 'min', 'max')):
+        """
+        Return frequencies (in MHz) of a single logical CPU.
+
+        :param cpu: CPU number (as in sysfs, not index among online CPUs)
+        :param names: Frequencies to read (``current``, ``min`` or ``max``)
+        :returns: Frequencies or ``None`` if they are not available
+        :rtype: tuple, None
+        """
+        freqs = {}
+        if 'current' in names:
+            try:
+                freqs['current'] = self.current(cpu)
+            except (IOError, OSError, ValueError):
+                return None
+
+        if 'min' in names or 'max' in names:
+            limits = self.limits(cpu)
+            if limits is not None and 'current' in freqs and not (
+                    limits[0] <= freqs['current'] <= limits[1]):
+                # Policy changed since limits were read
+                self._limits.pop(cpu, None)
+                limits = self.limits(cpu)
+            if limits is None:
+                return None
+            freqs['min'], freqs['max'] = limits
+
+        return tuple(freqs[name] for name in names)
+
+    def refresh(self):
+        """Forget limits, so they are read again on next use."""
+        self._limits.clear()
+
+    def close(self):
+        """Close all descriptors."""
+        with self._lock:
+            fds, self._fds = self._fds, {}
+        for fd in fds.values():
+            os.close(fd)
+
+
+def meminfo():
+    """
+    Return /proc/meminfo values (in bytes).
+
+    :returns: Mapping of keys (with trailing colon, e.g. ``b'MemTotal:'``)
+              to values
+    :rtype: dict
+    """
+    mems = {}
+    for line in read('/proc/meminfo').splitlines():
+        fields = line.split()
+        mems[fields[0]] = int(fields[1]) * 1024
+    return mems
+
+
+def uptime():
+    """
+    Return seconds since boot (from /proc/uptime).
+
+    :rtype: float
+    """
+    return float(read('/proc/uptime').split(None, 1)[0])
+
+
+def vmstat(keys):
+    """
+    Return selected /proc/vmstat values.
+
+    :param keys: Keys to return, e.g. ``(b'pswpin', b'pswpout')``
+    :returns: Mapping of found keys to values
+    :rtype: dict
+    """
+    keys = set(keys)
+    values = {}
+    for line in read('/proc/vmstat').splitlines():
+        key, _, value = line.partition(b' ')
+        if key in keys:
+            values[key] = int(value)
+            if len(values) == len(keys):
+                break
+    return values
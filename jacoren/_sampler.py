@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for sampling metrics in background."""
+
+import os
+import time
+import logging
+import threading
+
+
+#: Monotonic clock (if available)
+_clock = getattr(time, 'monotonic', time.time)
+
+logger = logging.getLogger(__name__)
+
+
+class Sampler(object):
+    """
+    Call function at a fixed interval in a daemon thread.
+
+    Ticks are scheduled against a fixed grid, so slow calls do not make
+    the sampler drift. Exceptions raised by function are logged and do
+    not stop sampling. Sampler bound to a thread of another process
+    (e.g. after ``fork()``) is reported as not running.
+    """
+
+    def __init__(self, func, interval):
+        """Init sampler, without starting it."""
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        self.func = func
+        self.interval = float(interval)
+
+        self._pid = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self):
+        """Return True if sampling thread is alive in current process."""
+        return (self._pid == os.getpid() and
+                self._thread is not None and
+                self._thread.is_alive())
+
+    def start(self):
+        """Start sampling thread."""
+        if self.running:
+            return
+
+        self._stopped.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run,
+                                        name='jacoren-sampler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling thread and wait for it to finish."""
+        self._stopped.set()
+        if self.running and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """Sampling loop."""
+        next_tick = _clock()
+
+        while True:
+            next_tick += self.interval
+            delay = next_tick - _clock()
+
+            if delay < 0:
+                # Missed ticks are skipped, not queued
+                next_tick -= (delay // self.interval) * self.interval
+                delay = next_tick - _clock()
+
+            if self._stopped.wait(max(delay, 0.)):
+                return
+
+            try:
+                self.func()
+            except Exception:
+                logger.exception("sampling with %r failed", self.func)
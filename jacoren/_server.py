@@ -3,14 +3,15 @@
 """Utilities for running REST API."""
 
 from __future__ import print_function
-import json
+import os
 from sys import version_info
 from functools import wraps
-from collections import Iterable, OrderedDict
+from collections import OrderedDict
 from werkzeug.wrappers import Request, Response
-from werkzeug.datastructures import Headers
 from werkzeug.routing import Map, Rule
-from werkzeug.exceptions import HTTPException, NotFound
+from werkzeug.exceptions import HTTPException, NotFound, BadRequest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
 from werkzeug.serving import WSGIRequestHandler
 
 from jacoren import (
@@ -19,7 +20,20 @@ from jacoren import (
     cpu,
     memory,
     disks,
+    batch,
 )
+from jacoren._backends import BACKENDS, set_backend
+from jacoren._binary import JSON, MSGPACK, PACKED, msgpack_dumps, pack_load
+from jacoren._cache import CachedResponse, ResponseCache, parse_ttls
+from jacoren._compress import MIN_SIZE, Compressor
+from jacoren._delta import DeltaStore
+from jacoren._fields import parse_fields
+from jacoren._history import parse_duration
+from jacoren._json import ENCODERS, MAPPING, dumps, set_encoder
+from jacoren._metrics import CONTENT_TYPE as _METRICS_CONTENT_TYPE
+from jacoren._metrics import MetricsRenderer
+from jacoren._summary import TOP as _SUMMARY_TOP
+from jacoren._stream import Streams
 
 
 _python_version = "%s.%s.%s" % (version_info.major,
@@ -27,34 +41,104 @@ _python_version = "%s.%s.%s" % (version_info.major,
                                 version_info.micro)
 
 
+#: Headers shared by every JSON response
+_json_headers = [
+    ('Server', 'jacoren/%s Python/%s' % (_jacoren_version, _python_version)),
+    ('Content-Type', 'application/json; charset=UTF-8'),
+
+    #:
+    #: A man is not dead while his name is still spoken.
+    #:                  ~ Going Postal, Chapter 4 prologue
+    #:
+    #: See: gnuterrypratchett.com
+    #:
+    ('X-Clacks-Overhead', 'GNU Terry Pratchett'),
+]
+
+#: Headers shared by every Prometheus metrics response
+_metrics_headers = [
+    (name, _METRICS_CONTENT_TYPE if name == 'Content-Type' else value)
+    for name, value in _json_headers
+]
+
+#: Headers of JSON responses negotiated with Accept header
+_negotiated_headers = _json_headers + [('Vary', 'Accept')]
+
+#: Headers of MessagePack responses
+_msgpack_headers = [
+    (name, MSGPACK if name == 'Content-Type' else value)
+    for name, value in _negotiated_headers
+]
+
+#: Headers of packed doubles responses
+_packed_headers = [
+    (name, PACKED if name == 'Content-Type' else value)
+    for name, value in _negotiated_headers
+]
+
+#: Headers shared by every Server-Sent Events response
+_stream_headers = [
+    (name, 'text/event-stream; charset=UTF-8' if name == 'Content-Type'
+     else value)
+    for name, value in _json_headers
+] + [
+    ('Cache-Control', 'no-cache'),
+    # Disable buffering in nginx
+    ('X-Accel-Buffering', 'no'),
+]
+
+
 def json_response(func):
     """Decorate function so it returns JSON response."""
     @wraps(func)
-    def new(inst, *args, **kwargs):
-        result = func(inst, *args, **kwargs)
+    def new(inst, request, *args, **kwargs):
+        result = func(inst, request, *args, **kwargs)
 
         if result is None:
             raise NotFound
+        if isinstance(result, Response):
+            # Already encoded (e.g. packed doubles)
+            return result
 
-        headers = Headers({
-            'Server': 'jacoren/%s Python/%s' % (_jacoren_version,
-                                                _python_version),
-            'Content-Type': 'application/json; charset=UTF-8',
-
-            #:
-            #: A man is not dead while his name is still spoken.
-            #:                  ~ Going Postal, Chapter 4 prologue
-            #:
-            #: See: gnuterrypratchett.com
-            #:
-            'X-Clacks-Overhead': 'GNU Terry Pratchett',
-        })
-
-        return Response(json.dumps(result),
-                        headers=headers)
+        return inst.json(request, result)
     return new
 
 
+class StaticResponse(CachedResponse):
+    """
+    Pre-encoded JSON response of resource that never changes.
+
+    Body and headers are built once, so serving it costs only a call
+    to ``start_response``. If ``msgpack`` is installed, a MessagePack
+    variant is built as well and served to clients preferring it.
+    """
+
+    def __init__(self, data, compressor=None):
+        """Encode data and prepare headers."""
+        super(StaticResponse, self).__init__(
+            dumps(data), _negotiated_headers, compressor=compressor,
+        )
+
+        #: Responses of other media types than JSON
+        self.media_types = {}
+        encode = msgpack_dumps()
+        if encode is not None:
+            self.media_types[MSGPACK] = CachedResponse(
+                encode(data), _msgpack_headers, compressor=compressor,
+            )
+
+    def __call__(self, environ, start_response):
+        """Act as WSGI application, serving variant of accepted type."""
+        accept = environ.get('HTTP_ACCEPT')
+        if accept and self.media_types:
+            mimetype = parse_accept_header(accept, MIMEAccept).best_match(
+                (JSON,) + tuple(self.media_types), default=JSON,
+            )
+            if mimetype != JSON:
+                return self.media_types[mimetype](environ, start_response)
+        return super(StaticResponse, self).__call__(environ, start_response)
+
+
 class JacorenRule(Rule):
     """Extended Rule."""
 
@@ -72,8 +156,56 @@ class JacorenRule(Rule):
 class JacorenServer(object):
     """WSGI server class."""
 
-    def __init__(self):
-        """Init resource paths."""
+    def __init__(self, sample_interval=None, history=0, snapshot=None,
+                 cache_ttl=None, compress_min_size=MIN_SIZE):
+        """
+        Init resource paths.
+
+        :param sample_interval: If given, CPU load is sampled in background
+                                every **sample_interval** seconds.
+                                See :func:`jacoren.cpu.start_sampler`.
+        :param history: If non-zero, CPU load and memory metrics history
+                        of that many samples is recorded (every
+                        **sample_interval** seconds, 1 second by default).
+                        See :func:`jacoren.cpu.cpu_load_history`.
+        :param snapshot: If given, metrics are collected by a single
+                         collector process (every **sample_interval**
+                         seconds, 1 second by default) and served from
+                         memory-mapped file at this path. This makes all
+                         servers using the same file return the same
+                         numbers. See :mod:`jacoren._snapshot`.
+        :param cache_ttl: If given, responses are cached for given number
+                          of seconds per route, e.g.
+                          ``{'/disks': 5, '/machine': 1}`` or
+                          ``'/disks=5,/machine=1'``.
+                          See :func:`jacoren._cache.parse_ttls`.
+                          Static resources are always cached.
+        :param compress_min_size: Responses of at least this many bytes
+                                  are compressed with coding accepted by
+                                  client (see :mod:`jacoren._compress`).
+                                  If ``None``, responses are never
+                                  compressed.
+        :type sample_interval: float, None
+        :type history: int
+        :type snapshot: str, None
+        :type cache_ttl: dict, str, None
+        :type compress_min_size: int, None
+        """
+        if history:
+            cpu.start_sampler(sample_interval or 1., history)
+            memory.start_sampler(sample_interval or 1., history)
+        elif sample_interval:
+            cpu.start_sampler(sample_interval)
+
+        if snapshot:
+            # Not available on every platform, imported only when needed
+            from jacoren._snapshot import SnapshotReader
+
+            self.snapshot = SnapshotReader(snapshot, sample_interval or 1.)
+            self.snapshot.ensure_collector()
+        else:
+            self.snapshot = None
+
         self.paths = Map((
             #: Docs
             JacorenRule('/', endpoint='api_help',
@@ -94,14 +226,27 @@ class JacorenServer(object):
                         doc_desc='CPU core info', doc_rule='/cpu/<core>'),
             JacorenRule('/cpu/info', endpoint='cpu_info',
                         doc_desc='CPU basic info'),
+            JacorenRule('/cpu/topology', endpoint='cpu_topology',
+                        doc_desc='CPU topology (sockets, cores, NUMA nodes)'),
             JacorenRule('/cpu/load', endpoint='cpu_load',
-                        doc_desc='CPU load'),
+                        doc_desc='CPU load, per group with e.g. '
+                                 '/cpu/load?group=node'),
             JacorenRule('/cpu/load/<int:core>', endpoint='cpu_load',
                         doc_desc='CPU core load', doc_rule='/cpu/load/<core>'),
+            JacorenRule('/cpu/load/summary', endpoint='cpu_load_summary',
+                        doc_desc='CPU load summary of all cores, e.g. '
+                                 '/cpu/load/summary?top=3'),
+            JacorenRule('/cpu/load/history', endpoint='cpu_load_history',
+                        doc_desc='CPU load history'),
+            JacorenRule('/cpu/load/history/<int:core>',
+                        endpoint='cpu_load_history',
+                        doc_desc='CPU core load history',
+                        doc_rule='/cpu/load/history/<core>'),
             JacorenRule('/cpu/freq', endpoint='cpu_freq',
                         doc_desc='CPU frequency'),
             JacorenRule('/cpu/freq/<int:core>', endpoint='cpu_freq',
-                        doc_desc='CPU core frequency', doc_rule='/cpu/freq/<core>'),
+                        doc_desc='CPU core frequency',
+                        doc_rule='/cpu/freq/<core>'),
 
             #: Memory
             JacorenRule('/memory', endpoint='memory',
@@ -110,25 +255,154 @@ class JacorenServer(object):
                         doc_desc='RAM metrics'),
             JacorenRule('/memory/swap', endpoint='memory_swap',
                         doc_desc='Swap metrics'),
+            JacorenRule('/memory/ram/history', endpoint='memory_ram_history',
+                        doc_desc='RAM metrics history'),
+            JacorenRule('/memory/swap/history', endpoint='memory_swap_history',
+                        doc_desc='Swap metrics history'),
 
             #: Disks
             JacorenRule('/disks', endpoint='disks',
                         doc_desc='Disks metrics'),
+
+            #: Batch
+            JacorenRule('/batch', endpoint='batch',
+                        doc_desc='Several resources at once, '
+                                 'e.g. /batch?r=cpu/load&r=disks'),
+
+            #: Stream
+            JacorenRule('/stream', endpoint='stream',
+                        doc_desc='Server-Sent Events with resources sampled '
+                                 'every interval, e.g. '
+                                 '/stream?interval=1&r=cpu/load'),
+
+            #: Prometheus
+            JacorenRule('/metrics', endpoint='metrics',
+                        doc_desc='All metrics in Prometheus text format'),
         ))
 
+        #: O(1) dispatch table for paths without converters
+        self.fixed_paths = dict(
+            (rule.rule, rule.endpoint)
+            for rule in self.paths.iter_rules()
+            if not rule.arguments
+        )
+
+        if compress_min_size is None:
+            self.compressor = None
+        else:
+            self.compressor = Compressor(compress_min_size)
+
+        #: Responses for resources that never change
+        self.static_responses = {
+            '/': StaticResponse(self._api_help(), self.compressor),
+            '/cpu/info': StaticResponse(cpu.cpu_info(), self.compressor),
+        }
+
+        if isinstance(cache_ttl, str):
+            cache_ttl = parse_ttls(cache_ttl)
+        if cache_ttl:
+            self.cache = ResponseCache(cache_ttl, self.paths, self.compressor)
+        else:
+            self.cache = None
+
+        #: Pre-encoded static part of /machine
+        self._machine_head = dumps(OrderedDict((
+            ('os', machine.OS),
+            ('version', machine.VERSION),
+        )))[:-1]
+
+        #: Renderer of /metrics, caching label sets between scrapes
+        self.metrics_renderer = MetricsRenderer()
+
+        #: Channels of /stream, shared by subscribers of the same interval
+        self.streams = Streams()
+
+        #: Recent snapshots of resources for delta responses (since=)
+        self.deltas = DeltaStore()
+
     def parse_request(self, request):
         """Parse HTTP request."""
+        response = self.snapshot_response(request)
+        if response is not None:
+            return response
+
+        try:
+            endpoint, values = self.match(request)
+        except HTTPException as http_error:
+            return self.error_response(request, http_error)
+        return self.dispatch(request, endpoint, values)
+
+    def json(self, request, result):
+        """
+        Return JSON response with result.
+
+        If request has ``since`` parameter, only changes since the given
+        snapshot are returned (see :mod:`jacoren._delta`).
+        """
+        since = request.args.get('since')
+        if since is not None:
+            key = '%s?%s' % (request.path.rstrip('/'), '&'.join(sorted(
+                '%s=%s' % item for item in request.args.items(multi=True)
+                if item[0] != 'since'
+            )))
+            result = self.deltas.update(key, result, since, MAPPING)
+
+        if self._mimetype(request, (JSON, MSGPACK)) == MSGPACK:
+            encode = msgpack_dumps()
+            if encode is not None:
+                return Response(encode(result), headers=_msgpack_headers)
+        return Response(dumps(result), headers=_negotiated_headers)
+
+    @staticmethod
+    def _mimetype(request, offers):
+        """Return best offered MIME type accepted by client (JSON if none)."""
+        if 'HTTP_ACCEPT' not in request.environ:
+            return JSON
+        return request.accept_mimetypes.best_match(offers, default=JSON)
+
+    def snapshot_response(self, request, spawn=True):
+        """
+        Return response served from snapshot, if available.
+
+        :param spawn: If True and snapshot is stale, collector is started
+        :type spawn: bool
+        """
+        if (self.snapshot is None or 'fields' in request.args or
+                'since' in request.args or 'group' in request.args or
+                self._mimetype(request, (JSON, MSGPACK, PACKED)) != JSON):
+            return None
+
+        body = self.snapshot.get(self._snapshot_key(request), spawn)
+        if body is None:
+            return None
+        return Response(body, headers=_negotiated_headers)
+
+    def match(self, request):
+        """
+        Return endpoint of request and its arguments.
+
+        :raises werkzeug.exceptions.HTTPException: If no resource matches
+        """
+        endpoint = self.fixed_paths.get(request.path)
+        if endpoint is not None:
+            return endpoint, {}
+
         adapter = self.paths.bind_to_environ(request.environ)
+        return adapter.match()
 
+    def dispatch(self, request, endpoint, values):
+        """Return response of matched endpoint."""
         try:
-            endpoint, values = adapter.match()
             return getattr(self, endpoint)(request, **values)
         except HTTPException as http_error:
-            response = self.respond_with_error(request, http_error)
-            response.status_code = http_error.code
-            return response
+            return self.error_response(request, http_error)
+
+    def error_response(self, request, http_error):
+        """Return response with HTTP error and its status code."""
+        response = self.respond_with_error(request, http_error)
+        response.status_code = http_error.code
+        return response
 
-    @json_response
     def respond_with_error(self, request, http_error):
         """Return response with HTTP error."""
         if isinstance(http_error, NotFound):
@@ -142,35 +416,95 @@ class JacorenServer(object):
                 'msg':  http_error.description
             }
 
-        return response
+        return Response(dumps(response), headers=_json_headers)
 
     def wsgi(self, environ, start_response):
         """Main WSGI function."""
+        static = self.static_responses.get(environ.get('PATH_INFO') or '/')
+        if static is not None:
+            return static(environ, start_response)
+
+        cache = self.cache
+        if cache is not None:
+            cached = cache.get(environ)
+            if cached is not None:
+                return cached(environ, start_response)
+
         request = Request(environ)
-        response = self.parse_request(request)
+        response = self.finish(environ, self.parse_request(request))
         return response(environ, start_response)
 
+    def finish(self, environ, response):
+        """Return response cached and compressed, if configured."""
+        if self.cache is not None:
+            response = self.cache.store(environ, response)
+        if (self.compressor is not None and
+                not isinstance(response, CachedResponse)):
+            response = self.compressor.apply(environ, response)
+        return response
+
     def __call__(self, environ, start_response):
         """Act as WSGI function."""
         return self.wsgi(environ, start_response)
 
+    @staticmethod
+    def _snapshot_key(request):
+        """Return key of resource in snapshot."""
+        key = request.path.rstrip('/')
+        for flag in ('cpu_time', 'percent'):
+            if request.args.get(flag, 0, type=int):
+                key += '?%s=1' % (flag,)
+        return key
+
+    @staticmethod
+    def _window(request):
+        """Return history window (in seconds) given in request, if any."""
+        window = request.args.get('window')
+        if window is None:
+            return None
+
+        try:
+            return parse_duration(window)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    @staticmethod
+    def _fields(request):
+        """Return tree of fields given in request, if any."""
+        try:
+            return parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            raise BadRequest(str(e))
+
     #:
     #: Request handlers
     #:
 
-    @json_response
-    def api_help(self, request):
-        """Return API help."""
+    def _api_help(self):
+        """Return API help data."""
         return [OrderedDict((
             ('uri', rule.doc_rule),
             ('description', rule.doc_desc)
         )) for rule in self.paths.iter_rules()]
 
+    def api_help(self, request):
+        """Return API help."""
+        return self.static_responses['/']
+
     #: Machine
-    @json_response
     def machine(self, request):
         """Return platform info."""
-        return machine.machine()
+        if ('since' in request.args or
+                self._mimetype(request, (JSON, MSGPACK)) != JSON):
+            return self.json(request, machine.machine())
+
+        body = b''.join((
+            self._machine_head,
+            b',"uptime":', dumps(machine.machine_uptime()),
+            b',"users":', dumps(machine.machine_users()),
+            b'}',
+        ))
+        return Response(body, headers=_negotiated_headers)
 
     @json_response
     def machine_uptime(self, request):
@@ -187,44 +521,127 @@ class JacorenServer(object):
     def cpu(self, request, core=None):
         """Return information about CPU."""
         cpu_time = request.args.get('cpu_time', 0, type=int)
-        return cpu.cpu(cpu_time=bool(cpu_time),
-                       core=core)
+        try:
+            return cpu._cpu(bool(cpu_time), core, MAPPING,
+                            self._fields(request))
+        except ValueError as e:
+            raise BadRequest(str(e))
 
-    @json_response
     def cpu_info(self, request):
         """Return basic information about CPU."""
-        return cpu.cpu_info()
+        return self.static_responses['/cpu/info']
+
+    @json_response
+    def cpu_topology(self, request):
+        """Return CPU topology."""
+        return cpu._cpu_topology(MAPPING)
 
     @json_response
     def cpu_load(self, request, core=None):
         """Return CPU load for every logical core."""
         cpu_time = request.args.get('cpu_time', 0, type=int)
-        return cpu.cpu_load(cpu_time=bool(cpu_time),
-                            core=core)
+        group = request.args.get('group')
+        if group is not None:
+            if core is not None:
+                raise BadRequest("group is not available for a single core")
+            try:
+                return cpu._cpu_load_groups(group, bool(cpu_time), MAPPING)
+            except ValueError as e:
+                raise BadRequest(str(e))
+
+        if ('since' not in request.args and
+                self._mimetype(request, (JSON, MSGPACK, PACKED)) == PACKED):
+            return self._packed_load(request, bool(cpu_time), core)
+
+        try:
+            return cpu._cpu_load(bool(cpu_time), core, MAPPING,
+                                 self._fields(request))
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    def _packed_load(self, request, cpu_time, core):
+        """Return CPU load as packed doubles, without building dicts."""
+        fields, rows = cpu._load_rows(cpu_time, core)
+        if rows is None:
+            raise NotFound
+        if core is not None:
+            rows = [rows]
+
+        try:
+            names = cpu._load_names(self._fields(request), fields, cpu_time)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+        return Response(pack_load(fields, rows, cpu_time, names),
+                        headers=_packed_headers)
+
+    @json_response
+    def cpu_load_summary(self, request):
+        """Return summary of CPU load of all cores."""
+        top = request.args.get('top', _SUMMARY_TOP, type=int)
+        try:
+            return cpu._cpu_load_summary(top, MAPPING)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    @json_response
+    def cpu_load_history(self, request, core=None):
+        """Return CPU load history for every logical core."""
+        return cpu.cpu_load_history(window=self._window(request),
+                                    core=core)
 
     @json_response
     def cpu_freq(self, request, core=None):
         """Return CPU frequency for every logical core."""
-        return cpu.cpu_freq(core=core)
+        try:
+            return cpu._cpu_freq(core, MAPPING, self._fields(request))
+        except ValueError as e:
+            raise BadRequest(str(e))
 
     #: Memory
     @json_response
     def memory(self, request):
         """Return memory metrics."""
         percent = request.args.get('percent', 0, type=int)
-        return memory.memory(percent=bool(percent))
+        try:
+            return memory.memory(percent=bool(percent),
+                                 fields=self._fields(request))
+        except ValueError as e:
+            raise BadRequest(str(e))
 
     @json_response
     def memory_ram(self, request):
         """Return RAM metrics."""
         percent = request.args.get('percent', 0, type=int)
-        return memory.memory_ram(percent=bool(percent))
+        try:
+            return memory.memory_ram(percent=bool(percent),
+                                     fields=self._fields(request))
+        except ValueError as e:
+            raise BadRequest(str(e))
 
     @json_response
     def memory_swap(self, request):
         """Return swap metrics."""
         percent = request.args.get('percent', 0, type=int)
-        return memory.memory_swap(percent=bool(percent))
+        try:
+            return memory.memory_swap(percent=bool(percent),
+                                      fields=self._fields(request))
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    @json_response
+    def memory_ram_history(self, request):
+        """Return RAM metrics history."""
+        percent = request.args.get('percent', 0, type=int)
+        return memory.memory_ram_history(window=self._window(request),
+                                         percent=bool(percent))
+
+    @json_response
+    def memory_swap_history(self, request):
+        """Return swap metrics history."""
+        percent = request.args.get('percent', 0, type=int)
+        return memory.memory_swap_history(window=self._window(request),
+                                          percent=bool(percent))
 
     #: Disks
     @json_response
@@ -233,20 +650,124 @@ class JacorenServer(object):
         percent = request.args.get('percent', 0, type=int)
         return disks.disks(percent=bool(percent))
 
+    #: Batch
+    @json_response
+    def batch(self, request):
+        """Return several resources retrieved in a single pass."""
+        resources = request.args.getlist('r')
+        if not resources:
+            raise BadRequest("no resources given (use r=<resource>)")
+
+        cpu_time = request.args.get('cpu_time', 0, type=int)
+        percent = request.args.get('percent', 0, type=int)
+        try:
+            return batch._batch(resources, bool(cpu_time), bool(percent),
+                                MAPPING)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+    #: Stream
+    def stream(self, request):
+        """Return Server-Sent Events with resources sampled periodically."""
+        resources = request.args.getlist('r')
+        if not resources:
+            raise BadRequest("no resources given (use r=<resource>)")
+
+        cpu_time = request.args.get('cpu_time', 0, type=int)
+        percent = request.args.get('percent', 0, type=int)
+        try:
+            interval = parse_duration(request.args.get('interval', '1'))
+            subscription = self.streams.subscribe(
+                resources, interval, bool(cpu_time), bool(percent)
+            )
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+        return Response(subscription, headers=_stream_headers,
+                        direct_passthrough=True)
+
+    #: Prometheus
+    def metrics(self, request):
+        """Return all metrics in Prometheus text format."""
+        return Response(self.metrics_renderer.render(),
+                        headers=_metrics_headers)
+
+
+#: Process-wide server instance used by wsgi()
+_server = None
+
+
+def _compress_min_size(value):
+    """Return compress_min_size option given as string."""
+    if value.strip().lower() == 'off':
+        return None
+    return int(value)
+
+
+def _env_options():
+    """Return JacorenServer options set by environment variables."""
+    options = {}
+
+    sample_interval = os.environ.get('JACOREN_SAMPLE_INTERVAL')
+    if sample_interval:
+        options['sample_interval'] = float(sample_interval)
+
+    history = os.environ.get('JACOREN_HISTORY')
+    if history:
+        options['history'] = int(history)
+
+    snapshot = os.environ.get('JACOREN_SNAPSHOT')
+    if snapshot:
+        options['snapshot'] = snapshot
+
+    cache_ttl = os.environ.get('JACOREN_CACHE_TTL')
+    if cache_ttl:
+        options['cache_ttl'] = cache_ttl
+
+    compress_min_size = os.environ.get('JACOREN_COMPRESS_MIN_SIZE')
+    if compress_min_size:
+        options['compress_min_size'] = _compress_min_size(compress_min_size)
+
+    return options
+
+
+def get_server(**options):
+    """
+    Return process-wide JacorenServer instance, creating it if needed.
+
+    On creation, server is given **options** or, if there are none,
+    options read from ``JACOREN_*`` environment variables (so they can
+    be set for ``gunicorn jacoren:wsgi``):
+
+    * ``JACOREN_SAMPLE_INTERVAL`` - ``sample_interval``
+    * ``JACOREN_HISTORY`` - ``history``
+    * ``JACOREN_SNAPSHOT`` - ``snapshot``
+    * ``JACOREN_CACHE_TTL`` - ``cache_ttl``
+    * ``JACOREN_COMPRESS_MIN_SIZE`` - ``compress_min_size`` (``off``
+      disables compression)
+    """
+    global _server
+
+    if _server is None:
+        WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+        _server = JacorenServer(**(options or _env_options()))
+    return _server
+
 
 def wsgi(environ, start_response):
     """WSGI interface."""
-    WSGIRequestHandler.protocol_version = 'HTTP/1.1'
-    server = JacorenServer()
-    return server.wsgi(environ, start_response)
+    return get_server().wsgi(environ, start_response)
 
 
 def main():
     """
-    Run single-threaded server.
+    Run stand-alone server.
 
-    Note: This should be used only if REST API will be called by
-    localhost. Otherwise, wsgi() function should be used.
+    By default, threaded server is run (so event streams do not block
+    other requests). Note: This should be used only if REST API will be
+    called by localhost. Otherwise, wsgi()
+    function should be used, or server should be run with ``--workers``
+    (see :mod:`jacoren._prefork`).
     """
     import argparse
     from werkzeug.serving import run_simple
@@ -261,8 +782,98 @@ def main():
     parser.add_argument('--port',
                         type=int, default='1313',
                         help='port (default: 1313)')
+    parser.add_argument('--sample-interval',
+                        type=float, default=None,
+                        help='sample CPU load in background every '
+                             'SAMPLE_INTERVAL seconds (default: off)')
+    parser.add_argument('--history',
+                        type=int, default=0,
+                        help='keep HISTORY last samples of CPU load and '
+                             'memory metrics (default: 0)')
+    parser.add_argument('--snapshot',
+                        type=str, default=None,
+                        help='share metrics collected by a single collector '
+                             'process through memory-mapped file SNAPSHOT '
+                             '(default: off)')
+    parser.add_argument('--collector',
+                        action='store_true',
+                        help='only run collector for --snapshot file')
+    parser.add_argument('--cache-ttl',
+                        type=str, default=None,
+                        help='cache responses for given time per route, '
+                             'e.g. "/disks=5,/machine=1,*=0.5" '
+                             '(default: off)')
+    parser.add_argument('--compress-min-size',
+                        type=str, default=str(MIN_SIZE),
+                        help='compress responses of at least '
+                             'COMPRESS_MIN_SIZE bytes with gzip, deflate '
+                             'or zstd, "off" disables compression '
+                             '(default: %d)' % (MIN_SIZE,))
+    parser.add_argument('--workers',
+                        type=int, default=0,
+                        help='serve requests with WORKERS pre-forked '
+                             'processes (default: off)')
+    parser.add_argument('--json',
+                        type=str, default=None, choices=list(ENCODERS),
+                        help='JSON encoder (default: fastest installed one)')
+    parser.add_argument('--backend',
+                        type=str, default=None, choices=list(BACKENDS),
+                        help='backend retrieving metrics '
+                             '(default: procfs on Linux, psutil otherwise)')
     args = parser.parse_args()
 
-    WSGIRequestHandler.protocol_version = 'HTTP/1.1'
-    server = JacorenServer()
-    run_simple(args.host, args.port, server)
+    if args.backend is not None:
+        set_backend(args.backend)
+    if args.json is not None:
+        try:
+            set_encoder(args.json)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.snapshot:
+        from jacoren._snapshot import _check_available
+
+        try:
+            _check_available()
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.collector:
+        from jacoren._snapshot import run_collector
+
+        if not args.snapshot:
+            parser.error('--collector requires --snapshot')
+        if not run_collector(args.snapshot, args.sample_interval or 1.):
+            parser.exit(1, 'jacoren: collector is already running\n')
+        return
+
+    if args.cache_ttl:
+        try:
+            parse_ttls(args.cache_ttl)
+        except ValueError as e:
+            parser.error(str(e))
+
+    try:
+        compress_min_size = _compress_min_size(args.compress_min_size)
+    except ValueError:
+        parser.error('invalid --compress-min-size: %r'
+                     % (args.compress_min_size,))
+
+    options = dict(sample_interval=args.sample_interval,
+                   history=args.history,
+                   snapshot=args.snapshot,
+                   cache_ttl=args.cache_ttl,
+                   compress_min_size=compress_min_size)
+
+    if args.workers:
+        from jacoren._prefork import serve
+
+        if not hasattr(os, 'fork'):
+            parser.error('--workers is not supported on this platform')
+        if args.workers < 1:
+            parser.error('--workers must be positive')
+        serve(args.host, args.port, args.workers, options)
+        return
+
+    server = get_server(**options)
+    run_simple(args.host, args.port, server, threaded=True)
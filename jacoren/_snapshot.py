@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for sharing metrics between processes.
+
+A single collector process periodically reads CPU, memory and disks
+metrics, encodes every resource served by the REST API and publishes
+them in a memory-mapped file. Every reader (e.g. WSGI worker) serves
+requests straight from that file, so the cost of collecting metrics
+does not grow with the number of workers, and all of them return the
+same numbers.
+
+File layout (little-endian)::
+
+    header:  seq (Q), timestamp (d), heartbeat (d), entries count (I),
+             data size (I)
+    index:   entries count * (key length (H), offset (I), length (I)),
+             followed by all keys
+    data:    encoded resources
+
+Writer uses a seqlock: ``seq`` is odd while file is being updated and
+is incremented again when update is complete. Reader retries if ``seq``
+was odd or changed while it was copying data.
+"""
+
+from __future__ import print_function
+import os
+import sys
+import mmap
+import time
+import struct
+import subprocess
+from collections import OrderedDict
+
+from jacoren._json import dumps
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, snapshots are not available
+    fcntl = None
+
+
+#: Header format and offsets of its fields
+_header = struct.Struct('<QddII')
+_seq = struct.Struct('<Q')
+_timestamp = struct.Struct('<d')
+_timestamp_offset = 8
+_heartbeat = struct.Struct('<d')
+_heartbeat_offset = 16
+_sizes = struct.Struct('<II')
+_sizes_offset = 24
+#: Index entry format
+_entry = struct.Struct('<HII')
+
+#: Default size of memory-mapped file (in bytes)
+DEFAULT_SIZE = 8 * 1024 * 1024
+
+#: Directory containing jacoren package
+_package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _encode(data):
+    """Encode resource data."""
+    return dumps(data)
+
+
+def _open(path, size):
+    """Open (creating if needed) file and map it into memory."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        return mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+
+
+class SnapshotWriter(object):
+    """Publisher of encoded resources."""
+
+    def __init__(self, path, size=DEFAULT_SIZE):
+        """Map file."""
+        self.path = path
+        self.size = size
+        self._mm = _open(path, size)
+        self._seq = _seq.unpack_from(self._mm, 0)[0] & ~1
+
+    def publish(self, entries, timestamp=None):
+        """
+        Publish encoded resources.
+
+        :param entries: Mapping of resource keys to encoded resources
+        :type entries: dict
+        :raises ValueError: If entries do not fit in file
+        """
+        keys = [key.encode('utf-8') for key in entries]
+        values = list(entries.values())
+
+        offset = (_header.size + _entry.size * len(keys) +
+                  sum(len(key) for key in keys))
+        index = []
+        for key, value in zip(keys, values):
+            index.append((len(key), offset, len(value)))
+            offset += len(value)
+
+        if offset > self.size:
+            raise ValueError("snapshot needs %d bytes, only %d available"
+                             % (offset, self.size))
+
+        mm = self._mm
+
+        # Begin update
+        self._seq += 1
+        _seq.pack_into(mm, 0, self._seq)
+
+        _timestamp.pack_into(mm, _timestamp_offset,
+                             time.time() if timestamp is None else timestamp)
+        _sizes.pack_into(mm, _sizes_offset, len(keys), offset)
+
+        pos = _header.size
+        for entry in index:
+            _entry.pack_into(mm, pos, *entry)
+            pos += _entry.size
+        for key in keys:
+            mm[pos:pos + len(key)] = key
+            pos += len(key)
+        for value in values:
+            mm[pos:pos + len(value)] = value
+            pos += len(value)
+
+        # End update
+        self._seq += 1
+        _seq.pack_into(mm, 0, self._seq)
+
+    @property
+    def heartbeat(self):
+        """Return time of the last read reported by readers."""
+        return _heartbeat.unpack_from(self._mm, _heartbeat_offset)[0]
+
+    def close(self):
+        """Unmap file."""
+        self._mm.close()
+
+
+class SnapshotReader(object):
+    """
+    Reader of resources published by collector.
+
+    If published resources become stale (e.g. collector is not running),
+    reader starts a new collector and returns ``None`` until it
+    publishes fresh data.
+    """
+
+    #: Number of attempts to read consistent data
+    retries = 100
+
+    def __init__(self, path, interval=1., size=DEFAULT_SIZE):
+        """
+        Map file and make sure collector is running.
+
+        :raises ValueError: If snapshots are not available on current
+                            platform
+        """
+        _check_available()
+
+        self.path = path
+        self.interval = float(interval)
+        self.size = size
+        self.stale_after = 3 * self.interval + 1.
+
+        self._mm = _open(path, size)
+        self._seq = None
+        self._index = {}
+        self._heartbeat = 0.
+        self._collector = None
+        self._spawned = None
+
+    def _read_index(self, count):
+        """Parse index of published resources."""
+        mm = self._mm
+        entries = [_entry.unpack_from(mm, _header.size + i * _entry.size)
+                   for i in range(count)]
+
+        pos = _header.size + count * _entry.size
+        index = {}
+        for key_length, offset, length in entries:
+            key = mm[pos:pos + key_length].decode('utf-8')
+            index[key] = (offset, length)
+            pos += key_length
+        return index
+
+    @property
+    def stale(self):
+        """Return True if published resources are stale."""
+        timestamp = _header.unpack_from(self._mm, 0)[1]
+        return time.time() - timestamp > self.stale_after
+
+    def get(self, key, spawn=True):
+        """
+        Return encoded resource.
+
+        :param spawn: If True and published data is stale, collector is
+                      started (which must not be done e.g. on event loop)
+        :type spawn: bool
+        :returns: Encoded resource or ``None`` if it was not published or
+                  published data is stale
+        :rtype: bytes, None
+        """
+        mm = self._mm
+
+        for _ in range(self.retries):
+            seq, timestamp, _, count, _ = _header.unpack_from(mm, 0)
+            if seq & 1:
+                time.sleep(0)
+                continue
+
+            now = time.time()
+            if now - timestamp > self.stale_after:
+                if spawn:
+                    self.ensure_collector()
+                return None
+            if now - self._heartbeat > self.interval:
+                self._heartbeat = now
+                _heartbeat.pack_into(mm, _heartbeat_offset, now)
+
+            index = self._index
+            if seq != self._seq:
+                try:
+                    index = self._read_index(count)
+                except (struct.error, UnicodeDecodeError):
+                    continue
+
+            entry = index.get(key)
+            if entry is None:
+                value = None
+            else:
+                offset, length = entry
+                value = mm[offset:offset + length]
+
+            if _seq.unpack_from(mm, 0)[0] == seq:
+                self._seq, self._index = seq, index
+                return value
+
+        return None
+
+    def ensure_collector(self):
+        """Start collector process, unless one is already running."""
+        if self._collector is not None and self._collector.poll() is None:
+            return
+        if (self._spawned is not None and
+                time.time() - self._spawned < self.stale_after):
+            return
+        if _locked(self.path):
+            return
+
+        # Make sure collector imports the same package
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [_package_root] +
+            [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p]
+        )
+
+        self._spawned = time.time()
+        self._collector = subprocess.Popen(
+            [sys.executable, '-c',
+             'import sys; from jacoren._snapshot import _main; '
+             '_main(sys.argv[1:])',
+             self.path, str(self.interval), str(self.size)],
+            close_fds=True, env=env,
+        )
+
+    def close(self):
+        """Unmap file."""
+        self._mm.close()
+
+
+def _check_available():
+    """
+    Raise error if snapshots are not available on current platform.
+
+    :raises ValueError: If file locks (``fcntl``) are not available
+    """
+    if fcntl is None:
+        raise ValueError("snapshots are not available on this platform "
+                         "(fcntl module is required)")
+
+
+def _lock_path(path):
+    """Return path of collector lock file."""
+    return path + '.lock'
+
+
+def _locked(path):
+    """Return True if some collector holds lock for given file."""
+    fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def _collect_cpu(entries):
+    """Collect and encode CPU resources."""
+    from jacoren import cpu
+
+    info = cpu.cpu_info()
+    load = cpu.cpu_load()
+    times = cpu.cpu_load(cpu_time=True)
+    freq = cpu.cpu_freq()
+
+    entries['/cpu/load'] = _encode(load)
+    entries['/cpu/load?cpu_time=1'] = _encode(times)
+    entries['/cpu/freq'] = _encode(freq)
+    entries['/cpu'] = _encode(OrderedDict((
+        ('info', info), ('load', load), ('freq', freq),
+    )))
+    entries['/cpu?cpu_time=1'] = _encode(OrderedDict((
+        ('info', info), ('load', times), ('freq', freq),
+    )))
+
+    for core in range(len(load)):
+        core_freq = freq[core] if isinstance(freq, list) else freq
+
+        entries['/cpu/load/%d' % core] = _encode(load[core])
+        entries['/cpu/load/%d?cpu_time=1' % core] = _encode(times[core])
+        entries['/cpu/freq/%d' % core] = _encode(core_freq)
+        entries['/cpu/%d' % core] = _encode(OrderedDict((
+            ('load', load[core]), ('freq', core_freq),
+        )))
+        entries['/cpu/%d?cpu_time=1' % core] = _encode(OrderedDict((
+            ('load', times[core]), ('freq', core_freq),
+        )))
+
+
+def _collect_memory(entries):
+    """Collect and encode memory resources."""
+    from jacoren import memory
+
+    for query, percent in (('', False), ('?percent=1', True)):
+        ram = memory.memory_ram(percent)
+        swap = memory.memory_swap(percent)
+
+        entries['/memory/ram' + query] = _encode(ram)
+        entries['/memory/swap' + query] = _encode(swap)
+        entries['/memory' + query] = _encode(OrderedDict((
+            ('ram', ram), ('swap', swap),
+        )))
+
+
+def _collect_disks(entries):
+    """Collect and encode disks resources."""
+    from jacoren import disks
+
+    entries['/disks'] = _encode(disks.disks())
+    entries['/disks?percent=1'] = _encode(disks.disks(percent=True))
+
+
+def collect():
+    """
+    Collect metrics and encode every resource served from snapshot.
+
+    Every metric is read once; all variants of a resource (e.g. whole
+    CPU and single cores) are built from the same reading. If collecting
+    a group of resources fails, they are left out, so readers fall back
+    to collecting them on their own.
+
+    :returns: Mapping of resource keys (path with query) to encoded
+              resources
+    :rtype: OrderedDict
+    """
+    entries = OrderedDict()
+
+    for collector in (_collect_cpu, _collect_memory, _collect_disks):
+        group = OrderedDict()
+        try:
+            collector(group)
+        except Exception as e:
+            print("jacoren collector: %s failed: %r" % (collector.__name__, e),
+                  file=sys.stderr)
+        else:
+            entries.update(group)
+
+    return entries
+
+
+def run_collector(path, interval=1., size=DEFAULT_SIZE, idle_timeout=None):
+    """
+    Collect and publish metrics every **interval** seconds.
+
+    Only one collector can run for given file; if another one holds
+    the lock, function returns immediately.
+
+    :param path: Path of memory-mapped file
+    :param interval: Collection interval in seconds
+    :param size: Size of memory-mapped file
+    :param idle_timeout: If isn't ``None``, collector stops when there
+                         were no reads for **idle_timeout** seconds.
+    :type path: str
+    :type interval: float
+    :type size: int
+    :type idle_timeout: float, None
+    :returns: False if another collector is running, True otherwise
+    :rtype: bool
+    :raises ValueError: If snapshots are not available on current platform
+    """
+    _check_available()
+
+    lock = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        os.close(lock)
+        return False
+
+    writer = SnapshotWriter(path, size)
+    started = time.time()
+    next_tick = started
+
+    try:
+        while True:
+            try:
+                writer.publish(collect())
+            except ValueError as e:
+                print("jacoren collector: %s" % (e,), file=sys.stderr)
+
+            now = time.time()
+            last_read = max(writer.heartbeat, started)
+            if idle_timeout is not None and now - last_read > idle_timeout:
+                return True
+
+            # Skip ticks missed by slow collection
+            next_tick = max(next_tick + interval, now)
+            time.sleep(next_tick - now)
+    finally:
+        writer.close()
+        os.close(lock)
+
+
+def _main(argv):
+    """Run collector started by SnapshotReader."""
+    path, interval, size = argv[0], float(argv[1]), int(argv[2])
+
+    # Collector exits when readers are gone
+    run_collector(path, interval, size,
+                  idle_timeout=max(10 * interval, 30.))
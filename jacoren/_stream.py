@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for streaming metrics as Server-Sent Events.
+
+Subscribers of the same interval (and ``cpu_time``/``percent`` flags)
+share a single channel. Every interval, its sampler collects all
+resources requested by its subscribers in one pass (see
+:mod:`jacoren.batch`) and encodes each of them once; every subscriber
+then gets an event built out of the already encoded resources. Cost of
+collection does not grow with the number of subscribers.
+
+Channel is started by its first subscriber and stopped when the last one
+leaves. Subscribers always get the newest sample: if one falls behind,
+samples it missed are skipped, not queued.
+
+If collection fails, subscribers get an ``error`` event instead of
+a sample and the stream goes on::
+
+    id: 7
+    event: error
+    data: {"timestamp":1507901234.5678,"error":"<message>"}
+"""
+
+import time
+import logging
+import threading
+
+from jacoren import cpu, batch
+from jacoren._backends import get_backend, times_percent
+from jacoren._json import MAPPING, dumps
+from jacoren._sampler import Sampler
+
+
+#: Shortest interval (in seconds) of stream
+MIN_INTERVAL = 0.1
+
+#: Seconds subscriber waits for a sample before it checks its channel
+_WAIT = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class _StreamPass(batch._Pass):
+    """Collection pass measuring CPU load since the previous tick."""
+
+    def __init__(self, channel):
+        """Init empty pass of channel."""
+        super(_StreamPass, self).__init__(channel.cpu_time, channel.percent,
+                                          MAPPING)
+        self.channel = channel
+
+    def _load(self):
+        """Return CPU load of every core since the previous tick."""
+        if self.cpu_time:
+            return cpu._cpu_load(True, None, MAPPING)
+
+        backend = get_backend()
+        times = backend.cpu_times()
+        last, self.channel.times = self.channel.times, times
+        return cpu._sampled_load(
+            [times_percent(t1, t2) for t1, t2 in zip(last, times)],
+            backend.cpu_fields, None, MAPPING
+        )
+
+    def load(self):
+        """Return CPU load of every core."""
+        return self._get('load', self._load)
+
+
+class _Channel(object):
+    """Resources collected at a fixed interval for all subscribers."""
+
+    def __init__(self, interval, cpu_time, percent):
+        """Init channel, without starting it."""
+        self.interval = interval
+        self.cpu_time = cpu_time
+        self.percent = percent
+        self.sampler = Sampler(self.tick, interval)
+
+        #: Builders of subscribed resources and numbers of their subscribers
+        self.builders = {}
+        self.counts = {}
+        self.subscriptions = set()
+
+        #: Last sample
+        self.seq = 0
+        self.timestamp = None
+        self.encoded = {}
+        self.error = None
+
+        self.times = get_backend().cpu_times()
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def add(self, subscription):
+        """Add subscription to channel."""
+        with self.cond:
+            self.subscriptions.add(subscription)
+            for name, builder in subscription.builders:
+                self.builders[name] = builder
+                self.counts[name] = self.counts.get(name, 0) + 1
+
+    def remove(self, subscription):
+        """Remove subscription from channel."""
+        with self.cond:
+            self.subscriptions.discard(subscription)
+            for name, _ in subscription.builders:
+                self.counts[name] -= 1
+                if not self.counts[name]:
+                    del self.counts[name]
+                    del self.builders[name]
+
+    def close(self):
+        """Stop collecting resources and wake subscribers up."""
+        self.sampler.stop()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def tick(self):
+        """Collect and encode subscribed resources."""
+        with self.cond:
+            builders = list(self.builders.items())
+
+        collection = _StreamPass(self)
+        timestamp = time.time()
+        try:
+            encoded = dict((name, dumps(builder(collection)))
+                           for name, builder in builders)
+            error = None
+        except Exception as e:
+            logger.exception("collecting streamed resources failed")
+            encoded, error = {}, dumps(str(e) or e.__class__.__name__)
+
+        with self.cond:
+            self.seq += 1
+            self.timestamp = timestamp
+            self.encoded = encoded
+            self.error = error
+            self.cond.notify_all()
+            callbacks = [s.callback for s in self.subscriptions
+                         if s.callback is not None]
+
+        for callback in callbacks:
+            callback()
+
+
+class Subscription(object):
+    """
+    Iterable of Server-Sent Events of a single subscriber.
+
+    Iterating blocks until the next sample is collected. Subscription
+    must be closed once it is not needed (WSGI servers close response
+    iterables), otherwise its resources are collected forever.
+    """
+
+    def __init__(self, streams, channel, builders):
+        """Init subscription of channel."""
+        self.streams = streams
+        self.channel = channel
+        self.builders = builders
+        self.names = [name for name, _ in builders]
+        self.seq = channel.seq
+        self.closed = False
+
+        #: Function called (in sampler thread) once a sample is collected
+        self.callback = None
+
+    def _event(self):
+        """Return event of a new sample, if any (channel lock is held)."""
+        channel = self.channel
+        if channel.seq == self.seq:
+            return None
+
+        if channel.error is not None:
+            self.seq = channel.seq
+            return b''.join((
+                ('id: %d\nevent: error\n' % (channel.seq,)).encode('ascii'),
+                b'data: {"timestamp":', dumps(channel.timestamp),
+                b',"error":', channel.error, b'}\n\n',
+            ))
+
+        encoded = channel.encoded
+        if any(name not in encoded for name in self.names):
+            # Sample collected before subscription was added
+            return None
+
+        self.seq = channel.seq
+        return b''.join((
+            ('id: %d\n' % (channel.seq,)).encode('ascii'),
+            b'data: {"timestamp":', dumps(channel.timestamp),
+            b',"resources":{',
+            b','.join(dumps(name) + b':' + encoded[name]
+                      for name in self.names),
+            b'}}\n\n',
+        ))
+
+    def poll(self):
+        """
+        Return event of a new sample without waiting for it.
+
+        :returns: Encoded event or ``None`` if there is no new sample
+        :rtype: bytes, None
+        """
+        with self.channel.cond:
+            return self._event()
+
+    def __iter__(self):
+        """Return iterator of events."""
+        return self
+
+    def __next__(self):
+        """Return event of the next sample."""
+        channel = self.channel
+        with channel.cond:
+            while True:
+                if self.closed or channel.closed:
+                    raise StopIteration
+
+                event = self._event()
+                if event is not None:
+                    return event
+                channel.cond.wait(_WAIT)
+
+    next = __next__
+
+    def close(self):
+        """Unsubscribe."""
+        if not self.closed:
+            self.closed = True
+            self.streams.unsubscribe(self)
+
+
+class Streams(object):
+    """Channels of streamed resources, one per interval and flags."""
+
+    def __init__(self):
+        """Init without channels."""
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, resources, interval=1.0, cpu_time=False,
+                  percent=False):
+        """
+        Return subscription of resources collected every **interval**.
+
+        :param resources: Names of resources (see :func:`jacoren.batch.batch`)
+        :param interval: Seconds between samples
+        :param cpu_time: If true, CPU load is given as CPU times
+        :param percent: If true, memory and disks metrics are given as
+                        percentages
+        :type resources: list
+        :type interval: float
+        :type cpu_time: bool
+        :type percent: bool
+        :raises ValueError: If resource is unknown or interval is too short
+        :rtype: Subscription
+        """
+        if interval < MIN_INTERVAL:
+            raise ValueError("interval must be at least %gs" % (MIN_INTERVAL,))
+
+        builders = []
+        for resource in resources:
+            name = resource.strip('/')
+            if name not in [n for n, _ in builders]:
+                builders.append((name, batch._builder(resource)))
+
+        key = (float(interval), bool(cpu_time), bool(percent))
+        with self._lock:
+            channel = self._channels.get(key)
+            if channel is None or not channel.sampler.running:
+                # Sampler of channel inherited by fork() is not running
+                channel = self._channels[key] = _Channel(*key)
+                channel.sampler.start()
+
+            subscription = Subscription(self, channel, builders)
+            channel.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Remove subscription, stopping its channel if it was the last."""
+        channel = subscription.channel
+        with self._lock:
+            channel.remove(subscription)
+            if channel.subscriptions:
+                return
+
+            key = (channel.interval, channel.cpu_time, channel.percent)
+            if self._channels.get(key) is channel:
+                del self._channels[key]
+        channel.close()
+
+    def __len__(self):
+        """Return number of running channels."""
+        return len(self._channels)
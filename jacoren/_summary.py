@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for summarizing CPU load of all cores.
+
+CPU times of all cores are handled as a single cores x fields matrix:
+deltas between two samples, CPU time percentages and statistics of every
+field (mean, min, max and 95th percentile) are computed column-wise,
+together with the busiest cores. If ``numpy`` is installed, every step
+is a single vectorized operation over the whole matrix; otherwise, the
+same values are computed in pure Python.
+
+Percentiles use the nearest-rank method, so both implementations return
+the same values.
+"""
+
+import math
+from collections import OrderedDict
+
+import psutil
+
+from jacoren._backends import times_percent
+
+
+#: Summary statistics of every field
+STATS = ('mean', 'min', 'max', 'p95')
+
+#: Default number of busiest cores
+TOP = 3
+
+#: NumPy module (``False`` until first use, ``None`` if not installed)
+_np = False
+
+
+def numpy():
+    """Return NumPy module, or ``None`` if it is not installed."""
+    global _np
+
+    if _np is False:
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        _np = np
+    return _np
+
+
+def _rank(count, p=95):
+    """Return index of **p**-th percentile of sorted values (nearest-rank)."""
+    return min(max(int(math.ceil(p / 100. * count)), 1), count) - 1
+
+
+def _guest(fields):
+    """
+    Return index of first field included in others (Linux guest times).
+
+    Same as in :func:`jacoren._backends.times_percent`.
+    """
+    if psutil.LINUX and len(fields) > 8:
+        return 8
+    return None
+
+
+def _percent_py(last, times):
+    """Return CPU time percentages of every core (pure Python)."""
+    return [list(times_percent(t1, t2)) for t1, t2 in zip(last, times)]
+
+
+def _summarize_py(fields, rows, top):
+    """Return used percentages, statistics and busiest cores (pure Python)."""
+    idle = list(fields).index('idle')
+    for row in rows:
+        row.append(round(100. - row[idle], 2))
+
+    count = len(rows)
+    p95 = _rank(count)
+    stats = dict((stat, []) for stat in STATS)
+    for column in zip(*rows):
+        ordered = sorted(column)
+        stats['mean'].append(sum(column) / count)
+        stats['min'].append(ordered[0])
+        stats['max'].append(ordered[-1])
+        stats['p95'].append(ordered[p95])
+
+    used = [row[-1] for row in rows]
+    busiest = sorted(range(count), key=lambda core: -used[core])[:top]
+    return stats, [(core, used[core]) for core in busiest]
+
+
+def _percent_np(np, fields, last, times):
+    """Return CPU time percentages of every core as a matrix."""
+    deltas = np.asarray(times, dtype=float) - np.asarray(last, dtype=float)
+    total = deltas.sum(axis=1)
+    guest = _guest(fields)
+    if guest is not None:
+        total -= deltas[:, guest:].sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.round(100. * deltas / total[:, np.newaxis], 1)
+    percent[total == 0] = 0.
+    return np.clip(percent, 0., 100., out=percent)
+
+
+def _summarize_np(np, fields, rows, top):
+    """Return statistics and busiest cores of matrix (vectorized)."""
+    rows = np.asarray(rows, dtype=float)
+    idle = list(fields).index('idle')
+    used = np.round(100. - rows[:, idle], 2)
+    rows = np.column_stack((rows, used))
+
+    ordered = np.sort(rows, axis=0)
+    stats = {
+        'mean': rows.mean(axis=0).tolist(),
+        'min': ordered[0].tolist(),
+        'max': ordered[-1].tolist(),
+        'p95': ordered[_rank(len(rows))].tolist(),
+    }
+
+    busiest = np.argsort(-used, kind='stable')[:top]
+    return stats, [(int(core), float(used[core])) for core in busiest]
+
+
+def summary(fields, rows, top=TOP, mapping=OrderedDict, last=None):
+    """
+    Return summary of CPU load of all cores.
+
+    Summary is a mapping::
+
+        {
+            'cores': <number of cores>,
+            'mean': {<field>: <mean percentage>, ..., 'used': ...},
+            'min': {...},
+            'max': {...},
+            'p95': {...},
+            'busiest': [{'core': <core>, 'used': <percentage>}, ...]
+        }
+
+    :param fields: Names of CPU times fields
+    :param rows: CPU times of every core if **last** is given, otherwise
+                 their percentages
+    :param top: Number of busiest cores
+    :param mapping: Mapping type of summary
+    :param last: CPU times of every core in previous sample, percentages
+                 are measured since then
+    :type fields: tuple
+    :type rows: list
+    :type top: int
+    :type last: list, None
+    :rtype: OrderedDict
+    :raises ValueError: If **top** is negative
+    """
+    if top < 0:
+        raise ValueError("top must not be negative")
+    if not rows:
+        return None
+
+    np = numpy()
+    if np is not None:
+        if last is not None:
+            rows = _percent_np(np, fields, last, rows)
+        stats, busiest = _summarize_np(np, fields, rows, top)
+    else:
+        if last is not None:
+            rows = _percent_py(last, rows)
+        else:
+            rows = [list(row) for row in rows]
+        stats, busiest = _summarize_py(fields, rows, top)
+
+    names = tuple(fields) + ('used',)
+    result = mapping((('cores', len(rows)),))
+    for stat in STATS:
+        result[stat] = mapping(zip(names, (round(v, 2) for v in stats[stat])))
+    result['busiest'] = [mapping((('core', core), ('used', used)))
+                         for core, used in busiest]
+    return result
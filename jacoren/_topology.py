@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilities for reading CPU topology of Linux machines from sysfs.
+
+Every online logical CPU belongs to a physical core, a socket (physical
+package) and a NUMA node. Topology is read once and rebuilt only when
+the set of online CPUs (``/sys/devices/system/cpu/online``, kept open by
+:mod:`jacoren._procfs`) changes, e.g. after CPU hotplug.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from jacoren import _procfs
+
+
+#: sysfs directory of NUMA nodes
+NODE_PATH = '/sys/devices/system/node/'
+
+#: Groups of logical CPUs and names of their keys
+GROUPS = OrderedDict((
+    ('socket', ('socket',)),
+    ('core', ('socket', 'core')),
+    ('node', ('node',)),
+))
+
+
+def parse_cpulist(data):
+    """
+    Return logical CPUs of sysfs CPU list, e.g. ``b'0-3,8'``.
+
+    :type data: bytes
+    :rtype: list
+    """
+    cpus = []
+    for part in data.strip().split(b','):
+        if not part:
+            continue
+        start, _, end = part.partition(b'-')
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def _read_int(path, default):
+    """Return integer in file, or default if it is not available."""
+    try:
+        return int(_procfs.read(path))
+    except (IOError, OSError, ValueError):
+        return default
+
+
+class Topology(object):
+    """Topology of online logical CPUs."""
+
+    def __init__(self, online, root=_procfs.CPU_PATH, node_root=NODE_PATH):
+        """
+        Read topology of online CPUs.
+
+        :param online: Contents of ``online`` file (list of online CPUs)
+        :param root: sysfs directory of CPUs
+        :param node_root: sysfs directory of NUMA nodes
+        :type online: bytes
+        """
+        self.online = online
+
+        #: Online logical CPUs, ascending (as listed in /proc/stat)
+        self.cpus = tuple(parse_cpulist(online))
+
+        #: Keys of every logical CPU
+        self.keys = dict((cpu, {}) for cpu in self.cpus)
+        for cpu in self.cpus:
+            path = '%scpu%d/topology/' % (root, cpu)
+            keys = self.keys[cpu]
+            keys['socket'] = _read_int(path + 'physical_package_id', 0)
+            keys['core'] = _read_int(path + 'core_id', cpu)
+            keys['node'] = 0
+
+        try:
+            nodes = os.listdir(node_root)
+        except (IOError, OSError):
+            # Kernel without NUMA support
+            nodes = []
+        for name in nodes:
+            if not (name.startswith('node') and name[4:].isdigit()):
+                continue
+            try:
+                cpus = parse_cpulist(_procfs.read(node_root + name +
+                                                  '/cpulist'))
+            except (IOError, OSError, ValueError):
+                continue
+            for cpu in cpus:
+                if cpu in self.keys:
+                    self.keys[cpu]['node'] = int(name[4:])
+
+    def groups(self, group):
+        """
+        Return logical CPUs of every group, ordered by group keys.
+
+        :param group: Group (``socket``, ``core`` or ``node``)
+        :type group: str
+        :returns: (keys, CPUs) pairs, where keys are (name, value) pairs
+                  identifying group, e.g. ``(('socket', 0), ('core', 3))``
+        :rtype: list
+        :raises ValueError: If group is unknown
+        """
+        try:
+            names = GROUPS[group]
+        except KeyError:
+            raise ValueError("unknown group: %r (expected one of %s)"
+                             % (group, ', '.join(GROUPS)))
+
+        groups = OrderedDict()
+        for cpu in self.cpus:
+            key = tuple(self.keys[cpu][name] for name in names)
+            groups.setdefault(key, []).append(cpu)
+
+        return [(tuple(zip(names, key)), groups[key])
+                for key in sorted(groups)]
+
+
+class TopologyReader(object):
+    """Topology of online CPUs, rebuilt when they change."""
+
+    def __init__(self, root=_procfs.CPU_PATH, node_root=NODE_PATH):
+        """
+        Init reader without reading topology.
+
+        :param root: sysfs directory of CPUs
+        :param node_root: sysfs directory of NUMA nodes
+        """
+        self.root = root
+        self.node_root = node_root
+        self._topology = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Return current topology.
+
+        :returns: Topology or ``None`` if it is not available (e.g. on
+                  platforms other than Linux)
+        :rtype: Topology, None
+        """
+        try:
+            online = _procfs.read(self.root + 'online')
+        except (IOError, OSError):
+            return None
+
+        topology = self._topology
+        if topology is None or topology.online != online:
+            with self._lock:
+                topology = self._topology
+                if topology is None or topology.online != online:
+                    topology = self._topology = Topology(
+                        online, self.root, self.node_root)
+        return topology
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for retrieving several resources at once."""
+
+import re
+import time
+from collections import OrderedDict
+
+from jacoren import machine, cpu, memory, disks
+
+
+#: Resources of a single logical core, e.g. ``cpu/load/3``
+_core_re = re.compile(r'^(cpu|cpu/load|cpu/freq)/(\d+)$')
+
+
+class _Pass(object):
+    """
+    Single collection pass.
+
+    Every metric is read at most once, no matter how many resources
+    need it (e.g. ``cpu``, ``cpu/load`` and ``cpu/load/3`` share one
+    reading of CPU times).
+    """
+
+    def __init__(self, cpu_time, percent, mapping):
+        """Init empty pass."""
+        self.cpu_time = cpu_time
+        self.percent = percent
+        self.mapping = mapping
+        self._values = {}
+
+    def _get(self, name, func, *args):
+        """Return memoized result of function."""
+        try:
+            return self._values[name]
+        except KeyError:
+            value = self._values[name] = func(*args)
+            return value
+
+    def uptime(self):
+        """Return machine uptime."""
+        return self._get('uptime', machine.machine_uptime)
+
+    def users(self):
+        """Return logged users."""
+        return self._get('users', machine.machine_users)
+
+    def load(self):
+        """Return CPU load of every core."""
+        return self._get('load', cpu._cpu_load,
+                         self.cpu_time, None, self.mapping)
+
+    def freq(self):
+        """Return CPU frequency."""
+        return self._get('freq', cpu.cpu_freq)
+
+    def ram(self):
+        """Return RAM metrics."""
+        return self._get('ram', memory.memory_ram, self.percent)
+
+    def swap(self):
+        """Return swap metrics."""
+        return self._get('swap', memory.memory_swap, self.percent)
+
+    def disks(self):
+        """Return disks metrics."""
+        return self._get('disks', disks.disks, self.percent)
+
+    def core_load(self, core):
+        """Return CPU load of a single core, or None."""
+        load = self.load()
+        return load[core] if core < len(load) else None
+
+    def core_freq(self, core):
+        """Return CPU frequency of a single core."""
+        freq = self.freq()
+        if isinstance(freq, list) and core < len(freq):
+            return freq[core]
+        # Single value for every core on some platforms
+        return cpu.cpu_freq(core)
+
+
+#: Builders of resources (named as REST API paths)
+_resources = {
+    'machine': lambda p: p.mapping((
+        ('os', machine.OS),
+        ('version', machine.VERSION),
+        ('uptime', p.uptime()),
+        ('users', p.users()),
+    )),
+    'machine/uptime': lambda p: p.mapping((('uptime', p.uptime()),)),
+    'machine/users': lambda p: p.mapping((('users', p.users()),)),
+    'cpu': lambda p: p.mapping((
+        ('info', cpu.cpu_info()),
+        ('load', p.load()),
+        ('freq', p.freq()),
+    )),
+    'cpu/info': lambda p: cpu.cpu_info(),
+    'cpu/load': lambda p: p.load(),
+    'cpu/freq': lambda p: p.freq(),
+    'memory': lambda p: p.mapping((
+        ('ram', p.ram()),
+        ('swap', p.swap()),
+    )),
+    'memory/ram': lambda p: p.ram(),
+    'memory/swap': lambda p: p.swap(),
+    'disks': lambda p: p.disks(),
+}
+
+
+def _core_resource(p, name, core):
+    """Return resource of a single logical core, or None."""
+    load = p.core_load(core)
+    if name == 'cpu/load':
+        return load
+    if load is None:
+        return None
+    if name == 'cpu/freq':
+        return p.core_freq(core)
+    return p.mapping((
+        ('load', load),
+        ('freq', p.core_freq(core)),
+    ))
+
+
+def _builder(resource):
+    """Return builder of resource."""
+    name = resource.strip('/')
+    builder = _resources.get(name)
+    if builder is not None:
+        return builder
+
+    match = _core_re.match(name)
+    if match is None:
+        raise ValueError("unknown resource: %r" % (resource,))
+
+    name, core = match.group(1), int(match.group(2))
+    return lambda p: _core_resource(p, name, core)
+
+
+def _batch(resources, cpu_time, percent, mapping):
+    """Return batch of resources as instances of given mapping type."""
+    builders = [(resource.strip('/'), _builder(resource))
+                for resource in resources]
+
+    timestamp = time.time()
+    collection = _Pass(cpu_time, percent, mapping)
+
+    return mapping((
+        ('timestamp', timestamp),
+        ('resources', mapping(
+            (name, builder(collection)) for name, builder in builders
+        )),
+    ))
+
+
+def batch(resources, cpu_time=False, percent=False):
+    """
+    Return several resources retrieved in a single pass.
+
+    Resources are named as REST API paths (without leading slash), e.g.
+    ``cpu/load``, ``cpu/load/3``, ``memory/ram``, ``disks`` or
+    ``machine/uptime``. Every resource has the same form as its REST API
+    response. Resources of nonexistent cores are ``None``.
+
+    All resources are retrieved in one pass: every metric is read once
+    (e.g. ``cpu`` and ``cpu/load/3`` share one reading of CPU times),
+    and all of them share a single timestamp.
+
+    Function returns an OrderedDict::
+
+        {
+            'timestamp': <UNIX timestamp of pass>,
+            'resources': {
+                <resource>: <resource data>,
+                ...
+            },
+        }
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.batch.batch(['machine/uptime', 'memory/swap'],
+    ...                     percent=True)
+    OrderedDict([('timestamp', 1507901234.5678),
+                 ('resources',
+                  OrderedDict([('machine/uptime',
+                                OrderedDict([('uptime', 13881)])),
+                               ('memory/swap',
+                                OrderedDict([('total', 4294963200),
+                                             ('used', 0.0),
+                                             ('free', 100.0),
+                                             ('sin', 0),
+                                             ('sout', 0)]))]))])
+
+    :param resources: Names of resources
+    :param cpu_time: If true, CPU load is given as CPU times
+                     (see :func:`jacoren.cpu.cpu_load`).
+    :param percent: If true, memory and disks metrics are given as
+                    percentages (see :func:`jacoren.memory.memory`
+                    and :func:`jacoren.disks.disks`).
+    :type resources: list
+    :type cpu_time: bool
+    :type percent: bool
+    :raises ValueError: If resource is unknown
+
+    :returns: Timestamp and resources
+    :rtype: OrderedDict
+    """
+    return _batch(resources, cpu_time, percent, OrderedDict)
@@ -1,27 +1,64 @@
 # -*- coding: utf-8 -*-
 
-"""Utilities for CPU info."""
+"""
+Utilities for CPU info.
 
+Constants ``ARCH``, ``BITS``, ``NAME``, ``LOGICAL_CORES``,
+``PHYSICAL_CORES`` and ``CORES`` are probed on first access, as some of
+them run external commands.
+"""
+
+import os
+import sys
+import time
 import platform
 import psutil
 from collections import OrderedDict
 
+from jacoren import _procfs, _fields, _summary, _topology
+from jacoren._backends import get_backend, times_percent
+from jacoren._sampler import Sampler
+from jacoren._history import RingBuffer
+
+
+#: Probes of constants, run on first access:
+#:
+#: * ``ARCH`` - architecture (machine type)
+#: * ``BITS`` - bit architecture
+#: * ``NAME`` - CPU name
+#: * ``LOGICAL_CORES`` - number of logical cores
+#: * ``PHYSICAL_CORES`` - number of physical cores
+#: * ``CORES`` - number of cores
+_probes = {
+    'ARCH': platform.machine,
+    'BITS': lambda: platform.architecture()[0],
+    'NAME': platform.processor,
+    'LOGICAL_CORES': lambda: psutil.cpu_count(logical=True),
+    'PHYSICAL_CORES': lambda: psutil.cpu_count(logical=False),
+    'CORES': lambda: _constant('LOGICAL_CORES'),
+}
+
 
-#: Architecture (machine type)
-ARCH = platform.machine()
+def _constant(name):
+    """Return constant, probing it on first access."""
+    try:
+        return globals()[name]
+    except KeyError:
+        value = globals()[name] = _probes[name]()
+        return value
 
-#: Bit architecture
-BITS, _ = platform.architecture()
 
-#: CPU name
-NAME = platform.processor()
+def __getattr__(name):
+    """Return constant probed on first access (PEP 562)."""
+    if name in _probes:
+        return _constant(name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
-#: Number of logical cores
-LOGICAL_CORES = psutil.cpu_count(logical=True)
-#: Number of physical cores
-PHYSICAL_CORES = psutil.cpu_count(logical=False)
-#: Number of cores
-CORES = LOGICAL_CORES
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ is not supported, probe constants eagerly
+    for _name in _probes:
+        _constant(_name)
 
 
 def cpu_info():
@@ -57,15 +94,157 @@ def cpu_info():
     :rtype: OrderedDict
     """
     return OrderedDict((
-        ('arch', ARCH),
-        ('bits', BITS),
-        ('name', NAME),
-        ('cores', CORES),
-        ('physical_cores', PHYSICAL_CORES),
+        ('arch', _constant('ARCH')),
+        ('bits', _constant('BITS')),
+        ('name', _constant('NAME')),
+        ('cores', _constant('CORES')),
+        ('physical_cores', _constant('PHYSICAL_CORES')),
     ))
 
 
-def cpu_load(cpu_time=False, core=None):
+class _LoadSampler(Sampler):
+    """Sampler keeping CPU load of the last completed window(s)."""
+
+    def __init__(self, interval, history=0):
+        """Init sampler and take a baseline sample."""
+        super(_LoadSampler, self).__init__(self.sample, interval)
+
+        self.backend = get_backend()
+        self._times = self.backend.cpu_times()
+        self.cores = len(self._times)
+        self.fields = self.backend.cpu_fields
+        self.load = None
+
+        if history:
+            self.history = RingBuffer(self.cores * len(self.fields),
+                                      history)
+        else:
+            self.history = None
+
+    def sample(self):
+        """Read CPU times and close current window."""
+        times = self.backend.cpu_times()
+
+        self.load = [times_percent(t1, t2)
+                     for t1, t2 in zip(self._times, times)]
+        self._times = times
+
+        if self.history is not None:
+            self.history.append(time.time(),
+                                [v for values in self.load for v in values])
+
+
+#: Background CPU load sampler (see start_sampler())
+_sampler = None
+
+
+def start_sampler(interval=1.0, history=0):
+    """
+    Start sampling CPU times in a background thread.
+
+    While sampler is running, :func:`jacoren.cpu.cpu_load` returns CPU
+    time percentages of the last completed window of **interval**
+    seconds instead of measuring them since the previous call. This makes
+    results independent of how often (and by how many callers) it is
+    called, and leaves no system calls on the request path.
+
+    If **history** is non-zero, sampler also keeps CPU load of that many
+    last windows. See :func:`jacoren.cpu.cpu_load_history`.
+
+    Calling it again restarts sampler with new interval (and drops
+    history).
+
+    Until first window completes, ``cpu_load()`` behaves as if sampler
+    was not running.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.cpu.start_sampler(interval=5)
+    >>> jacoren.cpu.cpu_load(core=0)
+    OrderedDict([('user', 10.6),
+                 ('system', 1.7),
+                 ...
+
+    :param interval: Sampling interval in seconds
+    :param history: Number of windows kept in history
+    :type interval: float
+    :type history: int
+    """
+    global _sampler
+
+    stop_sampler()
+    _sampler = _LoadSampler(interval, history)
+    _sampler.start()
+
+
+def stop_sampler():
+    """
+    Stop background CPU times sampler.
+
+    .. seealso:: :func:`jacoren.cpu.start_sampler`
+    """
+    global _sampler
+
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+
+
+def sampler_running():
+    """
+    Return True if background CPU times sampler is running.
+
+    .. seealso:: :func:`jacoren.cpu.start_sampler`
+    """
+    return _sampler is not None and _sampler.running
+
+
+def _load_names(tree, fields, cpu_time):
+    """Return requested CPU load fields, ``None`` for all of them."""
+    if not cpu_time:
+        fields = tuple(fields) + ('used',)
+    return _fields.leaves(tree, fields, 'load.')
+
+
+def _load_mapper(fields, cpu_time, mapping, names=None):
+    """Return function mapping CPU times of a single core to dictionary."""
+    if names is None:
+        def _mapper(values):
+            cpu = mapping(zip(fields, values))
+            if not cpu_time:
+                cpu['used'] = float(round(100. - cpu['idle'], 2))
+            return cpu
+        return _mapper
+
+    # Only requested fields are built
+    idle = list(fields).index('idle')
+    indices = [(name, None if name == 'used' else list(fields).index(name))
+               for name in names]
+
+    def _mapper(values):
+        return mapping(
+            (name, float(round(100. - values[idle], 2)) if i is None
+             else values[i])
+            for name, i in indices
+        )
+    return _mapper
+
+
+def _sampled_load(load, fields, core, mapping=OrderedDict, names=None):
+    """Return CPU load of the last window completed by sampler."""
+    _mapper = _load_mapper(fields, False, mapping, names)
+
+    if core is None:
+        return [_mapper(values) for values in load]
+    else:
+        try:
+            return _mapper(load[core])
+        except IndexError:
+            return None
+
+
+def cpu_load(cpu_time=False, core=None, fields=None):
     """
     Return CPU load.
 
@@ -171,48 +350,287 @@ def cpu_load(cpu_time=False, core=None):
                  given logical core (counting from zero) as ``OrderedDict``
                  instance. Otherwise, it will return a list of ``OrderedDict``
                  instances with metrics for all cores.
+    :param fields: If isn't ``None``, function will return only given
+                   fields (e.g. ``'used,idle'``), skipping conversion
+                   of the other ones.
     :type cpu_time: bool
     :type core: int, None
+    :type fields: str, list, None
+    :raises ValueError: If unknown field is requested
 
     .. note:: If **core** is beyond possible range, function will return
               ``None``.
 
+    .. note:: If background sampler is running, CPU time percentages are
+              taken from its last completed window.
+              See :func:`jacoren.cpu.start_sampler`.
+
+    .. note:: With ``procfs`` backend (default on Linux), CPU time
+              percentages of a single core are measured since the previous
+              call for the same core. See :func:`jacoren.set_backend`.
+
     :returns: CPU load for all or single logical core
     :rtype: list, OrderedDict, None
     """
-    if cpu_time:
-        cpus = psutil.cpu_times(percpu=True)
+    return _cpu_load(cpu_time, core, OrderedDict,
+                     _fields.parse_fields(fields))
+
+
+def _cpu_load(cpu_time, core, mapping, fields=None):
+    """
+    Return CPU load as instances of given mapping type.
+
+    **fields** is a tree of requested fields
+    (see :func:`jacoren._fields.parse_fields`).
+    """
+    times_fields, rows = _load_rows(cpu_time, core)
+    names = _load_names(fields, times_fields, cpu_time)
+    _mapper = _load_mapper(times_fields, cpu_time, mapping, names)
+
+    if core is None:
+        return [_mapper(values) for values in rows]
     else:
-        cpus = psutil.cpu_times_percent(percpu=True)
-    cpus = [cpu._asdict() for cpu in cpus]
+        return None if rows is None else _mapper(rows)
 
-    # Mapper returning dictionary for a single CPU data
-    def _mapper(cpu):
+
+def _load_rows(cpu_time, core):
+    """
+    Return names of CPU times fields and CPU load as tuples of values.
+
+    For a single core, its tuple (or ``None`` if it does not exist) is
+    returned instead of a list.
+    """
+    sampler = _sampler
+    if not cpu_time and sampler is not None and sampler.running:
+        # Before first window completes, fall back to backend
+        load = sampler.load
+        if load is not None:
+            if core is None:
+                return sampler.fields, load
+            try:
+                return sampler.fields, load[core]
+            except IndexError:
+                return sampler.fields, None
+
+    backend = get_backend()
+    if core is None:
         if cpu_time:
-            for k, v in cpu.items():
-                cpu[k] = float(round(v, 2))
-        else:
-            cpu['used'] = float(round(100. - cpu['idle'], 2))
+            return backend.cpu_fields, backend.cpu_times()
+        return backend.cpu_fields, backend.cpu_times_percent()
+    else:
+        if cpu_time:
+            return backend.cpu_fields, backend.cpu_times_core(core)
+        return backend.cpu_fields, backend.cpu_times_percent_core(core)
+
+
+#: CPU times of the previous cpu_load_summary() call
+_summary_times = None
+
+
+def cpu_load_summary(top=_summary.TOP):
+    """
+    Return summary statistics of CPU load of all cores.
+
+    Function returns an OrderedDict instance::
+
+        {
+            'cores': <number of logical cores>,
+            'mean': {<field>: <mean percentage>, ..., 'used': ...},
+            'min': {<field>: <lowest percentage>, ...},
+            'max': {<field>: <highest percentage>, ...},
+            'p95': {<field>: <95th percentile>, ...},
+            'busiest': [
+                {'core': <core>, 'used': <used CPU>},
+                ...
+            ]
+        }
+
+    Fields are the same as in :func:`cpu_load`. If ``numpy`` is
+    installed, percentages and statistics of all cores are computed in
+    a single vectorized pass, otherwise in pure Python.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.cpu.cpu_load_summary(top=1)
+    OrderedDict([('cores', 4),
+                 ('mean', OrderedDict([('user', 10.8), ..., ('used', 13.85)])),
+                 ('min', OrderedDict([('user', 8.8), ..., ('used', 11.2)])),
+                 ('max', OrderedDict([('user', 12.5), ..., ('used', 15.3)])),
+                 ('p95', OrderedDict([('user', 12.5), ..., ('used', 15.3)])),
+                 ('busiest', [OrderedDict([('core', 2), ('used', 15.3)])])])
+
+    :param top: Number of busiest cores
+    :type top: int
+
+    .. note:: If background sampler is running, CPU time percentages are
+              taken from its last completed window. Otherwise, they are
+              measured since the previous call (or since boot for the
+              first one).
+
+    :returns: Summary of CPU load
+    :rtype: OrderedDict
+    :raises ValueError: If **top** is negative
+    """
+    return _cpu_load_summary(top, OrderedDict)
+
+
+def _cpu_load_summary(top, mapping):
+    """Return summary of CPU load as instances of given mapping type."""
+    global _summary_times
+
+    sampler = _sampler
+    if sampler is not None and sampler.running:
+        load = sampler.load
+        if load is not None:
+            return _summary.summary(sampler.fields, load, top, mapping)
+
+    backend = get_backend()
+    times = backend.cpu_times()
+    last, _summary_times = _summary_times, times
+    if last is None or len(last) != len(times):
+        last = [(0.,) * len(t) for t in times]
+    return _summary.summary(backend.cpu_fields, times, top, mapping, last)
 
+
+def cpu_load_history(window=None, core=None):
+    """
+    Return CPU load history.
+
+    History is recorded by background sampler started with non-zero
+    ``history`` (see :func:`jacoren.cpu.start_sampler`). Function returns
+    an OrderedDict instance::
+
+        {
+            'interval': <sampling interval in seconds>,
+            'timestamp': [<end of window (UNIX time)>, ...],
+            'load': [
+                ...
+                {
+                    'user': [<user processes>, ...],
+                    'system': [<kernel processes>, ...],
+                    'idle': [<idle CPU>, ...],
+                    'used': [<used CPU>, ...],
+                    ...
+                },
+                ...
+            ]
+        }
+
+    Every list holds CPU time percentages of consecutive windows, oldest
+    first. Available fields are the same as for
+    :func:`jacoren.cpu.cpu_load`.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.cpu.start_sampler(interval=1, history=3600)
+    >>> jacoren.cpu.cpu_load_history(window=3, core=0)
+    OrderedDict([('interval', 1.0),
+                 ('timestamp', [1498259311.27, 1498259312.27, 1498259313.27]),
+                 ('load', OrderedDict([('user', [10.6, 8.8, 11.4]),
+                                       ('nice', [0.0, 0.0, 0.0]),
+                                       ('system', [1.7, 2.0, 1.7]),
+                                       ('idle', [86.2, 88.8, 84.7]),
+                                       ...
+                                       ('used', [13.8, 11.2, 15.3])]))])
+
+    :param window: If isn't ``None``, function will return only windows
+                   ended in last **window** seconds. Otherwise, it will
+                   return whole history.
+    :param core: If isn't ``None``, function will return history only for
+                 given logical core (counting from zero) as ``OrderedDict``
+                 instance. Otherwise, it will return a list of ``OrderedDict``
+                 instances with history for all cores.
+    :type window: float, None
+    :type core: int, None
+
+    .. note:: If history is not recorded or **core** is beyond possible
+              range, function will return ``None``.
+
+    :returns: CPU load history for all or single logical core
+    :rtype: OrderedDict, None
+    """
+    sampler = _sampler
+    if sampler is None or not sampler.running or sampler.history is None:
+        return None
+
+    if window is None:
+        times, values = sampler.history.since()
+    else:
+        times, values = sampler.history.since(time.time() - window)
+
+    fields = sampler.fields
+    stride = sampler.history.width
+
+    # Mapper returning dictionary with history for a single CPU
+    def _mapper(core):
+        base = core * len(fields)
+        cpu = OrderedDict(
+            (field, values[base + i::stride].tolist())
+            for i, field in enumerate(fields)
+        )
+        cpu['used'] = [float(round(100. - v, 2)) for v in cpu['idle']]
         return cpu
 
     if core is None:
-        return [_mapper(cpu) for cpu in cpus]
+        load = [_mapper(core) for core in range(sampler.cores)]
+    elif 0 <= core < sampler.cores:
+        load = _mapper(core)
     else:
-        try:
-            return _mapper(cpus[core])
-        except IndexError:
-            return None
+        return None
+
+    return OrderedDict((
+        ('interval', sampler.interval),
+        ('timestamp', times.tolist()),
+        ('load', load),
+    ))
+
+
+#: CPU frequency of non-Linux platforms, where it is fixed (``None``
+#: until first use)
+_cpufreq = None
+
+#: If true, CPU frequency is read from sysfs (``None`` until first use)
+_cpufreq_sysfs = None
+
+
+#: Reader of cpufreq files of all cores
+_freq_reader = _procfs.CpufreqReader()
+
+
+def refresh_cpu_freq():
+    """
+    Read minimal and maximal CPU frequency again on next call.
+
+    On Linux, :func:`cpu_freq` reads the limits of every core only once
+    (they only change with frequency policy), and re-reads them
+    automatically only if current frequency falls outside of them. Call
+    this function after changing frequency policy.
+    """
+    _freq_reader.refresh()
+
+
+def _fixed_freq():
+    """Return fixed CPU frequency of non-Linux platforms."""
+    global _cpufreq
+
+    if _cpufreq is None:
+        _cpufreq = psutil.cpu_freq(percpu=False)._asdict()
+    return _cpufreq
 
 
-# CPU frequency is fixed for non-Linux platforms
-if psutil.LINUX:
-    _cpufreq = None
-else:
-    _cpufreq = psutil.cpu_freq(percpu=False)._asdict()
+def _sysfs_freq():
+    """Return True if CPU frequency is available in sysfs."""
+    global _cpufreq_sysfs
 
+    if _cpufreq_sysfs is None:
+        _cpufreq_sysfs = bool(psutil.LINUX and
+                              os.path.isdir(_procfs.cpufreq_path(0)))
+    return _cpufreq_sysfs
 
-def cpu_freq(core=None):
+
+def cpu_freq(core=None, fields=None):
     """
     Return CPU frequency.
 
@@ -259,29 +677,66 @@ def cpu_freq(core=None):
                  given logical core (counting from zero) as ``OrderedDict``
                  instance. Otherwise, it will return a list of ``OrderedDict``
                  instances with metrics for all cores.
+    :param fields: If isn't ``None``, function will return only given
+                   fields (e.g. ``'current'``). On Linux, files of other
+                   fields are not read.
     :type core: int, None
+    :type fields: str, list, None
+    :raises ValueError: If unknown field is requested
 
-    .. note:: If current platform is a Linux distribution, **core** is ignored.
-              Otherwise, if **core** is beyond possible range, function will
-              return ``None``.
+    .. note:: **core** is index among online logical cores (the CPU
+              number, unless some CPUs are offline), as in
+              :func:`cpu_load`. On Linux, frequencies of that core are
+              read from cpufreq directory of the CPU it maps to, and if
+              **core** is beyond possible range, function will return
+              ``None``. On other platforms, where frequency is fixed,
+              **core** is ignored.
 
     :returns: CPU frequency for all or single logical core
     :rtype: list, OrderedDict, None
     """
+    return _cpu_freq(core, OrderedDict, _fields.parse_fields(fields))
+
+
+#: Fields of CPU frequency
+_freq_fields = ('current', 'min', 'max')
+
+
+def _cpu_freq(core, mapping=OrderedDict, fields=None):
+    """Return CPU frequency as instances of given mapping type."""
+    names = _fields.leaves(fields, _freq_fields, 'freq.')
+    if names is None:
+        names = _freq_fields
+
+    if _sysfs_freq():
+        read = _freq_reader.read
+        # sysfs directories are named by CPU numbers, not core indices
+        cpus = _online_cpus()
+        if core is None:
+            freqs = [read(c, names) for c in cpus]
+            if None not in freqs:
+                return [mapping(zip(names, freq)) for freq in freqs]
+        elif 0 <= core < len(cpus):
+            freq = read(cpus[core], names)
+            if freq is not None:
+                return mapping(zip(names, freq))
+
     if psutil.LINUX:
         cpus = psutil.cpu_freq(percpu=True)
         if core is None:
-            return [cpu._asdict() for cpu in cpus]
+            return [_fields.project(cpu._asdict(), fields, mapping, 'freq.')
+                    for cpu in cpus]
         else:
             try:
-                return cpus[core]._asdict()
+                return _fields.project(cpus[core]._asdict(), fields,
+                                       mapping, 'freq.')
             except IndexError:
                 return None
     else:
-        return _cpufreq
+        return _fields.project(_fixed_freq(), fields, mapping, 'freq.')
 
 
-def cpu(cpu_time=False, core=None):
+def cpu(cpu_time=False, core=None, fields=None):
     """
     Return CPU information.
 
@@ -303,11 +758,18 @@ def cpu(cpu_time=False, core=None):
     :param core: If isn't ``None``, function will return metrics only for
                  given logical core (counting from zero), ommiting ``info``
                  key. Otherwise, it will return metrics for all cores.
+    :param fields: If isn't ``None``, function will return only given
+                   fields as dotted paths, e.g. ``'load.used,freq.current'``
+                   or ``['info', 'load.idle']``. Metrics of other fields are
+                   neither read nor converted.
     :type cpu_time: bool
     :type core: int, None
+    :type fields: str, list, None
+    :raises ValueError: If unknown field is requested
 
-    .. note:: If **core** is beyond possible range, function will return
-              ``None``.
+    .. note:: If **core** does not exist or is offline, function will
+              return ``None``. On Linux, it is checked against current
+              CPU topology (see :func:`cpu_topology`).
 
     :returns: CPU load for all or single logical core
     :rtype: list, None
@@ -316,18 +778,206 @@ def cpu(cpu_time=False, core=None):
                  :func:`jacoren.cpu.cpu_load`,
                  :func:`jacoren.cpu.cpu_freq`
     """
+    return _cpu(cpu_time, core, OrderedDict, _fields.parse_fields(fields))
+
+
+def _cpu(cpu_time, core, mapping, fields=None):
+    """
+    Return CPU information as instances of given mapping type.
+
+    **fields** is a tree of requested fields
+    (see :func:`jacoren._fields.parse_fields`).
+    """
+    if core is not None and not _core_online(core):
+        return None
+
+    if fields is None:
+        if core is None:
+            return mapping((
+                ('info', cpu_info()),
+                ('load', _cpu_load(cpu_time, None, mapping)),
+                ('freq', cpu_freq()),
+            ))
+        else:
+            load = _cpu_load(cpu_time, core, mapping)
+            if load is None:
+                return None
+
+            return mapping((
+                ('load', load),
+                ('freq', cpu_freq(core)),
+            ))
+
+    _fields.check(fields, ('info', 'load', 'freq'))
+    result = mapping()
+
     if core is None:
-        return OrderedDict((
-            ('info', cpu_info()),
-            ('load', cpu_load(cpu_time)),
-            ('freq', cpu_freq()),
-        ))
-    else:
-        result = OrderedDict((
-            ('load', cpu_load(cpu_time, core)),
-            ('freq', cpu_freq(core)),
-        ))
+        if 'info' in fields:
+            result['info'] = _fields.project(cpu_info(), fields['info'],
+                                             mapping, 'info.')
 
-        if result['load'] is None:
+    if 'load' in fields:
+        load = _cpu_load(cpu_time, core, mapping, fields['load'])
+        if load is None:
             return None
-        return result
+        result['load'] = load
+
+    if 'freq' in fields:
+        result['freq'] = _cpu_freq(core, mapping, fields['freq'])
+
+    return result
+
+
+#: Reader of CPU topology
+_topology_reader = _topology.TopologyReader()
+
+
+def _online_cpus():
+    """Return numbers of online CPUs, ascending (indexed by core)."""
+    topology = _topology_reader.get()
+    if topology is None:
+        return range(_constant('CORES'))
+    return topology.cpus
+
+
+def _core_online(core):
+    """Return True if logical core (index among online ones) exists."""
+    return 0 <= core < len(_online_cpus())
+
+
+def cpu_topology():
+    """
+    Return CPU topology.
+
+    Function returns an OrderedDict instance::
+
+        {
+            'cpus': [<online logical CPUs>],
+            'sockets': [
+                {'socket': <socket>, 'cpus': [<logical CPUs>]},
+                ...
+            ],
+            'cores': [
+                {'socket': <socket>, 'core': <core>, 'cpus': [...]},
+                ...
+            ],
+            'nodes': [
+                {'node': <NUMA node>, 'cpus': [...]},
+                ...
+            ]
+        }
+
+    Topology is read from sysfs and re-read whenever a CPU goes online
+    or offline.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.cpu.cpu_topology()
+    OrderedDict([('cpus', [0, 1, 2, 3]),
+                 ('sockets', [OrderedDict([('socket', 0),
+                                           ('cpus', [0, 1, 2, 3])])]),
+                 ('cores', [OrderedDict([('socket', 0), ('core', 0),
+                                         ('cpus', [0, 2])]),
+                            OrderedDict([('socket', 0), ('core', 1),
+                                         ('cpus', [1, 3])])]),
+                 ('nodes', [OrderedDict([('node', 0),
+                                         ('cpus', [0, 1, 2, 3])])])])
+
+    .. note:: Topology is available only on Linux, function returns
+              ``None`` on other platforms.
+
+    :returns: CPU topology
+    :rtype: OrderedDict, None
+    """
+    return _cpu_topology(OrderedDict)
+
+
+def _cpu_topology(mapping):
+    """Return CPU topology as instances of given mapping type."""
+    topology = _topology_reader.get()
+    if topology is None:
+        return None
+
+    result = mapping((('cpus', list(topology.cpus)),))
+    for group in _topology.GROUPS:
+        result[group + 's'] = [mapping(keys + (('cpus', cpus),))
+                               for keys, cpus in topology.groups(group)]
+    return result
+
+
+def cpu_load_groups(group, cpu_time=False):
+    """
+    Return CPU load of groups of logical cores.
+
+    Function returns a list of OrderedDict instances::
+
+        [
+            ...
+            {
+                'socket': <socket>,  # keys of group
+                'cpus': [<logical CPUs of group>],
+                'load': {<fields as in cpu_load()>}
+            },
+            ...
+        ]
+
+    Groups are sockets (``socket``), physical cores (``core``, keyed by
+    socket and core) or NUMA nodes (``node``). CPU time percentages of
+    a group are averages of its logical CPUs, CPU times are their sums.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.cpu.cpu_load_groups('node')
+    [OrderedDict([('node', 0),
+                  ('cpus', [0, 1, 2, 3]),
+                  ('load', OrderedDict([('user', 10.8),
+                                        ...
+                                        ('used', 13.85)]))])]
+
+    :param group: Group (``socket``, ``core`` or ``node``)
+    :param cpu_time: If true, function returns all values as CPU times.
+                     Otherwise, it will return them as CPU time percentages.
+    :type group: str
+    :type cpu_time: bool
+    :raises ValueError: If group is unknown
+
+    .. note:: Topology is available only on Linux, function returns
+              ``None`` on other platforms.
+
+    :returns: CPU load of every group
+    :rtype: list, None
+    """
+    return _cpu_load_groups(group, cpu_time, OrderedDict)
+
+
+def _cpu_load_groups(group, cpu_time, mapping):
+    """Return CPU load of groups as instances of given mapping type."""
+    topology = _topology_reader.get()
+    if topology is None:
+        return None
+    groups = topology.groups(group)
+
+    fields, rows = _load_rows(cpu_time, None)
+    # Rows follow online CPUs in ascending order, as in /proc/stat
+    index = dict((cpu, i) for i, cpu in enumerate(topology.cpus)
+                 if i < len(rows))
+
+    result = []
+    for keys, cpus in groups:
+        members = [rows[index[cpu]] for cpu in cpus if cpu in index]
+        if not members:
+            continue
+
+        if cpu_time:
+            values = [round(sum(column), 2) for column in zip(*members)]
+        else:
+            values = [round(sum(column) / len(members), 2)
+                      for column in zip(*members)]
+        load = mapping(zip(fields, values))
+        if not cpu_time:
+            load['used'] = round(100. - load['idle'], 2)
+
+        result.append(mapping(keys + (('cpus', cpus), ('load', load))))
+    return result
@@ -2,11 +2,202 @@
 
 """Utilities for disks info."""
 
+import os
+import time
+import select
+import threading
 import psutil
 from collections import OrderedDict
 
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
-def disks(percent=False):
+
+#: Seconds to wait for usage of a mountpoint before reporting it as timed out
+TIMEOUT = 2.0
+
+#: Max number of threads retrieving usage (not counting hung ones)
+WORKERS = 8
+
+#: Initial and max time (in seconds) mountpoint is skipped after timeout
+BACKOFF = 5.0
+MAX_BACKOFF = 300.0
+
+
+class _Probe(object):
+    """Pending retrieval of mountpoint usage."""
+
+    __slots__ = ('mountpoint', 'done', 'usage', 'error', 'hung')
+
+    def __init__(self, mountpoint):
+        """Init probe."""
+        self.mountpoint = mountpoint
+        self.done = threading.Event()
+        self.usage = None
+        self.error = None
+        self.hung = False
+
+
+class _UsagePool(object):
+    """
+    Pool of threads retrieving mountpoint usage.
+
+    There is at most one pending probe per mountpoint, so a hung mount
+    (e.g. unreachable NFS server) blocks a single thread, no matter how
+    many times it is asked for. Threads blocked by such mounts do not
+    count towards WORKERS limit.
+    """
+
+    def __init__(self):
+        """Init empty pool."""
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.threads = 0
+        self.idle = 0
+        self.hung = 0
+        self.pending = {}
+        self.backoff = {}
+
+    def _worker(self):
+        """Retrieve usage of queued mountpoints."""
+        while True:
+            with self.lock:
+                self.idle += 1
+            probe = self.queue.get()
+            with self.lock:
+                self.idle -= 1
+
+            try:
+                probe.usage = psutil.disk_usage(probe.mountpoint)
+            except Exception as e:
+                probe.error = e
+
+            with self.lock:
+                if self.pending.get(probe.mountpoint) is probe:
+                    del self.pending[probe.mountpoint]
+                if probe.hung:
+                    self.hung -= 1
+                    if probe.error is None:
+                        self.backoff.pop(probe.mountpoint, None)
+                probe.done.set()
+
+    def submit(self, mountpoint):
+        """Return probe for mountpoint, or None if it is backed off."""
+        with self.lock:
+            until, _ = self.backoff.get(mountpoint, (0., 0.))
+            if time.time() < until:
+                return None
+
+            probe = self.pending.get(mountpoint)
+            if probe is not None:
+                return probe
+
+            probe = self.pending[mountpoint] = _Probe(mountpoint)
+            if (self.idle <= self.queue.qsize() and
+                    self.threads - self.hung < WORKERS):
+                self.threads += 1
+                thread = threading.Thread(target=self._worker,
+                                          name='jacoren-disks')
+                thread.daemon = True
+                thread.start()
+
+        self.queue.put(probe)
+        return probe
+
+    def timed_out(self, probe):
+        """Mark probe as timed out and back off its mountpoint."""
+        with self.lock:
+            if probe.done.is_set():
+                return
+            if not probe.hung:
+                probe.hung = True
+                self.hung += 1
+
+            # Concurrent callers extend backoff only once
+            now = time.time()
+            until, delay = self.backoff.get(probe.mountpoint, (0., 0.))
+            if now >= until:
+                delay = min(max(2 * delay, BACKOFF), MAX_BACKOFF)
+                self.backoff[probe.mountpoint] = (now + delay, delay)
+
+
+#: Usage retrieval pool (see _get_pool())
+_pool = None
+
+
+def _get_pool():
+    """Return usage retrieval pool of current process."""
+    global _pool
+
+    if _pool is None or _pool.pid != os.getpid():
+        _pool = _UsagePool()
+    return _pool
+
+
+class _MountTable(object):
+    """
+    Cache of mounted partitions.
+
+    On Linux, partitions are re-read only when kernel signals a change
+    of mount table (``/proc/self/mountinfo`` becomes pollable with
+    POLLPRI). On other platforms they are read every time.
+    """
+
+    #: File signalling changes of mount table
+    path = '/proc/self/mountinfo'
+
+    def __init__(self):
+        """Start watching mount table."""
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.partitions = None
+
+        try:
+            # Mount table state is recorded when file is opened, so it
+            # must be opened before partitions are read
+            self._file = open(self.path, 'rb')
+            self._poll = select.poll()
+            self._poll.register(self._file.fileno(),
+                                select.POLLPRI | select.POLLERR)
+        except (IOError, OSError, AttributeError):
+            self._file = self._poll = None
+
+    def changed(self):
+        """Return True if mount table changed since the previous call."""
+        if self._poll is None:
+            return True
+        return bool(self._poll.poll(0))
+
+    def get(self):
+        """Return mounted partitions."""
+        with self.lock:
+            if self.changed() or self.partitions is None:
+                self.partitions = [
+                    disk._asdict()
+                    for disk in psutil.disk_partitions(all=False)
+                ]
+            return self.partitions
+
+
+#: Mount table cache (see _get_mount_table())
+_mount_table = None
+
+
+def _get_mount_table():
+    """Return mount table cache of current process."""
+    global _mount_table
+
+    # Change events are tracked per open file, so they can't be shared
+    # with parent process
+    if _mount_table is None or _mount_table.pid != os.getpid():
+        _mount_table = _MountTable()
+    return _mount_table
+
+
+def disks(percent=False, timeout=None):
     """
     Return disks metrics.
 
@@ -68,19 +259,56 @@ def disks(percent=False):
                   ('used', 91.0),
                   ('free', 9.0)])]
 
+    Usage of every mountpoint is retrieved concurrently. If it is not
+    retrieved within **timeout** seconds (e.g. because of an unreachable
+    network file system), ``total``, ``used`` and ``free`` are ``None``
+    and disk has an additional ``status`` field:
+
+    * ``timeout`` - usage was not retrieved in time,
+    * ``backoff`` - mountpoint timed out recently and was skipped.
+
+    Mountpoints that time out are skipped for 5 seconds, then for twice
+    as long after every consecutive timeout (up to 5 minutes), or until
+    their pending retrieval succeeds.
+
+    On Linux, list of partitions is cached until mount table changes.
+
     :param percent: If true, function will return ``used`` and ``free``
                     as percentages. Otherwise, it will return them as bytes.
+    :param timeout: Seconds to wait for usage of mountpoints.
+                    If ``None``, :data:`jacoren.disks.TIMEOUT` is used.
     :type percent: bool
+    :type timeout: float, None
 
     :returns: Disks metrics
     :rtype: OrderedDict
     """
-    disks = [disk._asdict()
-             for disk in psutil.disk_partitions(all=False)]
+    disks = _get_mount_table().get()
+
+    pool = _get_pool()
+    probes = [pool.submit(disk['mountpoint']) for disk in disks]
+    deadline = time.time() + (TIMEOUT if timeout is None else timeout)
+
+    #: Mapper returning dictionary for a disk without usage
+    def _stale(disk, status):
+        disk = OrderedDict(disk)
+        disk.update((('total', None), ('used', None), ('free', None),
+                     ('status', status)))
+        return disk
 
     #: Mapper returning dictionary for a single disk metrics
-    def _mapper(disk):
-        usage = psutil.disk_usage(disk['mountpoint'])._asdict()
+    def _mapper(disk, probe):
+        if probe is None:
+            return _stale(disk, 'backoff')
+
+        if not probe.done.wait(max(deadline - time.time(), 0.)):
+            pool.timed_out(probe)
+            return _stale(disk, 'timeout')
+
+        if probe.error is not None:
+            raise probe.error
+
+        usage = probe.usage._asdict()
 
         _percent = usage.pop('percent')
 
@@ -93,4 +321,4 @@ def disks(percent=False):
 
         return OrderedDict(disk, **usage)
 
-    return [_mapper(disk) for disk in disks]
+    return [_mapper(disk, probe) for disk, probe in zip(disks, probes)]
@@ -1,21 +1,50 @@
 # -*- coding: utf-8 -*-
 
-"""Basic machine information."""
+"""
+Basic machine information.
 
+Constants ``OS`` and ``VERSION`` are probed on first access.
+"""
+
+import sys
 import time
 import psutil
 import platform
 from collections import OrderedDict
 
+from jacoren._backends import get_backend
+
+
+#: Probes of constants, run on first access:
+#:
+#: * ``OS`` - machine OS
+#: * ``VERSION`` - machine version tuple (major, minor, release)
+_probes = {
+    'OS': platform.system,
+    'VERSION': lambda: tuple(platform.release().split('.', 3)),
+}
+
+
+def _constant(name):
+    """Return constant, probing it on first access."""
+    try:
+        return globals()[name]
+    except KeyError:
+        value = globals()[name] = _probes[name]()
+        return value
+
 
-#: machine OS
-OS = platform.system()
+def __getattr__(name):
+    """Return constant probed on first access (PEP 562)."""
+    if name in _probes:
+        return _constant(name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
-#: machine version tuple (major, minor, release)
-VERSION = tuple(platform.release().split('.', 3))
 
-#: Boot time
-_boot_time = psutil.boot_time()
+if sys.version_info < (3, 7):
+    # Module __getattr__ is not supported, probe constants eagerly
+    for _name in _probes:
+        _constant(_name)
 
 
 def _tdiff(t1, t2):
@@ -36,7 +65,7 @@ def machine_uptime():
     :return: machine uptime
     :rtype: int
     """
-    return _tdiff(time.time(), _boot_time)
+    return int(round(get_backend().uptime()))
 
 
 def machine_users():
@@ -121,8 +150,8 @@ def machine():
     :rtype: OrderedDict
     """
     return OrderedDict((
-        ('os', OS),
-        ('version', VERSION),
+        ('os', _constant('OS')),
+        ('version', _constant('VERSION')),
         ('uptime', machine_uptime()),
         ('users', machine_users()),
     ))
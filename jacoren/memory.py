@@ -2,11 +2,17 @@
 
 """Utilities for memory info."""
 
+import time
 import psutil
 from collections import OrderedDict
 
+from jacoren._backends import get_backend
+from jacoren._fields import parse_fields, subtree, check, leaves
+from jacoren._sampler import Sampler
+from jacoren._history import RingBuffer
 
-def memory_ram(percent=False):
+
+def memory_ram(percent=False, fields=None):
     """
     Return memory metrics.
 
@@ -71,7 +77,12 @@ def memory_ram(percent=False):
     :param percent: If true, function will return all values (except for
                     ``total``) as percentages. Otherwise, it will return
                     them as bytes.
+    :param fields: If isn't ``None``, function will return only given
+                   fields (e.g. ``'available,used'``), skipping conversion
+                   of the other ones.
     :type percent: bool
+    :type fields: str, list, None
+    :raises ValueError: If unknown field is requested
 
     .. note:: ``used`` and ``free`` can be calculated differently and do not
               necessarily will match with ``total - free`` and
@@ -81,22 +92,28 @@ def memory_ram(percent=False):
     :returns: RAM metrics
     :rtype: OrderedDict
     """
-    metrics = psutil.virtual_memory()._asdict()
+    return _memory_ram(percent, parse_fields(fields))
+
+
+def _memory_ram(percent, fields):
+    """Return RAM metrics of requested fields."""
+    metrics = get_backend().virtual_memory()
     del metrics['percent']
 
+    names = leaves(fields, tuple(metrics), 'ram.')
     if percent:
-        total = metrics.pop('total')
-
+        total = metrics['total']
         return OrderedDict(
-            [('total', total)] +
-            [(k, round(100. * v / total, 2))
-             for k, v in metrics.items()]
+            (k, v if k == 'total' else round(100. * v / total, 2))
+            for k, v in metrics.items() if names is None or k in names
         )
+    elif names is not None:
+        return OrderedDict((name, metrics[name]) for name in names)
     else:
         return metrics
 
 
-def memory_swap(percent=False):
+def memory_swap(percent=False, fields=None):
     """
     Return swap metrics.
 
@@ -135,34 +152,43 @@ def memory_swap(percent=False):
     :param percent: If true, function will return ``used`` and ``free`` as
                     percentages. Otherwise, it will return them as bytes.
                     Other fields are always returned as bytes.
+    :param fields: If isn't ``None``, function will return only given
+                   fields (e.g. ``'used'``). Swap counters (``sin`` and
+                   ``sout``) are read only if requested.
     :type percent: bool
+    :type fields: str, list, None
+    :raises ValueError: If unknown field is requested
 
     :returns: Swap metrics
     :rtype: OrderedDict
     """
-    metrics = psutil.swap_memory()
+    return _memory_swap(percent, parse_fields(fields))
 
-    if percent:
-        metrics = OrderedDict([
-            ('total', metrics.total),
-            ('used', metrics.percent),
-            ('free', round(100. * metrics.free / metrics.total, 2)),
-            ('sin', metrics.sin),
-            ('sout', metrics.sout),
-        ])
-    else:
-        metrics = metrics._asdict()
-        del metrics['percent']
 
+#: Fields of swap metrics
+_swap_fields = ('total', 'used', 'free', 'sin', 'sout')
+
+
+def _memory_swap(percent, fields):
+    """Return swap metrics of requested fields."""
     if psutil.WINDOWS:
         # sin and sout always 0 for Windows
-        del metrics['sin']
-        del metrics['sout']
+        names = leaves(fields, _swap_fields[:3], 'swap.') or _swap_fields[:3]
+    else:
+        names = leaves(fields, _swap_fields, 'swap.') or _swap_fields
 
-    return metrics
+    metrics = get_backend().swap_memory('sin' in names or 'sout' in names)
+
+    if percent:
+        metrics['used'] = metrics['percent']
+        if 'free' in names:
+            metrics['free'] = round(100. * metrics['free'] / metrics['total'],
+                                    2)
+
+    return OrderedDict((name, metrics[name]) for name in names)
 
 
-def memory(percent=False):
+def memory(percent=False, fields=None):
     """
     Return memory metrics.
 
@@ -179,7 +205,12 @@ def memory(percent=False):
 
     :param percent: If true, function will return some values as percentages.
                     Otherwise, it will return them as bytes.
+    :param fields: If isn't ``None``, function will return only given
+                   fields as dotted paths, e.g. ``'ram.available,swap'``.
+                   Metrics of other fields are neither read nor converted.
     :type percent: bool
+    :type fields: str, list, None
+    :raises ValueError: If unknown field is requested
 
     :returns: Swap metrics
     :rtype: OrderedDict
@@ -187,7 +218,219 @@ def memory(percent=False):
     .. seealso:: :func:`jacoren.memory.memory_ram`,
                  :func:`jacoren.memory.memory_swap`
     """
+    fields = parse_fields(fields)
+    check(fields, ('ram', 'swap'))
+
+    metrics = OrderedDict()
+    if fields is None or 'ram' in fields:
+        metrics['ram'] = _memory_ram(percent, subtree(fields, 'ram'))
+    if fields is None or 'swap' in fields:
+        metrics['swap'] = _memory_swap(percent, subtree(fields, 'swap'))
+    return metrics
+
+
+def _fields(metrics):
+    """Return names of fields kept in history."""
+    return tuple(f for f in metrics
+                 if f != 'percent' and
+                 not (psutil.WINDOWS and f in ('sin', 'sout')))
+
+
+class _MemorySampler(Sampler):
+    """Sampler keeping RAM and swap metrics history."""
+
+    def __init__(self, interval, history):
+        """Init sampler."""
+        super(_MemorySampler, self).__init__(self.sample, interval)
+
+        self.backend = get_backend()
+        self.ram_fields = _fields(self.backend.virtual_memory())
+        self.swap_fields = _fields(self.backend.swap_memory())
+        self.ram = RingBuffer(len(self.ram_fields), history)
+        self.swap = RingBuffer(len(self.swap_fields), history)
+
+    def sample(self):
+        """Read and record memory metrics."""
+        now = time.time()
+        ram = self.backend.virtual_memory()
+        swap = self.backend.swap_memory()
+
+        self.ram.append(now, [ram[f] for f in self.ram_fields])
+        self.swap.append(now, [swap[f] for f in self.swap_fields])
+
+
+#: Background memory sampler (see start_sampler())
+_sampler = None
+
+
+def start_sampler(interval=1.0, history=3600):
+    """
+    Start recording memory metrics history in a background thread.
+
+    Every **interval** seconds RAM and swap metrics are appended to
+    a fixed-size history of **history** last samples.
+    See :func:`jacoren.memory.memory_ram_history` and
+    :func:`jacoren.memory.memory_swap_history`.
+
+    Calling it again restarts sampler with new interval (and drops
+    history).
+
+    :param interval: Sampling interval in seconds
+    :param history: Number of samples kept in history
+    :type interval: float
+    :type history: int
+    """
+    global _sampler
+
+    stop_sampler()
+    _sampler = _MemorySampler(interval, history)
+    _sampler.start()
+
+
+def stop_sampler():
+    """
+    Stop recording memory metrics history.
+
+    .. seealso:: :func:`jacoren.memory.start_sampler`
+    """
+    global _sampler
+
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+
+
+def _history(buffer, fields, window):
+    """Return timestamps and per-field history from buffer."""
+    if window is None:
+        times, values = buffer.since()
+    else:
+        times, values = buffer.since(time.time() - window)
+
+    stride = len(fields)
+    return times.tolist(), OrderedDict(
+        (field, [int(v) for v in values[i::stride]])
+        for i, field in enumerate(fields)
+    )
+
+
+def memory_ram_history(window=None, percent=False):
+    """
+    Return RAM metrics history.
+
+    History is recorded by background sampler
+    (see :func:`jacoren.memory.start_sampler`). Function returns an
+    OrderedDict instance::
+
+        {
+            'interval': <sampling interval in seconds>,
+            'timestamp': [<sample time (UNIX time)>, ...],
+            'ram': {
+                'total': [<total memory>, ...],
+                'available': [<available memory>, ...],
+                ...
+            }
+        }
+
+    Every list holds consecutive samples, oldest first. Available fields
+    are the same as for :func:`jacoren.memory.memory_ram`.
+
+    :Example:
+
+    >>> import jacoren
+    >>> jacoren.memory.start_sampler(interval=1)
+    >>> jacoren.memory.memory_ram_history(window=2, percent=True)
+    OrderedDict([('interval', 1.0),
+                 ('timestamp', [1498259312.27, 1498259313.27]),
+                 ('ram', OrderedDict([('total', [4218454016, 4218454016]),
+                                      ('available', [26.77, 26.8]),
+                                      ...
+                                      ('shared', [3.74, 3.74])]))])
+
+    :param window: If isn't ``None``, function will return only samples
+                   taken in last **window** seconds. Otherwise, it will
+                   return whole history.
+    :param percent: If true, function will return all values (except for
+                    ``total``) as percentages. Otherwise, it will return
+                    them as bytes.
+    :type window: float, None
+    :type percent: bool
+
+    .. note:: If history is not recorded, function will return ``None``.
+
+    :returns: RAM metrics history
+    :rtype: OrderedDict, None
+    """
+    sampler = _sampler
+    if sampler is None or not sampler.running:
+        return None
+
+    times, metrics = _history(sampler.ram, sampler.ram_fields, window)
+
+    if percent:
+        total = metrics['total']
+        for k, values in metrics.items():
+            if k != 'total':
+                metrics[k] = [round(100. * v / t, 2)
+                              for v, t in zip(values, total)]
+
+    return OrderedDict((
+        ('interval', sampler.interval),
+        ('timestamp', times),
+        ('ram', metrics),
+    ))
+
+
+def memory_swap_history(window=None, percent=False):
+    """
+    Return swap metrics history.
+
+    History is recorded by background sampler
+    (see :func:`jacoren.memory.start_sampler`). Function returns an
+    OrderedDict instance::
+
+        {
+            'interval': <sampling interval in seconds>,
+            'timestamp': [<sample time (UNIX time)>, ...],
+            'swap': {
+                'total': [<total memory>, ...],
+                'used': [<used memory>, ...],
+                'free': [<free memory>, ...],
+                ...
+            }
+        }
+
+    Every list holds consecutive samples, oldest first. Available fields
+    are the same as for :func:`jacoren.memory.memory_swap`.
+
+    :param window: If isn't ``None``, function will return only samples
+                   taken in last **window** seconds. Otherwise, it will
+                   return whole history.
+    :param percent: If true, function will return ``used`` and ``free`` as
+                    percentages. Otherwise, it will return them as bytes.
+                    Other fields are always returned as bytes.
+    :type window: float, None
+    :type percent: bool
+
+    .. note:: If history is not recorded, function will return ``None``.
+
+    :returns: Swap metrics history
+    :rtype: OrderedDict, None
+    """
+    sampler = _sampler
+    if sampler is None or not sampler.running:
+        return None
+
+    times, metrics = _history(sampler.swap, sampler.swap_fields, window)
+
+    if percent:
+        total = metrics['total']
+        for k in ('used', 'free'):
+            metrics[k] = [round(100. * v / t, 2) if t else 0.0
+                          for v, t in zip(metrics[k], total)]
+
     return OrderedDict((
-        ('ram', memory_ram(percent)),
-        ('swap', memory_swap(percent)),
+        ('interval', sampler.interval),
+        ('timestamp', times),
+        ('swap', metrics),
     ))
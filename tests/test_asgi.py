@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import json
+import asyncio
+
+from jacoren._asgi import JacorenASGI
+from jacoren._server import JacorenServer
+
+
+def request(app, path, query_string=b'', method='GET'):
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': [(b'host', b'localhost')],
+    }
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(app(scope, receive, send))
+    finally:
+        loop.close()
+
+    start, body = sent
+    assert start['type'] == 'http.response.start'
+    assert body['type'] == 'http.response.body'
+    return start['status'], dict(start['headers']), body['body']
+
+
+def test_asgi_routes():
+    app = JacorenASGI(JacorenServer())
+
+    for path in ('/', '/cpu/info', '/machine/uptime', '/cpu/load',
+                 '/cpu/load/0', '/memory/ram', '/disks'):
+        status, headers, body = request(app, path)
+
+        assert status == 200
+        assert headers[b'content-type'] == b'application/json; charset=UTF-8'
+        json.loads(body.decode('utf-8'))
+
+
+def test_asgi_same_as_wsgi():
+    server = JacorenServer()
+    app = JacorenASGI(server)
+
+    status, _, body = request(app, '/')
+    assert status == 200
+    assert body == server.static_responses['/'].body
+
+    status, _, body = request(app, '/machine/uptime')
+    assert status == 200
+    assert list(json.loads(body.decode('utf-8'))) == ['uptime']
+
+    status, _, body = request(app, '/cpu/load', b'cpu_time=1')
+    assert status == 200
+    assert 'used' not in json.loads(body.decode('utf-8'))[0]
+
+
+def test_asgi_404():
+    app = JacorenASGI(JacorenServer())
+
+    status, _, body = request(app, '/cpu/load/1000000')
+    assert status == 404
+    assert json.loads(body.decode('utf-8'))['code'] == 404
+
+    status, _, _ = request(app, '/nonexistent')
+    assert status == 404
+
+
+def test_asgi_blocking():
+    from werkzeug.test import create_environ
+    from werkzeug.wrappers import Request
+
+    app = JacorenASGI(JacorenServer())
+    plain = Request(create_environ('/cpu/load'))
+
+    assert not app.blocking(plain, 'cpu_info')
+    assert not app.blocking(plain, 'cpu_load_history')
+    assert app.blocking(plain, 'disks')
+    assert app.blocking(plain, 'memory_ram')
+
+
+def test_asgi_executor(monkeypatch):
+    import threading
+    from jacoren import memory
+
+    threads = []
+
+    def _memory_ram(percent=False, fields=None):
+        threads.append(threading.current_thread())
+        return {'total': 1}
+
+    monkeypatch.setattr(memory, 'memory_ram', _memory_ram)
+    app = JacorenASGI(JacorenServer(), workers=1)
+
+    status, _, body = request(app, '/memory/ram')
+    assert status == 200
+    assert json.loads(body.decode('utf-8')) == {'total': 1}
+    assert threads[0] is not threading.main_thread()
+
+
+def test_asgi_snapshot(tmpdir, monkeypatch):
+    import threading
+    from jacoren._snapshot import SnapshotReader, SnapshotWriter
+
+    threads = []
+
+    def ensure_collector(self):
+        threads.append(threading.current_thread())
+
+    monkeypatch.setattr(SnapshotReader, 'ensure_collector', ensure_collector)
+
+    path = str(tmpdir.join('snapshot'))
+    app = JacorenASGI(JacorenServer(snapshot=path, cache_ttl='/cpu/load=60'))
+    del threads[:]
+
+    # Stale snapshot, collector is started off the event loop
+    status, _, _ = request(app, '/memory/ram')
+    assert status == 200
+    app.executor.shutdown(wait=True)
+    assert threads and threading.main_thread() not in threads
+
+    SnapshotWriter(path).publish({'/cpu/load': b'[]'})
+    status, headers, body = request(app, '/cpu/load/')
+    assert status == 200
+    assert body == b'[]'
+    # Snapshot responses are finished (cached) as well
+    assert b'etag' in headers
+
+
+def test_asgi_stream():
+    sent = []
+
+    async def receive():
+        if not sent:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        while len(sent) < 3:
+            await asyncio.sleep(0.01)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    server = JacorenServer()
+    app = JacorenASGI(server)
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/stream',
+        'query_string': b'interval=0.1&r=cpu/load&r=memory/ram',
+        'headers': [(b'host', b'localhost')],
+    }
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(asyncio.wait_for(app(scope, receive, send),
+                                                 5))
+    finally:
+        loop.close()
+
+    start, events = sent[0], sent[1:]
+    assert start['status'] == 200
+    assert dict(start['headers'])[b'content-type'].startswith(
+        b'text/event-stream')
+    assert len(events) == 2
+    for event in events:
+        assert event['more_body']
+        data = event['body'].decode('utf-8').split('data: ', 1)[1]
+        assert list(json.loads(data)['resources']) == ['cpu/load',
+                                                       'memory/ram']
+
+    # Last subscriber left, so channel is stopped
+    assert len(server.streams) == 0
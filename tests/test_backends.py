@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import psutil
+import jacoren
+from collections import OrderedDict
+from jacoren import _procfs
+from jacoren._backends import BACKENDS, ProcfsBackend, times_percent
+
+
+@pytest.fixture
+def backends():
+    names = ['psutil']
+    if psutil.LINUX:
+        names.append('procfs')
+    return [BACKENDS[name]() for name in names]
+
+def test_backend_fields(backends):
+    cores = jacoren.cpu.CORES
+
+    for backend in backends:
+        times = backend.cpu_times()
+        assert len(times) == cores
+        for core_times in times:
+            assert len(core_times) == len(backend.cpu_fields)
+
+        assert len(backend.cpu_times_percent()) == cores
+        assert backend.cpu_times_core(cores+1) is None
+        assert backend.cpu_times_percent_core(cores+1) is None
+
+        ram = backend.virtual_memory()
+        assert isinstance(ram, OrderedDict)
+        assert list(ram.keys()) == list(psutil.virtual_memory()._fields)
+
+        swap = backend.swap_memory()
+        assert isinstance(swap, OrderedDict)
+        assert list(swap.keys()) == list(psutil.swap_memory()._fields)
+
+def test_backend_uptime(backends):
+    uptimes = [backend.uptime() for backend in backends]
+
+    for uptime in uptimes:
+        assert isinstance(uptime, float)
+        assert uptime > 0
+    assert max(uptimes) - min(uptimes) < 5
+
+def test_set_backend():
+    backend = jacoren.get_backend()
+    try:
+        jacoren.set_backend('psutil')
+        assert jacoren.get_backend().name == 'psutil'
+
+        with pytest.raises(ValueError):
+            jacoren.set_backend('nope')
+    finally:
+        jacoren.set_backend(backend.name)
+
+def test_times_percent():
+    t1 = (10., 0., 10., 80.)
+    t2 = (20., 0., 10., 110.)
+
+    assert times_percent(t1, t2) == (25.0, 0.0, 0.0, 75.0)
+    assert times_percent(t1, t1) == (0.0, 0.0, 0.0, 0.0)
+
+def test_procfs_memory(monkeypatch):
+    files = {
+        '/proc/meminfo': (b'MemTotal:       1000 kB\n'
+                          b'MemFree:         200 kB\n'
+                          b'MemAvailable:    600 kB\n'
+                          b'Buffers:          50 kB\n'
+                          b'Cached:          250 kB\n'
+                          b'SwapCached:        0 kB\n'
+                          b'Active:          300 kB\n'
+                          b'Inactive:        100 kB\n'
+                          b'SwapTotal:       400 kB\n'
+                          b'SwapFree:        300 kB\n'
+                          b'Shmem:            10 kB\n'
+                          b'Slab:             40 kB\n'
+                          b'SReclaimable:     30 kB\n'),
+        '/proc/vmstat': (b'nr_free_pages 1\n'
+                         b'pswpin 2\n'
+                         b'pswpout 3\n'),
+    }
+    monkeypatch.setattr(_procfs, 'read', lambda path: files[path])
+
+    ram = ProcfsBackend().virtual_memory()
+    assert ram == OrderedDict((
+        ('total', 1024000), ('available', 614400), ('percent', 40.0),
+        ('used', 409600), ('free', 204800), ('active', 307200),
+        ('inactive', 102400), ('buffers', 51200), ('cached', 286720),
+        ('shared', 10240), ('slab', 40960),
+    ))
+
+    swap = ProcfsBackend().swap_memory()
+    assert swap == OrderedDict((
+        ('total', 409600), ('used', 102400), ('free', 307200),
+        ('percent', 25.0), ('sin', 8192), ('sout', 12288),
+    ))
+
+    # Without counters, /proc/vmstat is not read
+    del files['/proc/vmstat']
+    swap = ProcfsBackend().swap_memory(counters=False)
+    assert list(swap.keys()) == ['total', 'used', 'free', 'percent']
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+import pytest
+import jacoren
+from jacoren.batch import batch
+
+
+def test_batch():
+    result = batch(['cpu/load', '/cpu/load/0', 'cpu/0', 'memory/ram',
+                    'disks', 'machine/uptime', 'machine'])
+
+    assert isinstance(result, OrderedDict)
+    assert isinstance(result['timestamp'], float)
+
+    resources = result['resources']
+    assert list(resources) == ['cpu/load', 'cpu/load/0', 'cpu/0',
+                               'memory/ram', 'disks', 'machine/uptime',
+                               'machine']
+    assert resources['cpu/load/0'] == resources['cpu/load'][0]
+    assert resources['cpu/0']['load'] == resources['cpu/load'][0]
+    assert list(resources['machine/uptime']) == ['uptime']
+    assert list(resources['machine']) == ['os', 'version', 'uptime', 'users']
+    assert 'total' in resources['memory/ram']
+
+
+def test_batch_single_pass(monkeypatch):
+    backend = jacoren.get_backend()
+    calls = []
+    cpu_times = backend.cpu_times
+
+    def _cpu_times():
+        calls.append(1)
+        return cpu_times()
+
+    monkeypatch.setattr(backend, 'cpu_times', _cpu_times)
+
+    resources = batch(['cpu', 'cpu/load', 'cpu/load/0', 'cpu/0'],
+                      cpu_time=True)['resources']
+    assert len(calls) == 1
+    assert 'used' not in resources['cpu/load/0']
+
+
+def test_batch_missing_core():
+    resources = batch(['cpu/load/100000', 'cpu/100000'])['resources']
+
+    assert resources['cpu/load/100000'] is None
+    assert resources['cpu/100000'] is None
+
+
+def test_batch_unknown():
+    for resource in ('nope', 'cpu/load/x', 'memory/ram/history'):
+        with pytest.raises(ValueError):
+            batch([resource])
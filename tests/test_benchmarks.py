@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import io
+import sys
+import subprocess
+from benchmarks.bench import (
+    percentile, measure, compare, run, import_cases, core_cases,
+    synthetic_cases, _ROOT,
+)
+
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([7], 90) == 7
+
+    with pytest.raises(ValueError):
+        percentile([], 50)
+
+
+def test_measure():
+    calls = []
+    stats = measure(lambda: calls.append(1), 20, warmup=5)
+
+    assert len(calls) == 25
+    assert list(stats) == ['p50', 'p90', 'p99', 'max', 'ops']
+    assert stats['p50'] <= stats['p90'] <= stats['p99'] <= stats['max']
+
+
+def test_core_cases():
+    from jacoren.cpu import CORES
+
+    cases = core_cases()
+    assert cases[0][0] == 'psutil.cpu_times_core(0)'
+    assert '%s.cpu_times_core(%d)' % (cases[-1][0].split('.')[0],
+                                      CORES - 1) == cases[-1][0]
+    for name, func in cases:
+        assert func() is not None, name
+
+
+def test_synthetic_cases(tmpdir):
+    cases = synthetic_cases(str(tmpdir), sizes=(2, 8))
+    names = [name for name, _ in cases]
+
+    assert 'procfs.cpu_times(7) [8 cpus]' in names
+    assert 'cpufreq.read(7) [8 cpus]' in names
+    for name, func in cases:
+        assert func() is not None, name
+
+
+def test_compare():
+    baseline = {'a': {'p50': 10.}, 'b': {'p50': 10.}}
+    results = {'a': {'p50': 11.9}, 'b': {'p50': 12.1}, 'c': {'p50': 1.}}
+
+    assert compare(results, baseline, 0.2) == [('b', 10., 12.1)]
+    assert compare(results, baseline, 0.5) == []
+
+
+def test_run_skips_errors():
+    import io
+
+    def _fail():
+        raise ZeroDivisionError
+
+    results = run([('ok', lambda: None), ('fail', _fail)], 5, out=io.StringIO())
+    assert list(results) == ['ok']
+
+
+def test_import_cases():
+    cases = import_cases()
+
+    assert [name for name, _ in cases][0] == 'python -c "import jacoren"'
+    results = run(cases[:1], 1, warmup=0, out=io.StringIO())
+    assert list(results) == ['python -c "import jacoren"']
+
+
+def test_import_is_lazy():
+    statement = (
+        'import sys, jacoren; '
+        'print(sorted(m for m in ("psutil", "werkzeug", "jacoren.cpu") '
+        'if m in sys.modules))'
+    )
+    output = subprocess.check_output([sys.executable, '-c', statement],
+                                     cwd=_ROOT)
+    assert output.strip() == b'[]'
+
+    statement = 'import jacoren; print(jacoren.cpu.CORES > 0)'
+    output = subprocess.check_output([sys.executable, '-c', statement],
+                                     cwd=_ROOT)
+    assert output.strip() == b'True'
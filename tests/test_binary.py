@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from jacoren._binary import pack, pack_load, unpack
+
+
+FIELDS = ('user', 'system', 'idle')
+
+
+def test_pack():
+    rows = [(1., 2., 3.), (4.5, 5.5, 6.5)]
+    data = pack(FIELDS, rows)
+
+    assert data[:4] == b'JCPK'
+    # Header and names are padded to a multiple of 8 bytes
+    assert (len(data) - 8 * 6) % 8 == 0
+    assert unpack(data) == (FIELDS, rows)
+
+
+def test_pack_load():
+    rows = [(10., 20., 70.), (0., 0.5, 99.5)]
+
+    assert unpack(pack_load(FIELDS, rows, False)) == (
+        FIELDS + ('used',), [(10., 20., 70., 30.), (0., 0.5, 99.5, 0.5)]
+    )
+    assert unpack(pack_load(FIELDS, rows, True)) == (FIELDS, rows)
+    assert unpack(pack_load(FIELDS, rows, False, ('idle', 'used'))) == (
+        ('idle', 'used'), [(70., 30.), (99.5, 0.5)]
+    )
+    assert unpack(pack_load(FIELDS, [], False)) == (FIELDS + ('used',), [])
+
+
+def test_unpack_err():
+    with pytest.raises(ValueError):
+        unpack(b'JC')
+    with pytest.raises(ValueError):
+        unpack(b'NOPE\x01\x00\x00\x00')
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from werkzeug import Client
+from werkzeug.test import create_environ
+from werkzeug.wrappers import BaseResponse
+
+import jacoren
+from jacoren import _cache
+from jacoren._cache import parse_ttls, CachedResponse
+from jacoren._server import JacorenServer
+
+
+def test_parse_ttls():
+    assert parse_ttls('/disks=5, /machine=1m,*=0.5,') == {
+        '/disks': 5., '/machine': 60., '*': 0.5,
+    }
+
+    for value in ('/disks', '=5', '/disks=x'):
+        with pytest.raises(ValueError):
+            parse_ttls(value)
+
+
+def test_static_etag():
+    client = Client(JacorenServer(), BaseResponse)
+
+    response = client.get('/cpu/info')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'max-age=86400'
+
+    response = client.get('/cpu/info', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    response = client.get('/cpu/info', headers={'If-None-Match': '"x"'})
+    assert response.status_code == 200
+
+
+def test_cache_ttl(monkeypatch):
+    calls = []
+
+    def _disks(percent=False):
+        calls.append(percent)
+        return [{'mountpoint': '/', 'used': len(calls)}]
+
+    monkeypatch.setattr(jacoren.disks, 'disks', _disks)
+    server = JacorenServer(cache_ttl='/disks=60,/cpu/load/<core>=60')
+    client = Client(server, BaseResponse)
+
+    first = client.get('/disks')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] in ('max-age=59', 'max-age=60')
+
+    second = client.get('/disks')
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert calls == [False]
+
+    # Query is part of cache key
+    client.get('/disks?percent=1')
+    assert calls == [False, True]
+
+    response = client.get('/disks',
+                          headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 304
+    assert calls == [False, True]
+
+    # Routes without TTL are not cached
+    assert 'ETag' not in client.get('/memory/ram').headers
+
+    assert 'ETag' in client.get('/cpu/load/0').headers
+    assert client.get('/cpu/load/100000').status_code == 404
+
+
+def test_cache_path_ttls_bounded(monkeypatch):
+    monkeypatch.setattr(_cache, 'MAX_PATHS', 4)
+    cache = JacorenServer(cache_ttl='/cpu/load/<core>=60').cache
+
+    for core in range(10):
+        assert cache.ttl(create_environ('/cpu/load/%d' % (core,))) == 60
+    assert list(cache._path_ttls) == ['/cpu/load/%d' % (core,)
+                                      for core in range(6, 10)]
+
+    # Least recently used path is dropped
+    cache.ttl(create_environ('/cpu/load/6'))
+    cache.ttl(create_environ('/cpu/load/10'))
+    assert list(cache._path_ttls) == ['/cpu/load/8', '/cpu/load/9',
+                                      '/cpu/load/6', '/cpu/load/10']
+
+
+def test_cache_expires(monkeypatch):
+    from jacoren import _cache
+
+    now = [1000.]
+    monkeypatch.setattr(_cache, '_clock', lambda: now[0])
+
+    response = CachedResponse(b'{}', [], ttl=2.)
+    assert response.fresh
+
+    now[0] += 2.
+    assert not response.fresh
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import gzip
+import zlib
+
+from werkzeug.wrappers import Response
+from jacoren._cache import CachedResponse
+from jacoren._compress import Compressor, parse_accept_encoding
+
+
+BODY = b'{"device":"/dev/sda1","mountpoint":"/"}' * 100
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding('gzip, deflate;q=0.5, *;q=0') == {
+        'gzip': 1., 'deflate': .5, '*': 0.,
+    }
+    assert parse_accept_encoding('GZIP;q=x,,') == {'gzip': 0.}
+
+
+def test_choose():
+    compressor = Compressor()
+    compressor.codings.pop('zstd', None)
+
+    assert compressor.choose(None) is None
+    assert compressor.choose('') is None
+    assert compressor.choose('br') is None
+    assert compressor.choose('gzip, deflate') == 'gzip'
+    assert compressor.choose('gzip;q=0.5, deflate') == 'deflate'
+    assert compressor.choose('*') == 'gzip'
+    assert compressor.choose('*, gzip;q=0') == 'deflate'
+    assert compressor.choose('identity') is None
+
+
+def test_apply():
+    compressor = Compressor(min_size=1024)
+    environ = {'HTTP_ACCEPT_ENCODING': 'gzip'}
+
+    response = compressor.apply(environ, Response(BODY))
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.get_data()) == BODY
+
+    response = compressor.apply(environ, Response(BODY[:100]))
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == BODY[:100]
+
+    response = compressor.apply({}, Response(BODY))
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+    response = compressor.apply(environ, Response(BODY, status=404))
+    assert response.get_data() == BODY
+
+
+def _call(response, environ):
+    result = []
+
+    def start_response(status, headers):
+        result[:] = [status, dict(headers)]
+
+    body = b''.join(response(environ, start_response))
+    return result[0], result[1], body
+
+
+def test_cached_response(monkeypatch):
+    compressor = Compressor()
+    calls = []
+    compress = compressor.compress
+
+    def _compress(data, coding):
+        calls.append(coding)
+        return compress(data, coding)
+    monkeypatch.setattr(compressor, 'compress', _compress)
+
+    response = CachedResponse(BODY, [], compressor=compressor)
+    environ = {'HTTP_ACCEPT_ENCODING': 'deflate'}
+
+    for _ in range(3):
+        status, headers, body = _call(response, environ)
+        assert status == '200 OK'
+        assert headers['Content-Encoding'] == 'deflate'
+        assert headers['Content-Length'] == str(len(body))
+        assert zlib.decompress(body) == BODY
+    # Compressed once, then served from cache
+    assert calls == ['deflate']
+
+    etag = headers['ETag']
+    assert etag != response.etag
+
+    status, headers, body = _call(response, dict(environ,
+                                                 HTTP_IF_NONE_MATCH=etag))
+    assert status == '304 Not Modified'
+
+    status, headers, body = _call(response, {})
+    assert 'Content-Encoding' not in headers
+    assert headers['ETag'] == response.etag
+    assert body == BODY
+
+
+def test_cached_response_small():
+    response = CachedResponse(b'{}', [], compressor=Compressor())
+
+    status, headers, body = _call(response, {'HTTP_ACCEPT_ENCODING': 'gzip'})
+    assert 'Content-Encoding' not in headers
+    assert 'Vary' not in headers
+    assert body == b'{}'
@@ -246,3 +246,226 @@ def test_cpu_freq_single_err():
     core_freq = jacoren.cpu.cpu_freq(core=cores+1)
 
     assert core_freq is None
+
+def test_cpu_load_sampler(monkeypatch):
+    import time
+
+    jacoren.cpu.start_sampler(interval=0.05)
+    try:
+        assert jacoren.cpu.sampler_running()
+        time.sleep(0.2)
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("psutil called on request path")
+        monkeypatch.setattr(psutil, 'cpu_times_percent', _fail)
+
+        load = jacoren.cpu.cpu_load()
+        cores = jacoren.cpu.CORES
+        assert isinstance(load, list)
+        assert len(load) == cores
+
+        for core_load in load:
+            assert isinstance(core_load, OrderedDict)
+            assert isinstance(core_load['idle'], float)
+            assert core_load['used'] == round(100. - core_load['idle'], 2)
+
+        assert isinstance(jacoren.cpu.cpu_load(core=0), OrderedDict)
+        assert jacoren.cpu.cpu_load(core=cores+1) is None
+    finally:
+        jacoren.cpu.stop_sampler()
+
+    assert not jacoren.cpu.sampler_running()
+
+
+def test_cpu_load_history():
+    import time
+
+    assert jacoren.cpu.cpu_load_history() is None
+
+    jacoren.cpu.start_sampler(interval=0.05, history=3)
+    try:
+        time.sleep(0.3)
+        history = jacoren.cpu.cpu_load_history()
+        cores = jacoren.cpu.CORES
+
+        assert isinstance(history, OrderedDict)
+        assert history['interval'] == 0.05
+        assert len(history['timestamp']) == 3
+        assert len(history['load']) == cores
+        for core_history in history['load']:
+            assert len(core_history['idle']) == 3
+            assert len(core_history['used']) == 3
+
+        history = jacoren.cpu.cpu_load_history(window=0.06, core=0)
+        assert isinstance(history['load'], OrderedDict)
+        assert 1 <= len(history['timestamp']) <= 2
+
+        assert jacoren.cpu.cpu_load_history(core=cores+1) is None
+    finally:
+        jacoren.cpu.stop_sampler()
+
+def test_cpu_load_single_fields():
+    all_fields = list(jacoren.cpu.cpu_load()[0].keys())
+    all_time_fields = list(jacoren.cpu.cpu_load(cpu_time=True)[0].keys())
+
+    for core in range(jacoren.cpu.CORES):
+        assert list(jacoren.cpu.cpu_load(core=core).keys()) == all_fields
+        assert list(jacoren.cpu.cpu_load(cpu_time=True,
+                                         core=core).keys()) == all_time_fields
+
+def test_cpu_fields(monkeypatch):
+    def _cpu_freq(*args, **kwargs):
+        raise AssertionError('frequency read')
+    monkeypatch.setattr(jacoren.cpu, '_cpu_freq', _cpu_freq)
+
+    cpu = jacoren.cpu.cpu(fields='load.used')
+    assert list(cpu.keys()) == ['load']
+    assert len(cpu['load']) == jacoren.cpu.CORES
+    for core in cpu['load']:
+        assert list(core.keys()) == ['used']
+
+    cpu = jacoren.cpu.cpu(fields=['info.cores', 'load.idle', 'load.used'])
+    assert cpu['info'] == OrderedDict((('cores', jacoren.cpu.CORES),))
+    assert list(cpu['load'][0].keys()) == ['idle', 'used']
+
+    cpu = jacoren.cpu.cpu(core=0, fields='load', cpu_time=True)
+    assert list(cpu['load'].keys()) == list(jacoren.cpu.cpu_load(
+        cpu_time=True, core=0).keys())
+
+    assert jacoren.cpu.cpu(core=jacoren.cpu.CORES + 1,
+                           fields='load.used') is None
+
+def test_cpu_fields_err():
+    for fields in ('nope', 'load.nope', 'load.used.nope', 'load..used'):
+        with pytest.raises(ValueError):
+            jacoren.cpu.cpu(fields=fields)
+
+    with pytest.raises(ValueError):
+        jacoren.cpu.cpu_load(cpu_time=True, fields='used')
+
+def test_cpu_load_fields():
+    load = jacoren.cpu.cpu_load(core=0, fields='user,used')
+    assert list(load.keys()) == ['user', 'used']
+    assert 0. <= load['used'] <= 100.
+
+    freq = jacoren.cpu.cpu_freq(fields='current')
+    for core in freq:
+        assert list(core.keys()) == ['current']
+
+def test_cpu_freq_sysfs(monkeypatch, tmpdir):
+    for core in range(jacoren.cpu.CORES):
+        path = tmpdir.join('cpu%d' % (core,), 'cpufreq')
+        path.ensure(dir=True)
+        path.join('scaling_cur_freq').write(b'1200000\n', 'wb')
+        path.join('scaling_min_freq').write(b'800000\n', 'wb')
+        path.join('scaling_max_freq').write(b'3400000\n', 'wb')
+
+    reader = jacoren._procfs.CpufreqReader(str(tmpdir) + '/')
+    monkeypatch.setattr(jacoren.cpu, '_freq_reader', reader)
+    monkeypatch.setattr(jacoren.cpu, '_cpufreq_sysfs', True)
+
+    freq = jacoren.cpu.cpu_freq()
+    assert len(freq) == jacoren.cpu.CORES
+    assert freq[0] == OrderedDict((('current', 1200.), ('min', 800.),
+                                   ('max', 3400.)))
+    assert jacoren.cpu.cpu_freq(core=0, fields='max') == \
+        OrderedDict((('max', 3400.),))
+
+    tmpdir.join('cpu0', 'cpufreq', 'scaling_max_freq').write(b'3000000\n',
+                                                             'wb')
+    assert jacoren.cpu.cpu_freq(core=0)['max'] == 3400.
+    jacoren.cpu.refresh_cpu_freq()
+    assert jacoren.cpu.cpu_freq(core=0)['max'] == 3000.
+    reader.close()
+
+def test_cpu_freq_sysfs_offline(monkeypatch, tmpdir):
+    from jacoren import _topology
+
+    # cpu1 is offline, so cores 0, 1 and 2 are cpu0, cpu2 and cpu3
+    tmpdir.join('online').write(b'0,2-3\n', 'wb')
+    for cpu in range(4):
+        path = tmpdir.join('cpu%d' % (cpu,), 'cpufreq')
+        path.ensure(dir=True)
+        path.join('scaling_cur_freq').write(b'%d\n' % (cpu * 1000000,), 'wb')
+        path.join('scaling_min_freq').write(b'0\n', 'wb')
+        path.join('scaling_max_freq').write(b'4000000\n', 'wb')
+
+    root = str(tmpdir) + '/'
+    reader = jacoren._procfs.CpufreqReader(root)
+    monkeypatch.setattr(jacoren.cpu, '_freq_reader', reader)
+    monkeypatch.setattr(jacoren.cpu, '_topology_reader',
+                        _topology.TopologyReader(root, root + 'missing/'))
+    monkeypatch.setattr(jacoren.cpu, '_cpufreq_sysfs', True)
+
+    def _psutil_freq(*args, **kwargs):
+        raise AssertionError("sysfs frequencies are available")
+    monkeypatch.setattr(psutil, 'cpu_freq', _psutil_freq)
+
+    freq = jacoren.cpu.cpu_freq(fields='current')
+    assert [f['current'] for f in freq] == [0., 2000., 3000.]
+    assert jacoren.cpu.cpu_freq(core=1)['current'] == 2000.
+    assert jacoren.cpu.cpu_freq(core=2)['current'] == 3000.
+    # Descriptors are kept by CPU number
+    assert sorted(reader._fds) == [0, 2, 3]
+    reader.close()
+
+def test_cpu_load_summary():
+    summary = jacoren.cpu.cpu_load_summary(top=1)
+
+    assert isinstance(summary, OrderedDict)
+    assert summary['cores'] == jacoren.cpu.CORES
+    for stat in ('mean', 'min', 'max', 'p95'):
+        assert 'used' in summary[stat]
+        assert 0. <= summary[stat]['used'] <= 100.
+    assert summary['min']['used'] <= summary['max']['used']
+    assert len(summary['busiest']) == 1
+    assert 0 <= summary['busiest'][0]['core'] < jacoren.cpu.CORES
+
+    with pytest.raises(ValueError):
+        jacoren.cpu.cpu_load_summary(top=-1)
+
+def test_cpu_topology():
+    topology = jacoren.cpu.cpu_topology()
+    if not psutil.LINUX:
+        assert topology is None
+        return
+
+    assert list(topology) == ['cpus', 'sockets', 'cores', 'nodes']
+    assert len(topology['cpus']) == jacoren.cpu.CORES
+    for group in ('sockets', 'cores', 'nodes'):
+        assert sorted(cpu for g in topology[group]
+                      for cpu in g['cpus']) == topology['cpus']
+
+def test_cpu_load_groups(monkeypatch, tmpdir):
+    from jacoren import _topology
+
+    cores = jacoren.cpu.CORES
+    tmpdir.join('online').write(b'0-%d\n' % (cores - 1,), 'wb')
+    for core in range(cores):
+        path = tmpdir.join('cpu%d' % (core,), 'topology')
+        path.ensure(dir=True)
+        path.join('physical_package_id').write(b'0\n', 'wb')
+        path.join('core_id').write(b'%d\n' % (core // 2,), 'wb')
+    reader = _topology.TopologyReader(str(tmpdir) + '/',
+                                      str(tmpdir) + '/missing/')
+    monkeypatch.setattr(jacoren.cpu, '_topology_reader', reader)
+
+    groups = jacoren.cpu.cpu_load_groups('core')
+    assert len(groups) == (cores + 1) // 2
+    assert list(groups[0]) == ['socket', 'core', 'cpus', 'load']
+    assert 'used' in groups[0]['load']
+
+    socket = jacoren.cpu.cpu_load_groups('socket', cpu_time=True)[0]
+    assert socket['cpus'] == list(range(cores))
+    assert 'used' not in socket['load']
+
+    with pytest.raises(ValueError):
+        jacoren.cpu.cpu_load_groups('die')
+
+    # Cores are checked against live topology (cpu0 went offline, so
+    # there is one core less)
+    assert jacoren.cpu.cpu(core=cores, fields='freq') is None
+    tmpdir.join('online').write(b','.join(b'%d' % (core,)
+                                          for core in range(1, cores)) +
+                                b'\n', 'wb')
+    assert jacoren.cpu.cpu(core=cores - 1, fields='freq') is None
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import random
+
+from jacoren._delta import DeltaStore, apply, diff, flatten
+
+
+def _disks(count):
+    return [{
+        'device': '/dev/sd%d' % (i,),
+        'mountpoint': '/mnt/%d' % (i,),
+        'opts': 'rw,relatime',
+        'used': i,
+    } for i in range(count)]
+
+
+def test_flatten():
+    paths, values = flatten({'a/b': [1, {'c~': None}], 'd': {}, 'e': []})
+    assert paths == ['', '/a~1b', '/a~1b/0', '/a~1b/1', '/a~1b/1/c~0',
+                     '/d', '/e']
+    assert values == [dict, list, 1, dict, None, dict, list]
+
+    assert flatten(5) == ([''], [5])
+
+
+def test_diff():
+    old = flatten({'a': 1, 'b': [1, 2, 3], 'c': {'d': 1}})
+    new = flatten({'a': 1.0, 'b': [1, 2], 'c': 5})
+
+    changed, removed = diff(old, new)
+    assert changed == [('/a', 1.0), ('/c', 5)]
+    assert removed == ['/b/2']
+
+
+def test_diff_container_type():
+    # Object became list of the same keys, leaf became container
+    old = {'a': {'0': [], '1': []}, 'b': 'x', 'c': [{'d': 1}]}
+    new = {'a': [[], []], 'b': {'e': [1]}, 'c': [{'d': 1}, {'d': 2}]}
+
+    changed, removed = diff(flatten(old), flatten(new))
+    assert changed == [('/a', [[], []]), ('/b', {'e': [1]}),
+                       ('/c/1', {'d': 2})]
+    assert removed == []
+
+    delta = {'changed': dict(changed), 'removed': removed}
+    assert apply(copy.deepcopy(old), delta) == new
+    assert apply({'0': [], '1': []}, {
+        'changed': dict(diff(flatten({'0': [], '1': []}),
+                             flatten([[], []]))[0]),
+        'removed': [],
+    }) == [[], []]
+
+
+def _random_json(rng, depth=0):
+    kind = rng.randint(0, 5 if depth < 3 else 2)
+    if kind == 0:
+        return rng.choice([None, True, False, 0, 1, 1.0, -2.5])
+    if kind == 1:
+        return rng.choice(['', 'a', '0', 'a/b', '~1'])
+    if kind == 2:
+        return rng.randint(0, 3)
+    if kind in (3, 4):
+        return [_random_json(rng, depth + 1)
+                for _ in range(rng.randint(0, 3))]
+    return dict((rng.choice(['0', '1', 'a', 'b/c', '~']),
+                 _random_json(rng, depth + 1))
+                for _ in range(rng.randint(0, 3)))
+
+
+def _mutate(rng, data, depth=0):
+    if rng.random() < 0.2:
+        return _random_json(rng, depth)
+    if isinstance(data, list):
+        data = [_mutate(rng, v, depth + 1) for v in data
+                if rng.random() > 0.2]
+        if rng.random() < 0.3:
+            data.append(_random_json(rng, depth + 1))
+    elif isinstance(data, dict):
+        data = dict((k, _mutate(rng, v, depth + 1)) for k, v in data.items()
+                    if rng.random() > 0.2)
+        if rng.random() < 0.3:
+            data[rng.choice(['0', 'x', 'a'])] = _random_json(rng, depth + 1)
+    return data
+
+
+def test_apply_diff_roundtrip():
+    rng = random.Random(1313)
+
+    for _ in range(3000):
+        old = _random_json(rng)
+        new = _mutate(rng, old) if rng.random() < 0.8 else _random_json(rng)
+
+        changed, removed = diff(flatten(old), flatten(new))
+        delta = {'changed': dict(changed), 'removed': removed}
+        assert apply(copy.deepcopy(old), delta) == new, (old, new, delta)
+
+        # Same structure shares pointers (fast path)
+        paths, values = flatten(old)
+        _, new_values = flatten(new)
+        if flatten(new)[0] == paths:
+            changed, removed = diff((paths, values), (paths, new_values))
+            delta = {'changed': dict(changed), 'removed': removed}
+            assert apply(copy.deepcopy(old), delta) == new
+
+
+def test_delta():
+    store = DeltaStore()
+    disks = _disks(100)
+
+    delta = store.update('/disks', disks, '')
+    assert delta['since'] is None
+    assert delta['data'] is disks
+    token = delta['token']
+
+    # Nothing changed
+    delta = store.update('/disks', copy.deepcopy(disks), token)
+    assert delta['token'] == token
+    assert delta['changed'] == {}
+    assert delta['removed'] == []
+
+    new = copy.deepcopy(disks)
+    new[3]['used'] = 1000
+    delta = store.update('/disks', new, token)
+    assert delta['token'] != token
+    assert delta['since'] == token
+    assert delta['changed'] == {'/3/used': 1000}
+    assert apply(copy.deepcopy(disks), delta) == new
+
+    # Mounted and unmounted disks
+    for changed in (new[:10], new + _disks(3), new[:50] + _disks(60)):
+        delta = store.update('/disks', changed, token)
+        assert apply(copy.deepcopy(disks), delta) == changed
+
+
+def test_delta_bounded():
+    store = DeltaStore(snapshots=2, resources=2)
+
+    tokens = [store.update('/disks', _disks(i), '')['token']
+              for i in range(1, 4)]
+    assert store.update('/disks', _disks(3), tokens[0])['since'] is None
+    assert store.update('/disks', _disks(3), tokens[2])['since'] == tokens[2]
+    # Tokens of other resources are unknown
+    assert store.update('/cpu/freq', _disks(3), tokens[2])['since'] is None
+
+    store.update('/machine', {}, '')
+    assert store.update('/disks', _disks(3), tokens[2])['since'] is None
@@ -59,3 +59,70 @@ def test_disks_percent():
         assert 'free' in disk
         assert isinstance(disk['free'], float)
 
+
+def test_disks_timeout(monkeypatch):
+    import threading
+    from collections import namedtuple
+
+    partition = namedtuple('sdiskpart', 'device mountpoint fstype opts')
+    usage = namedtuple('sdiskusage', 'total used free percent')
+    release = threading.Event()
+    calls = []
+
+    def _disk_usage(mountpoint):
+        calls.append(mountpoint)
+        if mountpoint == '/hung':
+            release.wait()
+        return usage(100, 25, 75, 25.0)
+
+    monkeypatch.setattr(psutil, 'disk_partitions', lambda all: [
+        partition('/dev/sda1', '/', 'ext4', 'rw'),
+        partition('server:/export', '/hung', 'nfs', 'rw'),
+    ])
+    monkeypatch.setattr(psutil, 'disk_usage', _disk_usage)
+    monkeypatch.setattr(jacoren.disks, '_pool', None)
+    monkeypatch.setattr(jacoren.disks, '_mount_table', None)
+
+    try:
+        disks = jacoren.disks.disks(timeout=0.1)
+
+        assert disks[0]['total'] == 100
+        assert 'status' not in disks[0]
+        assert disks[1]['mountpoint'] == '/hung'
+        assert disks[1]['total'] is None
+        assert disks[1]['used'] is None
+        assert disks[1]['free'] is None
+        assert disks[1]['status'] == 'timeout'
+
+        disks = jacoren.disks.disks(percent=True, timeout=0.1)
+
+        assert disks[0]['used'] == 25.0
+        assert disks[1]['status'] == 'backoff'
+        assert calls.count('/hung') == 1
+    finally:
+        release.set()
+
+
+def test_disks_mount_table_cache(monkeypatch):
+    from collections import namedtuple
+
+    partition = namedtuple('sdiskpart', 'device mountpoint fstype opts')
+    calls = []
+
+    def _disk_partitions(all):
+        calls.append(all)
+        return [partition('/dev/sda1', '/', 'ext4', 'rw')]
+
+    monkeypatch.setattr(psutil, 'disk_partitions', _disk_partitions)
+    monkeypatch.setattr(jacoren.disks, '_mount_table', None)
+
+    table = jacoren.disks._get_mount_table()
+    changed = [False]
+    monkeypatch.setattr(table, 'changed', lambda: changed[0])
+
+    assert table.get() == table.get()
+    assert len(calls) == 1
+
+    changed[0] = True
+    table.get()
+    assert len(calls) == 2
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from jacoren._history import RingBuffer, parse_duration
+
+
+def test_ring_buffer():
+    buffer = RingBuffer(2, 3)
+
+    assert len(buffer) == 0
+    times, values = buffer.since()
+    assert list(times) == []
+    assert list(values) == []
+
+    for i in range(5):
+        buffer.append(float(i), (i, -i))
+
+    assert len(buffer) == 3
+    times, values = buffer.since()
+    assert list(times) == [2., 3., 4.]
+    assert list(values) == [2., -2., 3., -3., 4., -4.]
+
+    times, values = buffer.since(3.)
+    assert list(times) == [3., 4.]
+    assert list(values) == [3., -3., 4., -4.]
+
+def test_ring_buffer_width():
+    buffer = RingBuffer(2, 3)
+
+    with pytest.raises(ValueError):
+        buffer.append(0., (1., 2., 3.))
+
+def test_parse_duration():
+    assert parse_duration('60') == 60.
+    assert parse_duration('60s') == 60.
+    assert parse_duration('5m') == 300.
+    assert parse_duration('1.5h') == 5400.
+
+    with pytest.raises(ValueError):
+        parse_duration('soon')
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import json
+from collections import OrderedDict
+
+import pytest
+from werkzeug import Client
+from werkzeug.wrappers import BaseResponse
+
+from jacoren import _json
+from jacoren._server import JacorenServer
+
+
+def _encoders():
+    names = []
+    for name in _json.ENCODERS:
+        try:
+            _json.ENCODERS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+@pytest.fixture
+def encoder():
+    name = _json.get_encoder()
+    yield
+    _json.set_encoder(name)
+
+
+def test_default_encoder(encoder):
+    _json.set_encoder()
+    assert _json.get_encoder() == _encoders()[0]
+
+
+def test_unknown_encoder(encoder):
+    with pytest.raises(ValueError):
+        _json.set_encoder('yaml')
+
+
+def test_encoders(encoder):
+    data = OrderedDict((
+        ('b', [1, 2.5, 0.1, None, True]),
+        ('a', (OrderedDict((('z', 'x/y'), ('y', -3))), 'text')),
+    ))
+    expected = json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    for name in _encoders():
+        _json.set_encoder(name)
+        assert _json.dumps(data) == expected, name
+
+
+def test_encoders_differences(encoder):
+    data = [u'caf\xe9 \u2603', 2 ** 70, -2 ** 64]
+    expected = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    assert expected == (b'["caf\\u00e9 \\u2603",1180591620717411303424,'
+                        b'-18446744073709551616]')
+
+    for name in _encoders():
+        _json.set_encoder(name)
+        assert _json.dumps(data) == expected, name
+
+    # Floats are spelled differently, but decode to the same values
+    floats = [1e-05, 1e+20, 0.1, 1.5e300]
+    spelled = {
+        'json': b'[1e-05,1e+20,0.1,1.5e+300]',
+        'orjson': b'[0.00001,1e20,0.1,1.5e300]',
+    }
+    for name in _encoders():
+        _json.set_encoder(name)
+        encoded = _json.dumps(floats)
+        if name in spelled:
+            assert encoded == spelled[name]
+        assert json.loads(encoded.decode('ascii')) == floats
+
+    # Non-finite floats are not valid JSON
+    if 'orjson' in _encoders():
+        _json.set_encoder('orjson')
+        assert _json.dumps([float('nan'), float('inf')]) == b'[null,null]'
+    _json.set_encoder('json')
+    assert _json.dumps([float('nan')]) == b'[NaN]'
+
+
+def test_responses(encoder):
+    server = JacorenServer()
+
+    for name in _encoders():
+        _json.set_encoder(name)
+        client = Client(server, BaseResponse)
+
+        for path in ('/machine', '/cpu', '/cpu/0', '/cpu/load/0',
+                     '/memory/ram'):
+            response = client.get(path)
+
+            assert response.status_code == 200
+            assert b', ' not in response.data
+            data = json.loads(response.data.decode('utf-8'),
+                              object_pairs_hook=OrderedDict)
+            assert isinstance(data, (list, OrderedDict))
+
+        data = json.loads(client.get('/machine').data.decode('utf-8'),
+                          object_pairs_hook=OrderedDict)
+        assert list(data) == ['os', 'version', 'uptime', 'users']
+
+        load = json.loads(client.get('/cpu/load/0').data.decode('utf-8'),
+                          object_pairs_hook=OrderedDict)
+        assert list(load)[-1] == 'used'
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import pytest
 import psutil
+import jacoren
 import jacoren.memory
 from collections import OrderedDict
 
@@ -125,3 +127,50 @@ def test_memory_swap_percent():
             assert isinstance(swap['sout'], (int, long))
         except NameError:
             assert isinstance(swap['sout'], int)
+
+def test_memory_history():
+    import time
+
+    assert jacoren.memory.memory_ram_history() is None
+    assert jacoren.memory.memory_swap_history() is None
+
+    jacoren.memory.start_sampler(interval=0.05, history=3)
+    try:
+        time.sleep(0.3)
+        ram = jacoren.memory.memory_ram_history()
+        swap = jacoren.memory.memory_swap_history(window=60)
+
+        assert len(ram['timestamp']) == 3
+        assert len(ram['ram']['total']) == 3
+        assert len(ram['ram']['available']) == 3
+        assert len(swap['timestamp']) == 3
+        assert len(swap['swap']['used']) == 3
+
+        ram = jacoren.memory.memory_ram_history(percent=True)
+        for value in ram['ram']['available']:
+            assert 0. <= value <= 100.
+    finally:
+        jacoren.memory.stop_sampler()
+
+def test_memory_fields(monkeypatch):
+    backend = jacoren.get_backend()
+
+    def _swap_memory(*args, **kwargs):
+        raise AssertionError('swap read')
+    monkeypatch.setattr(backend, 'swap_memory', _swap_memory)
+
+    memory = jacoren.memory.memory(fields='ram.available,ram.total')
+    assert list(memory.keys()) == ['ram']
+    assert list(memory['ram'].keys()) == ['total', 'available']
+
+    memory = jacoren.memory.memory(percent=True, fields=['ram.available'])
+    assert 0. <= memory['ram']['available'] <= 100.
+
+def test_memory_swap_fields():
+    swap = jacoren.memory.memory_swap(fields='used,free')
+    assert list(swap.keys()) == ['used', 'free']
+
+def test_memory_fields_err():
+    for fields in ('nope', 'ram.nope', 'swap.percent', 'ram.total.x'):
+        with pytest.raises(ValueError):
+            jacoren.memory.memory(fields=fields)
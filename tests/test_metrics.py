@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import re
+from collections import OrderedDict
+
+import jacoren
+from jacoren._metrics import MetricsRenderer, _escape
+
+
+_sample_re = re.compile(r'^[a-z_]+(\{[^}]*\})? (-?[0-9.e+]+|NaN)$')
+
+
+def test_metrics_format():
+    body = MetricsRenderer().render().decode('utf-8')
+    assert body.endswith('\n')
+
+    families = []
+    for line in body.splitlines():
+        if line.startswith('# TYPE '):
+            families.append(line.split()[2])
+        elif not line.startswith('# HELP '):
+            assert _sample_re.match(line), line
+            # Samples of every family are grouped together
+            assert line.split('{')[0].split()[0] == families[-1]
+
+    assert len(families) == len(set(families))
+
+
+def test_metrics_label_cache():
+    renderer = MetricsRenderer()
+    renderer.render()
+
+    labels = renderer._core_mode(0, 'user')
+    assert labels == '{core="0",mode="user"} '
+    renderer.render()
+    assert renderer._core_mode(0, 'user') is labels
+
+
+def test_metrics_disks(monkeypatch):
+    disk = OrderedDict((
+        ('device', 'server:/export'),
+        ('mountpoint', '/mnt/"quoted"'),
+        ('fstype', 'nfs'),
+        ('opts', 'rw'),
+        ('total', None),
+        ('used', None),
+        ('free', None),
+        ('status', 'timeout'),
+    ))
+    monkeypatch.setattr(jacoren.disks, 'disks', lambda: [disk])
+
+    body = MetricsRenderer().render().decode('utf-8')
+    labels = ('{device="server:/export",mountpoint="/mnt/\\"quoted\\"",'
+              'fstype="nfs"}')
+
+    assert 'jacoren_disk_up%s 0\n' % (labels,) in body
+    assert 'jacoren_disk_total_bytes{' not in body
+
+
+def test_metrics_escape():
+    assert _escape('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import signal
+import socket
+import subprocess
+
+import pytest
+from jacoren._prefork import _Counters, _CountingApp
+
+try:
+    import http.client as httplib
+except ImportError:
+    import httplib
+
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'),
+                                reason='requires fork()')
+
+_package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def _connect(port, timeout=10.):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return socket.create_connection(('127.0.0.1', port)).close()
+        except (IOError, OSError):
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def test_counters():
+    counters = _Counters(2)
+
+    pid = os.fork()
+    if pid == 0:
+        counters[1] = 42
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    assert counters[0] == 0
+    assert counters[1] == 42
+
+
+def test_counting_app():
+    def app(environ, start_response):
+        start_response('200 OK', [])
+        yield b'a'
+        yield b'b'
+
+    counters = _Counters(1)
+    counting = _CountingApp(app, counters, 0)
+
+    body = counting({}, lambda status, headers: None)
+    assert counting.active == 1
+    assert b''.join(body) == b'ab'
+    # Request is active until server closes its body
+    assert counting.active == 1
+    body.close()
+    assert counting.active == 0
+    assert counters[0] == 1
+
+
+def test_prefork():
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=_package_root)
+    proc = subprocess.Popen(
+        [sys.executable, '-c',
+         'import sys; from jacoren._server import main; main()',
+         '--host', '127.0.0.1', '--port', str(port), '--workers', '2'],
+        env=env, stderr=subprocess.PIPE,
+    )
+
+    try:
+        _connect(port)
+
+        # Keep-alive connection
+        conn = httplib.HTTPConnection('127.0.0.1', port)
+        for _ in range(5):
+            conn.request('GET', '/cpu/info')
+            response = conn.getresponse()
+            response.read()
+            assert response.status == 200
+        conn.close()
+
+        for _ in range(5):
+            conn = httplib.HTTPConnection('127.0.0.1', port)
+            conn.request('GET', '/memory/ram')
+            assert conn.getresponse().status == 200
+            conn.close()
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        _, err = proc.communicate()
+
+    assert proc.returncode == 0
+    err = err.decode('utf-8')
+    assert 'jacoren: worker 0 ' in err
+    assert 'jacoren: worker 1 ' in err
+    assert 'jacoren: total: 10 requests' in err
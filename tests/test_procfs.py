@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import os
+import pytest
+from jacoren import _procfs
+
+
+_stat = (b'cpu  20 0 10 80 0 0 0 0 0 0\n'
+         b'cpu0 10 0 5 40 0 0 0 0 0 0\n'
+         b'cpu1 10 0 5 40 0 0 0 0 0 0\n'
+         b'cpu10 1 2 3 4 5 6 7 8 9 10\n'
+         b'intr 1 2 3\n')
+
+def test_parse_cpu_times():
+    ticks = float(_procfs.CLOCK_TICKS)
+
+    times = _procfs.parse_cpu_times(b'cpu1 10 0 5 40 1 2 3', 4)
+    assert times == (10 / ticks, 0., 5 / ticks, 40 / ticks)
+
+def test_cpu_times(monkeypatch):
+    ticks = float(_procfs.CLOCK_TICKS)
+    monkeypatch.setattr(_procfs, 'read', lambda path, persistent=None: _stat)
+
+    assert _procfs.cpu_times(1, 3) == (10 / ticks, 0., 5 / ticks)
+    # Cores are counted among online ones (cpu2 to cpu9 are offline)
+    assert _procfs.cpu_times(2, 10) == tuple(i / ticks for i in range(1, 11))
+    assert _procfs.cpu_times(3, 3) is None
+    assert _procfs.cpu_times(10, 3) is None
+
+def test_cpu_freq(monkeypatch):
+    files = {
+        'scaling_cur_freq': b'1200000\n',
+        'scaling_min_freq': b'800000\n',
+        'scaling_max_freq': b'3400000\n',
+    }
+
+    def _read(path):
+        assert path.startswith('/sys/devices/system/cpu/cpu3/cpufreq/')
+        return files[path.rsplit('/', 1)[1]]
+    monkeypatch.setattr(_procfs, 'read', _read)
+
+    assert _procfs.cpu_freq(3) == (1200., 800., 3400.)
+
+def test_cpu_freq_missing(monkeypatch):
+    def _read(path):
+        raise IOError(path)
+    monkeypatch.setattr(_procfs, 'read', _read)
+
+    assert _procfs.cpu_freq(3) is None
+
+def test_cpu_freq_names(monkeypatch):
+    paths = []
+
+    def _read(path):
+        paths.append(path)
+        return b'1200000\n'
+    monkeypatch.setattr(_procfs, 'read', _read)
+
+    assert _procfs.cpu_freq(3, ('current',)) == (1200.,)
+    assert paths == ['/sys/devices/system/cpu/cpu3/cpufreq/scaling_cur_freq']
+
+def _cpufreq(root, core, current, low, high):
+    path = root.join('cpu%d' % (core,), 'cpufreq')
+    path.ensure(dir=True)
+    path.join('scaling_cur_freq').write(b'%d\n' % (current,), 'wb')
+    path.join('scaling_min_freq').write(b'%d\n' % (low,), 'wb')
+    path.join('scaling_max_freq').write(b'%d\n' % (high,), 'wb')
+    return path
+
+def test_cpufreq_reader(tmpdir):
+    root = str(tmpdir) + '/'
+    path = _cpufreq(tmpdir, 0, 1200000, 800000, 3400000)
+    reader = _procfs.CpufreqReader(root)
+
+    assert reader.read(0) == (1200., 800., 3400.)
+    assert reader.read(0, ('max', 'current')) == (3400., 1200.)
+    assert reader.read(1) is None
+
+    # Current frequency is re-read, limits are cached until refresh()
+    path.join('scaling_cur_freq').write(b'2000000\n', 'wb')
+    path.join('scaling_max_freq').write(b'3000000\n', 'wb')
+    assert reader.read(0) == (2000., 800., 3400.)
+    reader.refresh()
+    assert reader.read(0) == (2000., 800., 3000.)
+
+    # Limits are re-read once current frequency falls outside of them
+    path.join('scaling_cur_freq').write(b'500000\n', 'wb')
+    path.join('scaling_min_freq').write(b'400000\n', 'wb')
+    assert reader.read(0) == (500., 400., 3000.)
+
+    reader.close()
+    assert reader.read(0, ('current',)) == (500.,)
+
+def test_cpufreq_reader_descriptors(tmpdir):
+    root = str(tmpdir) + '/'
+    _cpufreq(tmpdir, 0, 1200000, 800000, 3400000)
+    reader = _procfs.CpufreqReader(root)
+
+    reader.read(0)
+    fd = reader._fds[0]
+    reader.read(0)
+    assert reader._fds[0] == fd
+
+    reader.close()
+    assert reader._fds == {}
+
+@pytest.mark.skipif(_procfs._pread is None, reason='requires pread()')
+def test_proc_reader(tmpdir):
+    path = tmpdir.join('stat')
+    path.write(b'cpu 1 2 3\n', 'wb')
+    reader = _procfs.ProcReader(size=4)
+
+    assert reader.read(str(path)) == b'cpu 1 2 3\n'
+    fd = reader._files[str(path)].fd
+
+    # File is re-read through the same descriptor, buffer grows as needed
+    path.write(b'cpu 10 20 30\n' * 100, 'wb')
+    assert reader.read(str(path)) == b'cpu 10 20 30\n' * 100
+    assert reader._files[str(path)].fd == fd
+
+    reader.close()
+    assert reader._files == {}
+
+@pytest.mark.skipif(not hasattr(os, 'fork') or _procfs._pread is None,
+                    reason='requires fork() and pread()')
+def test_proc_reader_fork(tmpdir):
+    path = tmpdir.join('uptime')
+    path.write(b'1.0 2.0\n', 'wb')
+    reader = _procfs.ProcReader()
+    reader.read(str(path))
+    fd = reader._files[str(path)].fd
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child reopens inherited files on first read
+        data = reader.read(str(path))
+        os.write(w, data if reader.pid == os.getpid() else b'')
+        os._exit(0)
+    os.close(w)
+    os.waitpid(pid, 0)
+    assert os.read(r, 100) == b'1.0 2.0\n'
+    os.close(r)
+
+    # Parent keeps its descriptor
+    assert reader._files[str(path)].fd == fd
+    reader.close()
+
+def test_uptime(monkeypatch):
+    monkeypatch.setattr(_procfs, 'read', lambda path: b'5683.12 5365.67\n')
+
+    assert _procfs.uptime() == 5683.12
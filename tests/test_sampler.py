@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from jacoren._sampler import Sampler
+
+
+def test_sampler_survives_errors():
+    calls = []
+    done = threading.Event()
+
+    def _func():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ZeroDivisionError
+        done.set()
+
+    sampler = Sampler(_func, 0.01)
+    sampler.start()
+    try:
+        assert done.wait(5)
+        assert sampler.running
+    finally:
+        sampler.stop()
+    assert len(calls) >= 2
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import json
+import pytest
+import psutil
+import jacoren.cpu
+from jacoren._snapshot import SnapshotWriter, SnapshotReader, collect
+
+
+@pytest.fixture
+def snapshot(tmpdir, monkeypatch):
+    path = str(tmpdir.join('snapshot'))
+    monkeypatch.setattr(SnapshotReader, 'ensure_collector', lambda self: None)
+    return SnapshotWriter(path, 4096), SnapshotReader(path, size=4096)
+
+def test_snapshot(snapshot):
+    writer, reader = snapshot
+
+    assert reader.get('/cpu/load') is None
+
+    writer.publish({'/cpu/load': b'[1]', '/memory': b'{}'})
+    assert reader.get('/cpu/load') == b'[1]'
+    assert reader.get('/memory') == b'{}'
+    assert reader.get('/disks') is None
+
+    writer.publish({'/cpu/load': b'[2, 3]'})
+    assert reader.get('/cpu/load') == b'[2, 3]'
+    assert reader.get('/memory') is None
+
+def test_snapshot_stale(snapshot):
+    import time
+
+    writer, reader = snapshot
+
+    writer.publish({'/cpu/load': b'[1]'}, timestamp=time.time() - 3600)
+    assert reader.get('/cpu/load') is None
+
+def test_snapshot_too_big(snapshot):
+    writer, reader = snapshot
+
+    with pytest.raises(ValueError):
+        writer.publish({'/disks': b' ' * 4096})
+
+def test_collect():
+    entries = collect()
+    cores = jacoren.cpu.CORES
+
+    for key in ('/cpu', '/cpu/load', '/cpu/load?cpu_time=1', '/cpu/freq',
+                '/disks', '/disks?percent=1'):
+        assert key in entries
+
+    if psutil.swap_memory().total:
+        for key in ('/memory', '/memory/ram', '/memory/ram?percent=1'):
+            assert key in entries
+
+    for core in range(cores):
+        assert '/cpu/load/%d' % (core,) in entries
+
+    assert len(json.loads(entries['/cpu/load'].decode('utf-8'))) == cores
+
+def test_snapshot_unavailable(monkeypatch, tmpdir):
+    import sys
+    import subprocess
+    from jacoren import _snapshot
+
+    # Server does not import snapshots unless they are enabled
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        'import sys, jacoren._server; '
+        'print("jacoren._snapshot" in sys.modules)',
+    ])
+    assert output.strip() == b'False'
+
+    monkeypatch.setattr(_snapshot, 'fcntl', None)
+    path = str(tmpdir.join('snapshot'))
+    with pytest.raises(ValueError):
+        _snapshot.SnapshotReader(path)
+    with pytest.raises(ValueError):
+        _snapshot.run_collector(path)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+import jacoren
+from jacoren._stream import Streams
+
+
+def _data(event):
+    lines = event.decode('utf-8').splitlines()
+    assert lines[0].startswith('id: ')
+    assert lines[1].startswith('data: ')
+    return json.loads(lines[1][len('data: '):])
+
+
+def test_stream():
+    streams = Streams()
+    subscription = streams.subscribe(['cpu/load', '/memory/ram'], 0.1)
+    try:
+        first = _data(next(subscription))
+        second = _data(next(subscription))
+    finally:
+        subscription.close()
+
+    assert second['timestamp'] > first['timestamp']
+    for data in (first, second):
+        assert list(data['resources']) == ['cpu/load', 'memory/ram']
+        assert len(data['resources']['cpu/load']) == jacoren.cpu.CORES
+        for core in data['resources']['cpu/load']:
+            assert 0. <= core['used'] <= 100.
+
+    assert len(streams) == 0
+    with pytest.raises(StopIteration):
+        next(subscription)
+
+
+def test_stream_shared(monkeypatch):
+    backend = jacoren.get_backend()
+    reads = []
+    virtual_memory = backend.virtual_memory
+
+    def _virtual_memory():
+        reads.append(1)
+        return virtual_memory()
+    monkeypatch.setattr(backend, 'virtual_memory', _virtual_memory)
+
+    streams = Streams()
+    subscriptions = [streams.subscribe(['memory/ram'], 0.1)
+                     for _ in range(5)]
+    subscriptions.append(streams.subscribe(['memory', 'cpu/load/0'], 0.1))
+    try:
+        assert len(streams) == 1
+
+        events = [_data(next(s)) for s in subscriptions]
+        seq = subscriptions[0].channel.seq
+        # Every subscriber got a sample, RAM was read once per sample
+        assert len(reads) <= seq + 1
+        assert list(events[-1]['resources']) == ['memory', 'cpu/load/0']
+    finally:
+        for subscription in subscriptions:
+            subscription.close()
+
+    assert len(streams) == 0
+
+
+def test_stream_channels():
+    streams = Streams()
+    subscriptions = [
+        streams.subscribe(['cpu/load'], 0.1),
+        streams.subscribe(['cpu/load'], 0.2),
+        streams.subscribe(['cpu/load'], 0.1, cpu_time=True),
+    ]
+    try:
+        assert len(streams) == 3
+        assert 'used' not in _data(next(subscriptions[2]))['resources'][
+            'cpu/load'][0]
+    finally:
+        for subscription in subscriptions:
+            subscription.close()
+    assert len(streams) == 0
+
+
+def test_stream_err():
+    streams = Streams()
+    with pytest.raises(ValueError):
+        streams.subscribe(['nope'], 1)
+    with pytest.raises(ValueError):
+        streams.subscribe(['cpu/load'], 0.01)
+    assert len(streams) == 0
+
+
+def test_stream_error(monkeypatch):
+    backend = jacoren.get_backend()
+    virtual_memory = backend.virtual_memory
+    calls = []
+
+    def _virtual_memory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError('meminfo is gone')
+        return virtual_memory()
+    monkeypatch.setattr(backend, 'virtual_memory', _virtual_memory)
+
+    streams = Streams()
+    subscription = streams.subscribe(['memory/ram'], 0.1)
+    try:
+        error = next(subscription).decode('utf-8').splitlines()
+        # Sampler survives, the next sample is sent as usual
+        data = _data(next(subscription))
+    finally:
+        subscription.close()
+
+    assert error[1] == 'event: error'
+    assert json.loads(error[2][len('data: '):])['error'] == 'meminfo is gone'
+    assert list(data['resources']) == ['memory/ram']
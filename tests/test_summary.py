@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from collections import OrderedDict
+from jacoren import _summary
+
+
+_fields = ('user', 'system', 'idle')
+_last = [(0., 0., 0.), (10., 10., 10.), (5., 5., 5.)]
+_times = [(10., 10., 80.), (60., 20., 30.), (5., 5., 5.)]
+
+def _summary_of(monkeypatch, np, *args, **kwargs):
+    monkeypatch.setattr(_summary, '_np', np)
+    return _summary.summary(*args, **kwargs)
+
+def test_summary_python(monkeypatch):
+    summary = _summary_of(monkeypatch, None, _fields, _times, 2,
+                          last=_last)
+
+    assert list(summary) == ['cores', 'mean', 'min', 'max', 'p95',
+                             'busiest']
+    assert summary['cores'] == 3
+    assert list(summary['mean']) == ['user', 'system', 'idle', 'used']
+    # Idle core (no time elapsed) counts as zero percentages
+    assert summary['min'] == OrderedDict((('user', 0.), ('system', 0.),
+                                          ('idle', 0.), ('used', 20.)))
+    assert summary['max'] == OrderedDict((('user', 62.5), ('system', 12.5),
+                                          ('idle', 80.), ('used', 100.)))
+    assert summary['p95'] == summary['max']
+    assert summary['mean']['user'] == round((10. + 62.5) / 3, 2)
+    assert summary['busiest'] == [
+        OrderedDict((('core', 2), ('used', 100.))),
+        OrderedDict((('core', 1), ('used', 75.))),
+    ]
+
+def test_summary_percentages(monkeypatch):
+    rows = [(10., 10., 80.), (30., 20., 50.)]
+    summary = _summary_of(monkeypatch, None, _fields, rows, 1)
+
+    assert summary['mean']['used'] == 35.
+    assert summary['busiest'] == [OrderedDict((('core', 1), ('used', 50.)))]
+    assert _summary.summary(_fields, []) is None
+
+def test_summary_numpy(monkeypatch):
+    np = pytest.importorskip('numpy')
+
+    for args, kwargs in (((_fields, _times, 2), {'last': _last}),
+                         ((_fields, [(10., 10., 80.)] * 40, 3), {})):
+        expected = _summary_of(monkeypatch, None, *args, **kwargs)
+        assert _summary_of(monkeypatch, np, *args, **kwargs) == expected
+
+def test_rank():
+    assert _summary._rank(1) == 0
+    assert _summary._rank(20) == 18
+    assert _summary._rank(100) == 94
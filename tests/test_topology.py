@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from jacoren import _topology
+
+
+def _sysfs(tmpdir, online=b'0-7\n'):
+    """Two sockets with two cores of two threads each, a node per socket."""
+    cpus = tmpdir.join('cpu')
+    cpus.ensure(dir=True)
+    cpus.join('online').write(online, 'wb')
+    for cpu in range(8):
+        topology = cpus.join('cpu%d' % (cpu,), 'topology')
+        topology.ensure(dir=True)
+        topology.join('physical_package_id').write(b'%d\n' % (cpu // 4,),
+                                                   'wb')
+        topology.join('core_id').write(b'%d\n' % (cpu % 2,), 'wb')
+
+    nodes = tmpdir.join('node')
+    for node, cpulist in ((0, b'0-3\n'), (1, b'4-7\n')):
+        nodes.join('node%d' % (node,)).ensure(dir=True)
+        nodes.join('node%d' % (node,), 'cpulist').write(cpulist, 'wb')
+    nodes.join('possible').write(b'0-1\n', 'wb')
+    return _topology.TopologyReader(str(cpus) + '/', str(nodes) + '/')
+
+def test_parse_cpulist():
+    assert _topology.parse_cpulist(b'0-3,8,10-11\n') == [0, 1, 2, 3, 8,
+                                                         10, 11]
+    assert _topology.parse_cpulist(b'5') == [5]
+    assert _topology.parse_cpulist(b'\n') == []
+
+def test_topology_groups(tmpdir):
+    topology = _sysfs(tmpdir).get()
+
+    assert topology.cpus == tuple(range(8))
+    assert topology.groups('socket') == [
+        ((('socket', 0),), [0, 1, 2, 3]),
+        ((('socket', 1),), [4, 5, 6, 7]),
+    ]
+    assert topology.groups('core') == [
+        ((('socket', 0), ('core', 0)), [0, 2]),
+        ((('socket', 0), ('core', 1)), [1, 3]),
+        ((('socket', 1), ('core', 0)), [4, 6]),
+        ((('socket', 1), ('core', 1)), [5, 7]),
+    ]
+    assert topology.groups('node') == [
+        ((('node', 0),), [0, 1, 2, 3]),
+        ((('node', 1),), [4, 5, 6, 7]),
+    ]
+
+    with pytest.raises(ValueError):
+        topology.groups('die')
+
+def test_topology_hotplug(tmpdir):
+    reader = _sysfs(tmpdir)
+    topology = reader.get()
+    assert reader.get() is topology
+
+    tmpdir.join('cpu', 'online').write(b'0-2,4-7\n', 'wb')
+    topology = reader.get()
+    assert topology.cpus == (0, 1, 2, 4, 5, 6, 7)
+    assert topology.groups('core')[1] == ((('socket', 0), ('core', 1)), [1])
+
+def test_topology_missing(tmpdir):
+    reader = _topology.TopologyReader(str(tmpdir) + '/missing/')
+
+    assert reader.get() is None
@@ -168,3 +168,274 @@ def test_disks():
     assert 'Content-Type' in response.headers
     assert response.headers['Content-Type'] == 'application/json; charset=UTF-8'
     assert len(response.data) > 0
+
+def test_wsgi_singleton():
+    from jacoren._server import get_server
+
+    assert get_server() is get_server()
+
+def test_static_responses():
+    import json
+    from jacoren import wsgi
+    from jacoren.cpu import cpu_info
+
+    response = Client(wsgi, BaseResponse).get('/cpu/info')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/json; charset=UTF-8'
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert json.loads(response.data.decode('utf-8')) == json.loads(json.dumps(cpu_info()))
+
+    response = Client(wsgi, BaseResponse).head('/')
+
+    assert response.status_code == 200
+    assert response.data == b''
+
+def test_machine_static_head():
+    import json
+
+    response = Client(JacorenServer(), BaseResponse).get('/machine')
+    data = json.loads(response.data.decode('utf-8'))
+
+    assert list(data.keys()) == ['os', 'version', 'uptime', 'users']
+
+def test_cpu_load_summary(client):
+    import json
+
+    response = client.get('/cpu/load/summary?top=1')
+    assert response.status_code == 200
+    summary = json.loads(response.data.decode('utf-8'))
+    assert list(summary) == ['cores', 'mean', 'min', 'max', 'p95', 'busiest']
+    assert len(summary['busiest']) == 1
+
+    assert client.get('/cpu/load/summary?top=-1').status_code == 400
+
+def test_cpu_topology(client):
+    import json
+    import psutil
+
+    response = client.get('/cpu/topology')
+    if not psutil.LINUX:
+        assert response.status_code == 404
+        return
+    assert response.status_code == 200
+    topology = json.loads(response.data.decode('utf-8'))
+    assert list(topology) == ['cpus', 'sockets', 'cores', 'nodes']
+
+    response = client.get('/cpu/load?group=node')
+    assert response.status_code == 200
+    nodes = json.loads(response.data.decode('utf-8'))
+    assert list(nodes[0]) == ['node', 'cpus', 'load']
+
+    assert client.get('/cpu/load?group=die').status_code == 400
+    assert client.get('/cpu/load/0?group=node').status_code == 400
+
+def test_history():
+    import jacoren
+
+    server = JacorenServer()
+    for path in ('/cpu/load/history', '/memory/ram/history',
+                 '/memory/swap/history'):
+        assert Client(server, BaseResponse).get(path).status_code == 404
+
+    server = JacorenServer(sample_interval=0.05, history=10)
+    try:
+        for path in ('/cpu/load/history', '/cpu/load/history/0',
+                     '/memory/ram/history?window=60s',
+                     '/memory/swap/history?window=1m&percent=1'):
+            response = Client(server, BaseResponse).get(path)
+
+            assert response.status_code == 200
+            assert response.headers['Content-Type'] == 'application/json; charset=UTF-8'
+
+        response = Client(server, BaseResponse).get('/cpu/load/history?window=x')
+        assert response.status_code == 400
+    finally:
+        jacoren.cpu.stop_sampler()
+        jacoren.memory.stop_sampler()
+
+def test_snapshot(tmpdir, monkeypatch):
+    from jacoren._snapshot import SnapshotReader, SnapshotWriter
+
+    path = str(tmpdir.join('snapshot'))
+    monkeypatch.setattr(SnapshotReader, 'ensure_collector', lambda self: None)
+
+    server = JacorenServer(snapshot=path)
+    SnapshotWriter(path).publish({
+        '/cpu/load': b'[]',
+        '/memory/ram?percent=1': b'{"total": 1}',
+    })
+
+    response = Client(server, BaseResponse).get('/cpu/load')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/json; charset=UTF-8'
+    # Resource is negotiated, so shared caches must vary by Accept
+    assert response.headers['Vary'] == 'Accept'
+    assert response.data == b'[]'
+
+    response = Client(server, BaseResponse).get('/memory/ram/?percent=1')
+    assert response.data == b'{"total": 1}'
+
+    # Not published, served directly
+    response = Client(server, BaseResponse).get('/memory/ram')
+    assert response.status_code == 200
+    assert response.data != b'{"total": 1}'
+
+def test_metrics(client):
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == \
+        'text/plain; version=0.0.4; charset=utf-8'
+
+    body = response.data.decode('utf-8')
+    assert '# TYPE jacoren_cpu_seconds_total counter\n' in body
+    assert 'jacoren_cpu_seconds_total{core="0",mode="user"} ' in body
+    assert 'jacoren_memory_ram_total_bytes ' in body
+    assert 'jacoren_disk_up{device=' in body
+
+def test_batch(client):
+    import json
+
+    response = client.get('/batch?r=cpu/load&r=memory/ram&r=disks'
+                            '&r=machine/uptime&percent=1')
+    assert response.status_code == 200
+
+    data = json.loads(response.data.decode('utf-8'))
+    assert isinstance(data['timestamp'], float)
+    assert sorted(data['resources']) == ['cpu/load', 'disks',
+                                         'machine/uptime', 'memory/ram']
+    assert data['resources']['memory/ram']['used'] <= 100.
+
+    assert client.get('/batch').status_code == 400
+    assert client.get('/batch?r=nope').status_code == 400
+
+def test_fields(client):
+    import json
+
+    response = client.get('/cpu?fields=load.used')
+    assert response.status_code == 200
+    data = json.loads(response.data.decode('utf-8'))
+    assert list(data.keys()) == ['load']
+    assert list(data['load'][0].keys()) == ['used']
+
+    response = client.get('/memory?fields=ram.available')
+    assert response.status_code == 200
+    data = json.loads(response.data.decode('utf-8'))
+    assert list(data.keys()) == ['ram']
+    assert list(data['ram'].keys()) == ['available']
+
+    assert client.get('/cpu?fields=nope').status_code == 400
+    assert client.get('/memory/ram?fields=ram.nope').status_code == 400
+
+def test_stream(client):
+    import json
+
+    response = client.get('/stream?interval=0.1&r=cpu/load&r=disks',
+                            buffered=False)
+    try:
+        assert response.status_code == 200
+        assert response.headers['Content-Type'].startswith(
+            'text/event-stream')
+        event = next(iter(response.response)).decode('utf-8')
+    finally:
+        response.close()
+
+    data = json.loads(event.split('data: ', 1)[1])
+    assert list(data['resources']) == ['cpu/load', 'disks']
+
+    assert client.get('/stream').status_code == 400
+    assert client.get('/stream?r=nope').status_code == 400
+    assert client.get('/stream?r=cpu&interval=x').status_code == 400
+
+def test_since(client):
+    import json
+
+    response = client.get('/memory/ram?since=')
+    assert response.status_code == 200
+    full = json.loads(response.data.decode('utf-8'))
+    assert full['since'] is None
+    assert 'total' in full['data']
+
+    response = client.get('/machine/users?since=')
+    token = json.loads(response.data.decode('utf-8'))['token']
+    response = client.get('/machine/users?since=%s' % (token,))
+    delta = json.loads(response.data.decode('utf-8'))
+    assert delta['since'] == token
+    assert delta['changed'] == {}
+    assert delta['removed'] == []
+
+    response = client.get('/machine?since=')
+    assert 'os' in json.loads(response.data.decode('utf-8'))['data']
+
+    response = client.get('/nope?since=')
+    assert json.loads(response.data.decode('utf-8'))['code'] == 404
+
+def test_accept(client):
+    import json
+    from jacoren._binary import PACKED, unpack
+
+    response = client.get('/cpu/load', headers={'Accept': PACKED})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == PACKED
+    assert response.headers['Vary'] == 'Accept'
+    fields, rows = unpack(response.data)
+    assert fields[-1] == 'used'
+    assert len(rows) == len(json.loads(
+        client.get('/cpu/load').data.decode('utf-8')))
+
+    response = client.get('/cpu/load/0?fields=idle',
+                            headers={'Accept': PACKED})
+    assert unpack(response.data)[0] == ('idle',)
+
+    response = client.get('/cpu/load/100000', headers={'Accept': PACKED})
+    assert response.status_code == 404
+
+    # JSON stays the default
+    for accept in ('*/*', 'application/json, %s;q=0.5' % (PACKED,)):
+        response = client.get('/cpu/load', headers={'Accept': accept})
+        assert response.headers['Content-Type'].startswith(
+            'application/json')
+
+def test_accept_msgpack(client):
+    import json
+
+    msgpack = pytest.importorskip('msgpack')
+
+    response = client.get('/memory/ram',
+                            headers={'Accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/msgpack'
+    assert 'total' in msgpack.unpackb(response.data)
+
+    # Static and pre-encoded responses are negotiated as well
+    for path in ('/', '/cpu/info', '/machine'):
+        response = client.get(path,
+                                headers={'Accept': 'application/msgpack'})
+        assert response.headers['Content-Type'] == 'application/msgpack'
+        assert response.headers['Vary'] == 'Accept'
+        assert msgpack.unpackb(response.data)
+
+        response = client.get(path)
+        assert response.headers['Content-Type'].startswith('application/json')
+        assert response.headers['Vary'] == 'Accept'
+
+    assert (msgpack.unpackb(client.get(
+        '/cpu/info', headers={'Accept': 'application/msgpack'}).data) ==
+        json.loads(client.get('/cpu/info').data.decode('utf-8')))
+
+def test_compress(client):
+    import gzip
+
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == client.get('/').data
+
+    api = Client(JacorenServer(compress_min_size=0), BaseResponse)
+    response = api.get('/memory/ram', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    api = Client(JacorenServer(compress_min_size=None), BaseResponse)
+    response = api.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers